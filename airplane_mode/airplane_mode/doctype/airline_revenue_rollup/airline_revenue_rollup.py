@@ -0,0 +1,187 @@
+# Copyright (c) 2024, Weaver Marquez and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+from frappe.query_builder.functions import Count, Sum
+from airplane_mode.utils import report_cache, rollup
+
+
+class AirlineRevenueRollup(Document):
+	"""Submitted ticket count and revenue per airline, airplane, departure date and route.
+
+	Maintained by Airplane Ticket on submit and cancel (an amendment is a cancel
+	plus a submit), so revenue reports read a few rows per day instead of
+	scanning every ticket. `rebuild` reconstructs the table from the tickets.
+	"""
+	# begin: auto-generated types
+	# This code is auto-generated. Do not modify anything in this block.
+
+	from typing import TYPE_CHECKING
+
+	if TYPE_CHECKING:
+		from frappe.types import DF
+
+		add_on_revenue: DF.Currency
+		airline: DF.Link | None
+		airplane: DF.Link | None
+		departure_date: DF.Date | None
+		destination_airport: DF.Link | None
+		fare_revenue: DF.Currency
+		source_airport: DF.Link | None
+		ticket_count: DF.Int
+	# end: auto-generated types
+
+	KEY_FIELDS = ['airline', 'airplane', 'departure_date', 'source_airport', 'destination_airport']
+	VALUE_FIELDS = ['ticket_count', 'fare_revenue', 'add_on_revenue']
+
+	# ====================
+	# STATIC METHODS
+	# ====================
+
+	@staticmethod
+	def rollup_name(row: dict) -> str:
+		return rollup.rollup_name(AirlineRevenueRollup.KEY_FIELDS, row)
+
+	@staticmethod
+	def record_ticket(ticket, sign: int = 1) -> None:
+		"""Add a submitted ticket to its rollup row, or take a cancelled one (sign=-1) out."""
+		Flight = frappe.qb.DocType('Airplane Flight')
+		Airplane = frappe.qb.DocType('Airplane')
+		key = (
+			frappe.qb.from_(Flight)
+			.left_join(Airplane).on(Flight.airplane == Airplane.name)
+			.select(
+				Airplane.airline, Flight.airplane, Flight.date_of_departure.as_('departure_date'),
+				Flight.source_airport, Flight.destination_airport,
+			)
+			.where(Flight.name == ticket.flight)
+		).run(as_dict=True)
+		if not key:
+			return
+
+		AirlineRevenueRollup.upsert([{
+			**key[0],
+			'ticket_count': sign,
+			'fare_revenue': sign * (ticket.flight_price or 0),
+			'add_on_revenue': sign * ((ticket.total_amount or 0) - (ticket.flight_price or 0)),
+		}])
+
+	@staticmethod
+	def move_flights(moves: dict[str, tuple[dict, dict]]) -> None:
+		"""Move each flight's submitted tickets from the rollup row of its old key to that of its new one.
+
+		Args:
+			moves: Per flight name, its (old key, new key) as dicts of KEY_FIELDS
+		"""
+		if not moves:
+			return
+
+		Ticket = frappe.qb.DocType('Airplane Ticket')
+		totals = (
+			frappe.qb.from_(Ticket)
+			.select(
+				Ticket.flight,
+				Count(Ticket.name).as_('ticket_count'),
+				Sum(Ticket.flight_price).as_('fare_revenue'),
+				Sum(Ticket.total_amount - Ticket.flight_price).as_('add_on_revenue'),
+			)
+			.where(Ticket.docstatus == 1)
+			.where(Ticket.flight.isin(list(moves)))
+			.groupby(Ticket.flight)
+		).run(as_dict=True)
+
+		rows = []
+		for total in totals:
+			old_key, new_key = moves[total.flight]
+			values = {field: total[field] or 0 for field in AirlineRevenueRollup.VALUE_FIELDS}
+			rows.append({**old_key, **{field: -value for field, value in values.items()}})
+			rows.append({**new_key, **values})
+		if rows:
+			AirlineRevenueRollup.upsert(rows)
+			report_cache.bump_version('Airplane Ticket')
+
+	@staticmethod
+	def flight_key(flight, airline: str | None) -> dict:
+		return {
+			'airline': airline,
+			'airplane': flight.airplane,
+			'departure_date': flight.date_of_departure,
+			'source_airport': flight.source_airport,
+			'destination_airport': flight.destination_airport,
+		}
+
+	@staticmethod
+	def upsert(rows: list[dict]) -> None:
+		"""Add each row's counts to the rollup row with the same key, creating it if missing."""
+		rollup.upsert('Airline Revenue Rollup', AirlineRevenueRollup.KEY_FIELDS, AirlineRevenueRollup.VALUE_FIELDS, rows)
+
+	@staticmethod
+	def rebuild() -> int:
+		"""Replace every rollup row with totals grouped from submitted tickets. Returns the row count."""
+		Ticket = frappe.qb.DocType('Airplane Ticket')
+		Flight = frappe.qb.DocType('Airplane Flight')
+		Airplane = frappe.qb.DocType('Airplane')
+		rows = (
+			frappe.qb.from_(Ticket)
+			.join(Flight).on(Ticket.flight == Flight.name)
+			.left_join(Airplane).on(Flight.airplane == Airplane.name)
+			.select(
+				Airplane.airline, Flight.airplane, Flight.date_of_departure.as_('departure_date'),
+				Flight.source_airport, Flight.destination_airport,
+				Count(Ticket.name).as_('ticket_count'),
+				Sum(Ticket.flight_price).as_('fare_revenue'),
+				Sum(Ticket.total_amount - Ticket.flight_price).as_('add_on_revenue'),
+			)
+			.where(Ticket.docstatus == 1)
+			.groupby(Airplane.airline, Flight.airplane, Flight.date_of_departure, Flight.source_airport, Flight.destination_airport)
+		).run(as_dict=True)
+
+		frappe.db.delete('Airline Revenue Rollup')
+		AirlineRevenueRollup.upsert(rows)
+		report_cache.bump_version('Airplane Ticket')
+		return len(rows)
+
+
+# ====================
+# DOC EVENTS
+# ====================
+# Rows are keyed by the flight and airplane as they are now, as `rebuild` groups them,
+# so a change to a key field moves the flight's tickets to their new row. A ticket
+# cancelled later then comes out of the row it is counted in.
+
+FLIGHT_KEY_FIELDS = ['airplane', 'date_of_departure', 'source_airport', 'destination_airport']
+
+def rekey_flight(doc, method=None) -> None:
+	"""doc_events hook for Airplane Flight, on update."""
+	before = doc.get_doc_before_save()
+	if not before or not any(doc.has_value_changed(field) for field in FLIGHT_KEY_FIELDS):
+		return
+
+	def airline(airplane):
+		return airplane and frappe.db.get_value('Airplane', airplane, 'airline')
+
+	AirlineRevenueRollup.move_flights({doc.name: (
+		AirlineRevenueRollup.flight_key(before, airline(before.airplane)),
+		AirlineRevenueRollup.flight_key(doc, airline(doc.airplane)),
+	)})
+
+def rekey_airplane(doc, method=None) -> None:
+	"""doc_events hook for Airplane, on update: its flights' tickets move to its new airline."""
+	before = doc.get_doc_before_save()
+	if not before or not doc.has_value_changed('airline'):
+		return
+
+	flights = frappe.get_all('Airplane Flight', filters={'airplane': doc.name}, fields=['name', *FLIGHT_KEY_FIELDS])
+	AirlineRevenueRollup.move_flights({
+		flight.name: (
+			AirlineRevenueRollup.flight_key(flight, before.airline),
+			AirlineRevenueRollup.flight_key(flight, doc.airline),
+		)
+		for flight in flights
+	})
+
+
+def on_doctype_update():
+	# Serves revenue reports: one airline over a range of departure dates.
+	frappe.db.add_index("Airline Revenue Rollup", ["airline", "departure_date"])
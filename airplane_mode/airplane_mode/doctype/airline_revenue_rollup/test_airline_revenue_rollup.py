@@ -0,0 +1,112 @@
+# Copyright (c) 2024, Weaver Marquez and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from airplane_mode.airplane_mode.doctype.airline_revenue_rollup.airline_revenue_rollup import AirlineRevenueRollup, rekey_airplane, rekey_flight
+
+
+class TestAirlineRevenueRollup(FrappeTestCase):
+	def test_rollup_name_is_keyed_by_airline_airplane_date_and_route(self):
+		row = {'airline': 'Air India', 'airplane': 'AI-A320-01', 'departure_date': '2024-06-01', 'source_airport': 'BOM', 'destination_airport': 'DEL'}
+		name = AirlineRevenueRollup.rollup_name(row)
+
+		self.assertEqual(name, AirlineRevenueRollup.rollup_name({**row, 'ticket_count': 3}))
+		self.assertNotEqual(name, AirlineRevenueRollup.rollup_name({**row, 'destination_airport': 'BLR'}))
+
+
+class TestAirlineRevenueRollupRekey(FrappeTestCase):
+	"""Re-keying against real Airplane, Airplane Flight and Airplane Ticket rows,
+	written with db_insert so no other controller logic runs."""
+
+	AIRPLANES = {'_Test Rekey Airplane': '_Test Rekey Airline', '_Test Rekey Other Airplane': '_Test Rekey Other Airline'}
+	FLIGHT = '_Test Rekey Flight'
+
+	def setUp(self):
+		for name, airline in self.AIRPLANES.items():
+			frappe.get_doc({'doctype': 'Airplane', 'name': name, 'airline': airline}).db_insert()
+		frappe.get_doc({
+			'doctype': 'Airplane Flight',
+			'name': self.FLIGHT,
+			'docstatus': 1,
+			'airplane': '_Test Rekey Airplane',
+			'date_of_departure': '2024-06-01',
+			'source_airport': '_Test Rekey BOM',
+			'destination_airport': '_Test Rekey DEL',
+		}).db_insert()
+
+		tickets = [
+			# name, docstatus, flight_price, total_amount
+			('_Test Rekey Ticket 1', 1, 100, 120),
+			('_Test Rekey Ticket 2', 1, 200, 200),
+			('_Test Rekey Ticket Cancelled', 2, 500, 500),
+		]
+		for name, docstatus, flight_price, total_amount in tickets:
+			frappe.get_doc({
+				'doctype': 'Airplane Ticket',
+				'name': name,
+				'docstatus': docstatus,
+				'flight': self.FLIGHT,
+				'flight_price': flight_price,
+				'total_amount': total_amount,
+			}).db_insert()
+
+		AirlineRevenueRollup.rebuild()
+
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def rollup(self):
+		"""Non-empty rollup rows of the test airplanes, by key."""
+		rows = frappe.get_all('Airline Revenue Rollup', filters={'airplane': ['in', list(self.AIRPLANES)]},
+			fields=[*AirlineRevenueRollup.KEY_FIELDS, *AirlineRevenueRollup.VALUE_FIELDS])
+		return {
+			(row.airline, row.airplane, str(row.departure_date)): (row.ticket_count, row.fare_revenue, row.add_on_revenue)
+			for row in rows if row.ticket_count
+		}
+
+	def test_rebuild(self):
+		self.assertEqual(self.rollup(), {
+			('_Test Rekey Airline', '_Test Rekey Airplane', '2024-06-01'): (2, 300, 20),
+		})
+
+	def test_rekey_flight_moves_tickets_to_the_new_key(self):
+		"""A flight moved to another airplane and date takes its tickets to that airplane's airline and the new date"""
+		flight = frappe.get_doc('Airplane Flight', self.FLIGHT)
+		flight._doc_before_save = frappe.copy_doc(flight)
+		flight.airplane = '_Test Rekey Other Airplane'
+		flight.date_of_departure = '2024-06-02'
+
+		rekey_flight(flight)
+
+		self.assertEqual(self.rollup(), {
+			('_Test Rekey Other Airline', '_Test Rekey Other Airplane', '2024-06-02'): (2, 300, 20),
+		})
+		self.assertEqual(self.rollup(), self._rebuilt_after(flight), "Matches a rebuild from the moved flight")
+
+	def test_rekey_airplane_moves_tickets_to_the_new_airline(self):
+		airplane = frappe.get_doc('Airplane', '_Test Rekey Airplane')
+		airplane._doc_before_save = frappe.copy_doc(airplane)
+		airplane.airline = '_Test Rekey New Airline'
+
+		rekey_airplane(airplane)
+
+		self.assertEqual(self.rollup(), {
+			('_Test Rekey New Airline', '_Test Rekey Airplane', '2024-06-01'): (2, 300, 20),
+		})
+
+	def test_unchanged_flight_is_not_moved(self):
+		flight = frappe.get_doc('Airplane Flight', self.FLIGHT)
+		flight._doc_before_save = frappe.copy_doc(flight)
+		flight.gate_number = 'B12'
+
+		rekey_flight(flight)
+
+		self.assertEqual(self.rollup(), {
+			('_Test Rekey Airline', '_Test Rekey Airplane', '2024-06-01'): (2, 300, 20),
+		})
+
+	def _rebuilt_after(self, flight):
+		flight.db_update()
+		AirlineRevenueRollup.rebuild()
+		return self.rollup()
@@ -1,7 +1,7 @@
 # Copyright (c) 2024, Weaver Marquez and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
 from frappe.model.document import Document
 
 
@@ -18,5 +18,14 @@ class Airplane(Document):
 		capacity: DF.Int
 		initial_audit_completed: DF.Check
 		model: DF.Data
+		seats_per_row: DF.Int
 	# end: auto-generated types
-	pass
+
+	def validate(self):
+		self.validate_seats_per_row()
+
+	def validate_seats_per_row(self) -> None:
+		"""Seats are lettered A-Z across a row, see SeatMap."""
+		from airplane_mode.airplane_mode.doctype.airplane_flight.seat_map import SeatMap
+		if not 1 <= self.seats_per_row <= len(SeatMap.COLUMNS):
+			frappe.throw(f"Seats per Row must be between 1 and {len(SeatMap.COLUMNS)}.")
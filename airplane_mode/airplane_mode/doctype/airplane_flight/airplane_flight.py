@@ -1,8 +1,12 @@
 # Copyright (c) 2024, Weaver Marquez and contributors
 # For license information, please see license.txt
 
+import hashlib
+import json
+
 import frappe
 from frappe.website.website_generator import WebsiteGenerator
+from airplane_mode.airplane_mode.doctype.airplane_flight.flight_inventory import FlightInventory
 #from frappe.model.document import Document
 
 
@@ -18,17 +22,23 @@ class AirplaneFlight(WebsiteGenerator):
 
 		airplane: DF.Link
 		amended_from: DF.Link | None
+		capacity: DF.Int
 		crew_on_flight: DF.Table[FlightCrew]
 		date_of_departure: DF.Date
 		destination_airport: DF.Link
 		destination_airport_code: DF.ReadOnly | None
 		duration: DF.Duration
 		gate_number: DF.Data
+		load_factor: DF.Percent
 		published: DF.Check
 		route: DF.Data | None
+		seat_map: DF.SmallText | None
+		seats_available: DF.Int
 		source_airport: DF.Link
 		source_airport_code: DF.ReadOnly | None
 		status: DF.Literal["Scheduled", "Completed", "Cancelled"]
+		tickets_held: DF.Int
+		tickets_sold: DF.Int
 		time_of_departure: DF.Time
 	# end: auto-generated types
 
@@ -36,86 +46,251 @@ class AirplaneFlight(WebsiteGenerator):
 	# CONTROLLERS
 	# ====================
 
+	def validate(self):
+		self.load_booking_counters()
+
 	def before_submit(self):
 		self.status = 'Completed'
 		pass
 
-	def on_update(self):
-		gate_number_changed = self.has_value_changed("gate_number")
-		if gate_number_changed:
-			self.update_gate_numbers()
+	def on_change(self):
+		clear_flight_cache()
+
+	def on_trash(self):
+		super().on_trash()
+		clear_flight_cache()
 
+	def get_context(self, context):
+		context.airline = frappe.get_cached_value('Airplane', self.airplane, 'airline')
 
 	# ==================== 
 	# PUBLIC INSTANCE METHODS
 	# ====================
 
-	def update_gate_numbers(self):
-		# Update associated Tickets.
-		self.cascade_value(
-			"Airplane Ticket", 
-			filters={'flight': self.name}, 
-			fields_to_cascade={'gate_number': 'gate_number'}
+	def load_booking_counters(self) -> None:
+		"""Bookings update the counters and seat map directly, so never write back the
+		copies loaded with this form; re-read them under the row lock instead."""
+		if self.is_new():
+			self.tickets_held = self.tickets_sold = 0
+			self.seat_map = None
+		else:
+			self.update(frappe.db.get_value(
+				'Airplane Flight', self.name, FlightInventory.COUNTER_FIELDS, as_dict=True, for_update=True
+			))
+
+		inventory = FlightInventory(
+			self.name, capacity=self.capacity, held=self.tickets_held, sold=self.tickets_sold, seat_map=None
 		)
-		# NOTE Ah, I need to modify this so that it can be changed if a Ticket had been submitted.
-		# But, for a ticket to be submitted, it needs to be Boarded? So it probably shouldn't be able to be edited after boarding...
-
-
-	def cascade_value(self, doctype: str, *, filters: dict = None, fields_to_cascade: dict = None):
-		"""
-		Cascade values from the current object to associated DocType, such as Airplane Tickets.
-    
-		:param doctype: A string representing the targeted DocType.
-
-		:param filters: A dictionary of filters to put in frappe.get_list. 
-				This should include a filter that connects to this Document.
-
-		:param fields_to_cascade: A dictionary where keys are field names in the current object
-				and values are the corresponding field names in Airplane Ticket.
-
-		example usage:
-		
-		self.cascade_value("Airplane Ticket", {'flight': self.name}, {'gate_number': 'gate_number'})
-		"""
-		items: list[dict] = frappe.get_list(
-			doctype, 
-			fields=["name"] + list(fields_to_cascade.values()),
-			filters=filters
+		self.seats_available = inventory.available
+		self.load_factor = inventory.load_factor
+
+	def overcapacity(self) -> bool:
+		"""True once every seat is held or sold."""
+		return not self.seats_available
+
+
+LOAD_FACTOR_FIELDS = ['name', 'airplane', 'tickets_sold', 'tickets_held', 'seats_available', 'load_factor']
+MAX_LOAD_FACTOR_FLIGHTS = 500
+
+@frappe.whitelist()
+def get_load_factors(flights: str | list) -> dict[str, dict]:
+	"""Availability of many flights in two queries, keyed by flight name.
+	Capacity is the airplane's, which seats_available and load_factor are computed from,
+	not the flight's copy that background propagation may not have reached yet.
+
+	Args:
+		flights: List of up to MAX_LOAD_FACTOR_FLIGHTS Airplane Flight names, or its JSON
+	"""
+	names = frappe.parse_json(flights) if isinstance(flights, str) else flights
+	if not names:
+		return {}
+	if len(names) > MAX_LOAD_FACTOR_FLIGHTS:
+		frappe.throw(f"Load factors can be read for at most {MAX_LOAD_FACTOR_FLIGHTS} flights at a time.")
+
+	rows = frappe.get_list('Airplane Flight', filters={'name': ['in', names]}, fields=LOAD_FACTOR_FIELDS, limit=len(names))
+	airplanes = list({row.airplane for row in rows if row.airplane})
+	capacities = dict(frappe.get_all('Airplane', filters={'name': ['in', airplanes]}, fields=['name', 'capacity'], as_list=True)) if airplanes else {}
+	for row in rows:
+		row.capacity = capacities.get(row.pop('airplane'), 0)
+	return {row.name: row for row in rows}
+
+
+def on_doctype_update():
+	# Serves search_flights: route equality, then a range and sort on the departure date.
+	frappe.db.add_index("Airplane Flight", ["source_airport", "destination_airport", "date_of_departure"])
+
+
+# ====================
+# FLIGHT CACHE
+# ====================
+# Search results and web list rows are cached under a generation stamp that any
+# change to a flight or its airplane replaces, so stale entries are never read again.
+
+FLIGHT_CACHE_VERSION_KEY = 'airplane_mode:flight_cache_version'
+
+def flight_cache_version() -> str:
+	version = frappe.cache().get_value(FLIGHT_CACHE_VERSION_KEY)
+	if not version:
+		version = clear_flight_cache()
+	return version
+
+def clear_flight_cache() -> str:
+	version = frappe.generate_hash(length=10)
+	frappe.cache().set_value(FLIGHT_CACHE_VERSION_KEY, version)
+	return version
+
+def clear_airplane_flight_pages(doc, method=None) -> None:
+	"""doc_events hook for Airplane: flight pages and search results show the airplane's airline."""
+	if not doc.has_value_changed('airline'):
+		return
+
+	from frappe.website.utils import clear_cache
+	clear_flight_cache()
+	for route in frappe.get_all('Airplane Flight', filters={'airplane': doc.name, 'route': ['is', 'set']}, pluck='route'):
+		clear_cache(route)
+
+def _cache_key(prefix: str, args: tuple) -> str:
+	return f"airplane_mode:{prefix}:{flight_cache_version()}:{hashlib.sha1(repr(args).encode()).hexdigest()}"
+
+
+# ====================
+# WEB LIST
+# ====================
+
+FLIGHT_LIST_CACHE_TTL = 60 * 60
+
+def get_list_context(context=None):
+	return {'get_list': get_flight_list}
+
+def get_flight_list(doctype, txt=None, filters=None, limit_start=0, limit_page_length=20, order_by=None, **kwargs) -> list[dict]:
+	"""Rows for the /flights list page, with each flight's airline joined in instead of
+	looked up per row by the row template."""
+	args = (txt, filters, limit_start, limit_page_length)
+	cache_key = _cache_key('flight_list', args)
+	rows = frappe.cache().get_value(cache_key)
+	if rows is None:
+		rows = _get_flight_list(*args)
+		frappe.cache().set_value(cache_key, rows, expires_in_sec=FLIGHT_LIST_CACHE_TTL)
+	return rows
+
+def _get_flight_list(txt, filters, limit_start, limit_page_length) -> list[dict]:
+	Flight = frappe.qb.DocType('Airplane Flight')
+	Airplane = frappe.qb.DocType('Airplane')
+
+	query = (
+		frappe.qb.from_(Flight)
+		.left_join(Airplane).on(Flight.airplane == Airplane.name)
+		.select(
+			Flight.name, Flight.route, Flight.published, Airplane.airline,
+			Flight.source_airport_code, Flight.destination_airport_code,
+			Flight.date_of_departure, Flight.time_of_departure, Flight.duration,
 		)
+		.where(Flight.published == 1)
+		.orderby(Flight.date_of_departure)
+		.orderby(Flight.time_of_departure)
+		.offset(limit_start)
+		.limit(limit_page_length)
+	)
+	for field, value in (filters or {}).items():
+		query = query.where(Flight[field] == value)
+	if txt:
+		query = query.where(Flight.name.like(f"%{txt}%") | Flight.route.like(f"%{txt}%"))
 
-		for item in items:
-			updated = False
-			for src_field, dst_field in fields_to_cascade.items():
+	return query.run(as_dict=True)
 
-				if getattr(self, src_field) != item[dst_field]:
-					doc = frappe.get_cached_doc(doctype, item.name) 
-					doc.set(dst_field, getattr(self, src_field))
-					updated = True
-        
-			if updated:
-				doc.save()
-				doc.notify_update()
 
-	def overcapacity(self) -> bool:
-		from airplane_mode.airplane_mode.doctype.airplane_flight.airplane_flight import AirplaneFlight
-		count = AirplaneFlight.ticket_count(self.name)
-		capacity = frappe.db.get_value('Airplane', self.airplane, 'capacity') 
-		return count >= capacity
+# ====================
+# FLIGHT SEARCH
+# ====================
 
-	# ==================== 
-	# STATIC METHODS
-	# ====================
+SEARCH_CACHE_TTL = 60
+SEARCH_PAGE_LENGTH = 20
+SEARCH_MAX_PAGE_LENGTH = 100
+SEARCH_CURSOR_KEYS = ('date', 'time', 'name')
+
+@frappe.whitelist(allow_guest=True)
+def search_flights(source_airport: str, destination_airport: str, date: str | None = None,
+		after: str | dict | None = None, limit: int = SEARCH_PAGE_LENGTH) -> dict:
+	"""Published, scheduled flights on a route, soonest first. Cached for SEARCH_CACHE_TTL seconds.
+
+	Args:
+		source_airport: Airport to depart from
+		destination_airport: Airport to arrive at
+		date: Only flights departing on this date. Defaults to every flight from today on.
+		after: The `next` value of the previous page, to continue from there
+		limit: Page length, from 1 to SEARCH_MAX_PAGE_LENGTH
+
+	Returns:
+		{"flights": [...], "next": cursor for the following page, or None on the last page}
+	"""
+	after = parse_search_cursor(after)
+	limit = max(1, min(frappe.utils.cint(limit) or SEARCH_PAGE_LENGTH, SEARCH_MAX_PAGE_LENGTH))
+	args = (source_airport, destination_airport, date, after, limit)
+
+	cache_key = _cache_key('flight_search', args)
+	result = frappe.cache().get_value(cache_key)
+	if result is None:
+		result = _search_flights(*args)
+		frappe.cache().set_value(cache_key, result, expires_in_sec=SEARCH_CACHE_TTL)
+	return result
 
-	@staticmethod
-	def ticket_count(flight_name: str) -> int:
-		return frappe.db.count('Airplane Ticket', filters={'flight': flight_name})
+def parse_search_cursor(after: str | dict | None) -> dict | None:
+	"""The `next` cursor of a previous page, checked to hold only a date, time and name."""
+	if not after:
+		return None
+	if isinstance(after, str):
+		try:
+			after = json.loads(after)
+		except ValueError:
+			after = None
+	if not (isinstance(after, dict) and set(after) == set(SEARCH_CURSOR_KEYS)
+			and all(isinstance(after[key], str) for key in SEARCH_CURSOR_KEYS)):
+		frappe.throw("Invalid search cursor: pass the `next` value of the previous page.", frappe.ValidationError)
+	return {key: after[key] for key in SEARCH_CURSOR_KEYS}
 
-	@staticmethod
-	def overcapacity(flight_name: str):
-		from airplane_mode.airplane_mode.doctype.airplane_flight.airplane_flight import AirplaneFlight
-		count = AirplaneFlight.ticket_count(flight_name)
+def _search_flights(source_airport, destination_airport, date, after, limit) -> dict:
+	Flight = frappe.qb.DocType('Airplane Flight')
+	Airplane = frappe.qb.DocType('Airplane')
+
+	query = (
+		frappe.qb.from_(Flight)
+		.join(Airplane).on(Flight.airplane == Airplane.name)
+		.select(
+			Flight.name, Flight.route, Airplane.airline,
+			Flight.source_airport_code, Flight.destination_airport_code,
+			Flight.date_of_departure, Flight.time_of_departure, Flight.duration,
+			Flight.seats_available,
+		)
+		.where(Flight.source_airport == source_airport)
+		.where(Flight.destination_airport == destination_airport)
+		.where(Flight.published == 1)
+		.where(Flight.status == 'Scheduled')
+		.where(Flight.docstatus < 2)
+		.orderby(Flight.date_of_departure)
+		.orderby(Flight.time_of_departure)
+		.orderby(Flight.name)
+		.limit(limit + 1)
+	)
+	if date:
+		query = query.where(Flight.date_of_departure == date)
+	else:
+		query = query.where(Flight.date_of_departure >= frappe.utils.today())
+
+	if after:
+		# Keyset pagination: strictly after the last row of the previous page, in sort order.
+		query = query.where(
+			(Flight.date_of_departure > after['date'])
+			| ((Flight.date_of_departure == after['date']) & (
+				(Flight.time_of_departure > after['time'])
+				| ((Flight.time_of_departure == after['time']) & (Flight.name > after['name']))
+			))
+		)
 
-		airplane = frappe.get_value('Airplane Flight', flight_name)
+	flights = query.run(as_dict=True)
+	next_page = None
+	if len(flights) > limit:
+		flights = flights[:limit]
+		last = flights[-1]
+		next_page = {'date': str(last.date_of_departure), 'time': str(last.time_of_departure), 'name': last.name}
 
-		capacity = frappe.db.get_value('Airplane', flight.airplane, 'capacity') 
-		return count >= capacity
+	return {'flights': flights, 'next': next_page}
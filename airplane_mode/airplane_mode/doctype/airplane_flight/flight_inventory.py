@@ -0,0 +1,117 @@
+# Copyright (c) 2024, Weaver Marquez and contributors
+# For license information, please see license.txt
+
+import frappe
+from pypika.terms import Case
+from airplane_mode.airplane_mode.doctype.airplane_flight.seat_map import SeatMap
+
+
+class FlightFullError(frappe.ValidationError):
+	pass
+
+
+class FlightInventory:
+	"""Booking counters and seat map of one Airplane Flight.
+
+	Read with `lock`, which holds the flight's row lock until the booking
+	transaction commits, so concurrent bookings queue up instead of both
+	passing the capacity check.
+
+	- held: draft tickets
+	- sold: submitted tickets
+	Cancelled tickets count for neither and have given their seat back.
+
+	Saving also stores seats_available and load_factor, so list views, reports
+	and web pages read availability from the flight row instead of counting tickets.
+	"""
+	FIELDS = ['airplane', 'capacity', 'tickets_held', 'tickets_sold', 'seat_map']
+	COUNTER_FIELDS = ['tickets_held', 'tickets_sold', 'seat_map']
+
+	def __init__(self, flight_name: str, *, capacity: int, held: int, sold: int, seat_map: SeatMap):
+		self.flight_name = flight_name
+		self.capacity = capacity or 0
+		self.held = held or 0
+		self.sold = sold or 0
+		self.seat_map = seat_map
+
+	@classmethod
+	def lock(cls, flight_name: str) -> 'FlightInventory':
+		flight = frappe.db.get_value('Airplane Flight', flight_name, cls.FIELDS, as_dict=True, for_update=True)
+		if not flight:
+			frappe.throw(f"Airplane Flight {frappe.bold(flight_name)} does not exist.", frappe.DoesNotExistError)
+
+		# The airplane's capacity, not the flight's copy, which a large fleet's change reaches in the background.
+		capacity, seats_per_row = frappe.get_cached_value('Airplane', flight.airplane, ['capacity', 'seats_per_row']) or (flight.capacity, None)
+		return cls(
+			flight_name,
+			capacity=capacity,
+			held=flight.tickets_held,
+			sold=flight.tickets_sold,
+			seat_map=SeatMap.decode(capacity, seats_per_row, flight.seat_map),
+		)
+
+	def save(self) -> None:
+		frappe.db.set_value('Airplane Flight', self.flight_name, {
+			'tickets_held': self.held,
+			'tickets_sold': self.sold,
+			'seats_available': self.available,
+			'load_factor': self.load_factor,
+			'seat_map': self.seat_map.encode(),
+		}, update_modified=False)
+
+	# ====================
+	# COUNTERS
+	# ====================
+
+	@property
+	def available(self) -> int:
+		return max(self.capacity - self.held - self.sold, 0)
+
+	@property
+	def load_factor(self) -> float:
+		"""Held and sold tickets as a percentage of capacity."""
+		return 100 * (self.held + self.sold) / self.capacity if self.capacity else 0
+
+	@staticmethod
+	def refresh_availability(*, airplane: str | None = None) -> None:
+		"""Recompute seats_available and load_factor from the stored counters, for all flights
+		or those of one airplane, in one UPDATE.
+
+		Capacity is read from the airplane, since propagating a changed capacity to the
+		flights' copies runs in the background past propagation.BACKGROUND_THRESHOLD flights."""
+		Flight = frappe.qb.DocType('Airplane Flight')
+		Airplane = frappe.qb.DocType('Airplane')
+		booked = Flight.tickets_held + Flight.tickets_sold
+		query = (
+			frappe.qb.update(Flight)
+			.join(Airplane).on(Flight.airplane == Airplane.name)
+			.set(Flight.seats_available, Case().when(Airplane.capacity > booked, Airplane.capacity - booked).else_(0))
+			.set(Flight.load_factor, Case().when(Airplane.capacity > 0, 100 * booked / Airplane.capacity).else_(0))
+		)
+		if airplane:
+			query = query.where(Flight.airplane == airplane)
+		query.run()
+
+	def hold(self, count: int = 1) -> None:
+		if count > self.available:
+			frappe.throw("Capacity for Airplane Flight has been exceeded.", FlightFullError)
+		self.held += count
+
+	def sell(self, count: int = 1) -> None:
+		"""Draft tickets were submitted."""
+		self.held = max(self.held - count, 0)
+		self.sold += count
+
+	def release(self, count: int = 1, *, sold: bool = False) -> None:
+		"""Draft tickets were deleted, or submitted ones cancelled."""
+		if sold:
+			self.sold = max(self.sold - count, 0)
+		else:
+			self.held = max(self.held - count, 0)
+
+
+def refresh_load_factors(doc, method=None) -> None:
+	"""doc_events hook for Airplane: recompute its flights' availability after a capacity change,
+	whether or not propagation has copied the new capacity to them yet."""
+	if doc.has_value_changed('capacity'):
+		FlightInventory.refresh_availability(airplane=doc.name)
@@ -0,0 +1,102 @@
+# Copyright (c) 2024, Weaver Marquez and contributors
+# For license information, please see license.txt
+
+import re
+import string
+
+import frappe
+
+
+class SeatUnavailableError(frappe.ValidationError):
+	pass
+
+
+class SeatMap:
+	"""Bitmap of the taken seats on an Airplane Flight.
+
+	Seat n is bit n of an integer, numbered row-major from the front:
+	with 5 seats per row, 0 -> 1A, 4 -> 1E, 5 -> 2A.
+	The map is stored on the flight as a hex string, so a 300 seat widebody
+	fits in 75 characters.
+	"""
+	COLUMNS = string.ascii_uppercase
+	LABEL_PATTERN = re.compile(r"^\s*(\d+)\s*([A-Za-z])\s*$")
+
+	def __init__(self, capacity: int, seats_per_row: int = 5, taken: int = 0):
+		self.capacity = capacity or 0
+		self.seats_per_row = seats_per_row or 5
+		self.taken = taken
+
+	@classmethod
+	def decode(cls, capacity: int, seats_per_row: int, encoded: str | None) -> 'SeatMap':
+		return cls(capacity, seats_per_row, int(encoded, 16) if encoded else 0)
+
+	def encode(self) -> str:
+		return format(self.taken, 'x')
+
+	# ====================
+	# SEAT LABELS
+	# ====================
+
+	def label(self, index: int) -> str:
+		row, col = divmod(index, self.seats_per_row)
+		return f"{row + 1}{self.COLUMNS[col]}"
+
+	def parse(self, label: str) -> int | None:
+		"""Return the bit index for a label like '12C', or None if it is not a seat on this plane."""
+		match = self.LABEL_PATTERN.match(label or '')
+		if not match:
+			return None
+
+		row, col = int(match.group(1)), self.COLUMNS.find(match.group(2).upper())
+		if row < 1 or col >= self.seats_per_row:
+			return None
+
+		index = (row - 1) * self.seats_per_row + col
+		return index if index < self.capacity else None
+
+	def index(self, label: str) -> int:
+		index = self.parse(label)
+		if index is None:
+			frappe.throw(f"Seat {frappe.bold(label)} does not exist on this flight.", SeatUnavailableError)
+		return index
+
+	# ====================
+	# ALLOCATION
+	# ====================
+
+	@property
+	def taken_count(self) -> int:
+		return self.taken.bit_count()
+
+	@property
+	def free_count(self) -> int:
+		return self.capacity - self.taken_count
+
+	def is_taken(self, label: str) -> bool:
+		return bool(self.taken >> self.index(label) & 1)
+
+	def allocate(self) -> str:
+		"""Take the frontmost free seat and return its label."""
+		# Lowest clear bit: adding 1 carries through the run of set bits.
+		index = (~self.taken & (self.taken + 1)).bit_length() - 1
+		if index >= self.capacity:
+			frappe.throw("No seats are left on this flight.", SeatUnavailableError)
+
+		self.taken |= 1 << index
+		return self.label(index)
+
+	def reserve(self, label: str) -> str:
+		"""Take a specific seat and return its normalized label."""
+		index = self.index(label)
+		if self.taken >> index & 1:
+			frappe.throw(f"Seat {frappe.bold(self.label(index))} is already taken.", SeatUnavailableError)
+
+		self.taken |= 1 << index
+		return self.label(index)
+
+	def release(self, label: str) -> None:
+		"""Free a seat. Unknown labels are ignored, as tickets may predate the map."""
+		index = self.parse(label)
+		if index is not None:
+			self.taken &= ~(1 << index)
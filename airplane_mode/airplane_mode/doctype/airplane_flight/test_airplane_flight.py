@@ -1,9 +1,102 @@
 # Copyright (c) 2024, Weaver Marquez and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 from frappe.tests.utils import FrappeTestCase
+from airplane_mode.airplane_mode.doctype.airplane_flight.airplane_flight import get_load_factors, parse_search_cursor
+from airplane_mode.airplane_mode.doctype.airplane_flight.flight_inventory import FlightInventory, FlightFullError
+from airplane_mode.airplane_mode.doctype.airplane_flight.seat_map import SeatMap
 
 
 class TestAirplaneFlight(FrappeTestCase):
 	pass
+
+
+class TestLoadFactors(FrappeTestCase):
+	"""get_load_factors against real Airplane and Airplane Flight rows, written with db_insert."""
+
+	def setUp(self):
+		frappe.get_doc({'doctype': 'Airplane', 'name': '_Test Load Airplane', 'capacity': 200}).db_insert()
+		# The flight still holds the old capacity, as before background propagation reaches it.
+		frappe.get_doc({
+			'doctype': 'Airplane Flight',
+			'name': '_Test Load Flight',
+			'airplane': '_Test Load Airplane',
+			'capacity': 100,
+			'tickets_held': 10,
+			'tickets_sold': 40,
+			'seats_available': 150,
+			'load_factor': 25,
+		}).db_insert()
+
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def test_capacity_is_the_airplanes(self):
+		"""Capacity agrees with seats_available and load_factor, both computed from the airplane"""
+		row = get_load_factors(['_Test Load Flight', '_Test Missing Flight'])['_Test Load Flight']
+
+		self.assertEqual((row.capacity, row.seats_available, row.load_factor), (200, 150, 25))
+		self.assertNotIn('airplane', row)
+
+
+class TestSearchCursor(FrappeTestCase):
+	"""Unit Tests for the search_flights page cursor. No database needed."""
+
+	CURSOR = {'date': '2024-06-15', 'time': '09:30:00', 'name': 'FL-0001'}
+
+	def test_accepts_next_value(self):
+		self.assertEqual(parse_search_cursor(self.CURSOR), self.CURSOR)
+		self.assertEqual(parse_search_cursor(frappe.as_json(self.CURSOR)), self.CURSOR)
+		self.assertIsNone(parse_search_cursor(None))
+		self.assertIsNone(parse_search_cursor(''))
+
+	def test_rejects_anything_else(self):
+		for after in (
+			'not json',
+			'[1, 2, 3]',
+			{'date': '2024-06-15', 'time': '09:30:00'},
+			{**self.CURSOR, 'extra': 'x'},
+			{**self.CURSOR, 'name': ['FL-0001']},
+		):
+			with self.subTest(after=after), self.assertRaises(frappe.ValidationError):
+				parse_search_cursor(after)
+
+
+class TestFlightInventory(FrappeTestCase):
+	"""Unit Tests for the booking counters. No database needed."""
+
+	def setUp(self):
+		self.inventory = FlightInventory(
+			'_Test Flight', capacity=3, held=1, sold=1, seat_map=SeatMap(3, 3)
+		)
+
+	def test_hold_until_full(self):
+		self.inventory.hold()
+		self.assertEqual(self.inventory.available, 0)
+
+		with self.assertRaises(FlightFullError):
+			self.inventory.hold()
+
+	def test_hold_many_is_all_or_nothing(self):
+		with self.assertRaises(FlightFullError):
+			self.inventory.hold(2)
+		self.assertEqual(self.inventory.held, 1)
+
+	def test_sell_moves_held_to_sold(self):
+		self.inventory.sell()
+		self.assertEqual((self.inventory.held, self.inventory.sold), (0, 2))
+		self.assertEqual(self.inventory.available, 1)
+
+	def test_release(self):
+		self.inventory.release()
+		self.inventory.release(sold=True)
+		self.assertEqual(self.inventory.available, 3)
+
+		self.inventory.release()
+		self.assertEqual(self.inventory.held, 0, "Counters never go negative")
+
+	def test_load_factor(self):
+		self.assertAlmostEqual(self.inventory.load_factor, 200 / 3)
+		self.inventory.capacity = 0
+		self.assertEqual(self.inventory.load_factor, 0)
@@ -0,0 +1,55 @@
+# Copyright (c) 2024, Weaver Marquez and Contributors
+# See license.txt
+
+from frappe.tests.utils import FrappeTestCase
+from airplane_mode.airplane_mode.doctype.airplane_flight.seat_map import SeatMap, SeatUnavailableError
+
+
+class TestSeatMap(FrappeTestCase):
+	"""Unit Tests for SeatMap. No database needed."""
+
+	def setUp(self):
+		self.seat_map = SeatMap(capacity=12, seats_per_row=5)
+
+	def test_labels(self):
+		cases = [(0, '1A'), (4, '1E'), (5, '2A'), (11, '3B')]
+		for index, label in cases:
+			with self.subTest(index=index):
+				self.assertEqual(self.seat_map.label(index), label)
+				self.assertEqual(self.seat_map.parse(label), index)
+
+	def test_parse_rejects_seats_off_the_plane(self):
+		for label in ['', '0A', '1F', '3C', 'A1', '12']:
+			with self.subTest(label=label):
+				self.assertIsNone(self.seat_map.parse(label))
+
+	def test_allocate_fills_from_the_front_without_duplicates(self):
+		seats = [self.seat_map.allocate() for _ in range(12)]
+		self.assertEqual(len(set(seats)), 12)
+		self.assertEqual(seats[:6], ['1A', '1B', '1C', '1D', '1E', '2A'])
+		self.assertEqual(self.seat_map.free_count, 0)
+
+		with self.assertRaises(SeatUnavailableError):
+			self.seat_map.allocate()
+
+	def test_release_reopens_seat(self):
+		for _ in range(3):
+			self.seat_map.allocate()
+		self.seat_map.release('1B')
+		self.assertEqual(self.seat_map.allocate(), '1B')
+
+	def test_reserve(self):
+		self.assertEqual(self.seat_map.reserve(' 2c'), '2C')
+		self.assertTrue(self.seat_map.is_taken('2C'))
+
+		with self.assertRaises(SeatUnavailableError):
+			self.seat_map.reserve('2C')
+		with self.assertRaises(SeatUnavailableError):
+			self.seat_map.reserve('9A')
+
+	def test_encode_round_trip(self):
+		self.seat_map.reserve('1A')
+		self.seat_map.reserve('3B')
+		decoded = SeatMap.decode(12, 5, self.seat_map.encode())
+		self.assertEqual(decoded.taken, self.seat_map.taken)
+		self.assertEqual(SeatMap.decode(12, 5, None).taken_count, 0)
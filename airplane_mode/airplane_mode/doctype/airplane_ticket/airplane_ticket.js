@@ -4,11 +4,18 @@
 frappe.ui.form.on("Airplane Ticket", {
 	refresh(frm) {
         // Custom buttons
-        frm.add_custom_button(_('Assign Seat'), () => {
-            frappe.prompt(_('Seat Number'), ({ value }) => frm.set_value('seat', value), _('Select Seat'), _('Assign'));
-        }, 'Actions');
+        frm.add_custom_button(__('Assign Seat'), () => {
+            frappe.prompt(__('Seat Number'), ({ value }) => frm.events.assign_seat(frm, value), __('Select Seat'), __('Assign'));
+        }, __('Actions'));
 	},
-});
 
-// add a custom button like the one shown above in Airplane Ticket form view 
-// on click, show a dialog with an input field to get the seat number and set it to Seat
\ No newline at end of file
+	assign_seat(frm, seat) {
+        // A new ticket reserves its seat on insert; a saved one has to swap seats on the flight's seat map.
+        if (frm.is_new()) {
+            frm.set_value('seat', seat.trim().toUpperCase());
+            return;
+        }
+        frm.call({ doc: frm.doc, method: 'change_seat', args: { seat } })
+            .then(() => frm.reload_doc());
+	},
+});
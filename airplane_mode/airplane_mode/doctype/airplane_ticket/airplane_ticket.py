@@ -3,8 +3,10 @@
 
 import frappe
 from frappe.model.document import Document
-import random
-import string
+from airplane_mode.airplane_mode.doctype.airline_revenue_rollup.airline_revenue_rollup import AirlineRevenueRollup
+from airplane_mode.airplane_mode.doctype.airplane_flight.flight_inventory import FlightInventory
+from airplane_mode.airplane_mode.doctype.airplane_flight.seat_map import SeatMap
+from airplane_mode.airplane_mode.doctype.airplane_ticket_add_on_sales.airplane_ticket_add_on_sales import AirplaneTicketAddonSales
 
 class AirplaneTicket(Document):
 	# begin: auto-generated types
@@ -40,8 +42,9 @@ class AirplaneTicket(Document):
 		self.validate_gate_number()
 
 	def before_insert(self):
-		self.validate_flight_capacity()
-		self.assign_random_seat()
+		# issue_tickets reserves seats for a whole manifest up front.
+		if not self.flags.seat_reserved:
+			self.reserve_seat()
 
 	def validate(self):
 		self.remove_duplicate_add_ons()
@@ -50,18 +53,63 @@ class AirplaneTicket(Document):
 	def before_submit(self):
 		self.validate_value('status', '!=', 'Boarded')
 
+	def on_submit(self):
+		inventory = FlightInventory.lock(self.flight)
+		inventory.sell()
+		inventory.save()
+		AirlineRevenueRollup.record_ticket(self)
+		AirplaneTicketAddonSales.record_ticket(self)
+
+	def on_cancel(self):
+		self.release_seat(sold=True)
+		AirlineRevenueRollup.record_ticket(self, -1)
+		AirplaneTicketAddonSales.record_ticket(self, -1)
+
+	def on_trash(self):
+		# Cancelled tickets gave their seat back already.
+		if self.docstatus.is_draft():
+			self.release_seat()
+
 	# ==================== 
 	# PUBLIC INSTANCE METHODS
 	# ====================
 
-	def assign_random_seat(self) -> None:
-		seat_row, seat_col = AirplaneTicket.random_seat()
-		self.seat = f"{seat_row}{seat_col}"
-
-	def validate_flight_capacity(self) -> None:
-		flight = frappe.get_doc('Airplane Flight', self.flight)
-		if flight.overcapacity():
-			frappe.throw("Capacity for Airplane Flight has been exceeded.")
+	def reserve_seat(self) -> None:
+		"""Hold a seat on the flight, throwing if it is full.
+
+		Takes the requested seat, or the frontmost free one if none was requested.
+		An amendment keeps its old seat unless someone else took it meanwhile."""
+		inventory = FlightInventory.lock(self.flight)
+		inventory.hold()
+		self.assign_seat(inventory.seat_map)
+		inventory.save()
+
+	def assign_seat(self, seat_map: SeatMap) -> None:
+		if self.seat and not (self.amended_from and seat_map.is_taken(self.seat)):
+			self.seat = seat_map.reserve(self.seat)
+		else:
+			self.seat = seat_map.allocate()
+
+	def release_seat(self, *, sold: bool = False) -> None:
+		inventory = FlightInventory.lock(self.flight)
+		inventory.release(sold=sold)
+		if self.seat:
+			inventory.seat_map.release(self.seat)
+		inventory.save()
+
+	@frappe.whitelist()
+	def change_seat(self, seat: str) -> None:
+		"""Called by the Assign Seat button: move this ticket to another seat, freeing its current one."""
+		self.check_permission('write')
+		inventory = FlightInventory.lock(self.flight)
+		seat_map = inventory.seat_map
+		if seat_map.index(seat) == seat_map.parse(self.seat):
+			return
+		new_seat = seat_map.reserve(seat)
+		if self.seat:
+			seat_map.release(self.seat)
+		inventory.save()
+		self.db_set('seat', new_seat, notify=True)
 
 	# TODO Should I remove this now that changes to Flight's gate_number cascade to Tickets?
 	# Because it seems like a better option than otherwise...
@@ -100,9 +148,82 @@ class AirplaneTicket(Document):
 				seen.add(t)
 		return duplicates, uniques
 
-	@staticmethod
-	def random_seat() -> tuple[int, str]:
-		seat_row = random.randint(1, 100)
-		# Generate a random capital letter from A to E
-		seat_col = random.choice(string.ascii_uppercase[:5])
-		return seat_row, seat_col
+
+MAX_BULK_TICKETS = 1000
+
+@frappe.whitelist()
+def issue_tickets(flight: str, passengers: str | list, flight_price: float | None = None, add_ons: str | list | None = None) -> list[dict]:
+	"""Issue tickets for a group booking or charter manifest in one transaction.
+
+	Capacity is reserved once for the whole manifest, seats are allocated in one
+	pass over the flight's seat map, and the flight row stays locked until the
+	request commits. A row that fails to insert is rolled back on its own and
+	gives its seat back; the other rows still go through.
+
+	Args:
+		flight: Airplane Flight to book on
+		passengers: List of rows like {"passenger": ..., "seat": "12C", "flight_price": ..., "add_ons": [...]}.
+			Only passenger is required.
+		flight_price: Price for rows that do not set their own
+		add_ons: Add-on rows like {"item": ..., "amount": ...} given to every passenger
+
+	Returns:
+		One result per row: {"idx", "passenger", "ticket", "seat", "error"}
+	"""
+	frappe.has_permission('Airplane Ticket', 'create', throw=True)
+
+	rows: list[dict] = [frappe._dict(row) for row in frappe.parse_json(passengers) or []]
+	shared_add_ons: list[dict] = frappe.parse_json(add_ons) or []
+	if len(rows) > MAX_BULK_TICKETS:
+		frappe.throw(f"Cannot issue more than {MAX_BULK_TICKETS} tickets at once.")
+
+	inventory = FlightInventory.lock(flight)
+	inventory.hold(len(rows))
+	results = [frappe._dict(idx=idx, passenger=row.passenger, ticket=None, seat=None, error=None)
+			for idx, row in enumerate(rows, start=1)]
+
+	# Requested seats first, so the frontmost free seats handed out next cannot collide with them.
+	seat_map = inventory.seat_map
+	for row, result in zip(rows, results):
+		if row.seat:
+			try:
+				result.seat = seat_map.reserve(row.seat)
+			except frappe.ValidationError as e:
+				result.error = str(e)
+	for row, result in zip(rows, results):
+		if not (row.seat or result.error):
+			result.seat = seat_map.allocate()
+
+	for row, result in zip(rows, results):
+		if result.error:
+			continue
+
+		ticket: AirplaneTicket = frappe.get_doc({
+			'doctype': 'Airplane Ticket',
+			'flight': flight,
+			'passenger': row.passenger,
+			'seat': result.seat,
+			'flight_price': row.flight_price if row.flight_price is not None else flight_price,
+			'add_ons': shared_add_ons + (row.add_ons or []),
+		})
+		ticket.flags.seat_reserved = True
+		ticket.flags.notify_update = False
+
+		save_point = f"issue_ticket_{result.idx}"
+		frappe.db.savepoint(save_point)
+		try:
+			ticket.insert()
+			result.ticket = ticket.name
+		except Exception as e:
+			frappe.db.rollback(save_point=save_point)
+			frappe.clear_last_message()
+			seat_map.release(result.seat)
+			result.seat = None
+			result.error = str(e)
+
+	failed = sum(1 for result in results if result.error)
+	inventory.release(failed)
+	inventory.save()
+
+	frappe.publish_realtime('list_update', {'doctype': 'Airplane Ticket', 'name': None}, after_commit=True)
+	return results
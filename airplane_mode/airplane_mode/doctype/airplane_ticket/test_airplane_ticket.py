@@ -1,9 +1,138 @@
 # Copyright (c) 2024, Weaver Marquez and Contributors
 # See license.txt
 
-# import frappe
+from unittest.mock import MagicMock, patch
+
+import frappe
 from frappe.tests.utils import FrappeTestCase
+from airplane_mode.airplane_mode.doctype.airplane_flight.flight_inventory import FlightInventory, FlightFullError
+from airplane_mode.airplane_mode.doctype.airplane_flight.seat_map import SeatMap
+from airplane_mode.airplane_mode.doctype.airplane_ticket.airplane_ticket import MAX_BULK_TICKETS, issue_tickets
 
 
 class TestAirplaneTicket(FrappeTestCase):
 	pass
+
+
+class TestIssueTickets(FrappeTestCase):
+	"""Unit Tests for issue_tickets over an in-memory FlightInventory.
+	Ticket inserts are mocked: a passenger named 'Bad ...' fails to insert."""
+
+	def setUp(self):
+		self.inventory = FlightInventory(
+			'_Test Flight', capacity=6, held=1, sold=1, seat_map=SeatMap(6, 3)
+		)
+		self.inventory.seat_map.reserve('1A')
+		self.inventory.seat_map.reserve('1B')
+
+		patches = [
+			patch.object(FlightInventory, 'lock', return_value=self.inventory),
+			patch.object(FlightInventory, 'save'),
+			patch('frappe.has_permission', return_value=True),
+			patch('frappe.get_doc', side_effect=self._ticket),
+			patch('frappe.clear_last_message'),
+			patch('frappe.publish_realtime'),
+			patch.object(frappe.db, 'savepoint'),
+			patch.object(frappe.db, 'rollback'),
+		]
+		self.mocks = [p.start() for p in patches]
+		for p in patches:
+			self.addCleanup(p.stop)
+		self.mock_save = self.mocks[1]
+		self.mock_savepoint, self.mock_rollback = self.mocks[-2:]
+
+	@staticmethod
+	def _ticket(values):
+		ticket = MagicMock()
+		ticket.name = f"TICKET-{values['passenger']}"
+		if values['passenger'].startswith('Bad'):
+			ticket.insert.side_effect = frappe.ValidationError(f"Cannot book {values['passenger']}")
+		return ticket
+
+	def test_failed_rows_roll_back_and_give_back_seat_and_hold(self):
+		passengers = [
+			{'passenger': 'Ada'},
+			{'passenger': 'Bad Bob', 'seat': '2A'},
+			{'passenger': 'Cy', 'seat': '1A'},
+			{'passenger': 'Di'},
+		]
+
+		results = issue_tickets('_Test Flight', passengers)
+
+		self.assertEqual([result.ticket for result in results], ['TICKET-Ada', None, None, 'TICKET-Di'])
+		self.assertEqual([result.seat for result in results], ['1C', None, None, '2B'])
+		self.assertIsNone(results[0].error)
+		self.assertIn('Bad Bob', results[1].error)
+		self.assertIsNotNone(results[2].error, "Taken seat is reported, not inserted")
+
+		# Only the row that reached insert has a savepoint to roll back to.
+		self.mock_savepoint.assert_any_call('issue_ticket_2')
+		self.mock_rollback.assert_called_once_with(save_point='issue_ticket_2')
+		self.assertFalse(self.inventory.seat_map.is_taken('2A'), "Failed row's seat is free again")
+		self.assertEqual(self.inventory.seat_map.taken_count, 4)
+
+		# 1 held before, 4 held for the batch, 2 given back.
+		self.assertEqual((self.inventory.held, self.inventory.sold), (3, 1))
+		self.mock_save.assert_called_once()
+
+	def test_over_capacity(self):
+		passengers = [{'passenger': f"P{i}"} for i in range(5)]
+
+		with self.assertRaises(FlightFullError):
+			issue_tickets('_Test Flight', passengers)
+
+		self.assertEqual(self.inventory.held, 1)
+		self.mock_save.assert_not_called()
+
+	def test_above_max_bulk_tickets(self):
+		passengers = [{'passenger': f"P{i}"} for i in range(MAX_BULK_TICKETS + 1)]
+
+		with self.assertRaises(frappe.ValidationError):
+			issue_tickets('_Test Flight', passengers)
+
+		FlightInventory.lock.assert_not_called()
+
+
+class TestIssueTicketsRollback(FrappeTestCase):
+	"""issue_tickets inserting real tickets on an Airplane Flight written with db_insert.
+	A row naming a passenger that does not exist fails its link validation."""
+
+	FLIGHT = '_Test Issue Flight'
+	PASSENGER = 987654321
+
+	def setUp(self):
+		frappe.get_doc({'doctype': 'Airplane', 'name': '_Test Issue Airplane', 'airline': '_Test Issue Airline',
+			'capacity': 6, 'seats_per_row': 3}).db_insert()
+		frappe.get_doc({
+			'doctype': 'Airplane Flight',
+			'name': self.FLIGHT,
+			'docstatus': 1,
+			'airplane': '_Test Issue Airplane',
+			'capacity': 6,
+			'source_airport_code': 'SRC',
+			'destination_airport_code': 'DST',
+			'tickets_held': 1,
+			'seat_map': SeatMap.decode(6, 3, None).encode(),
+		}).db_insert()
+		frappe.get_doc({'doctype': 'Flight Passenger', 'name': self.PASSENGER, 'first_name': 'Test',
+			'date_of_birth': '1990-01-01'}).db_insert()
+
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def test_failed_row_releases_its_hold_and_seat(self):
+		results = issue_tickets(self.FLIGHT, [
+			{'passenger': str(self.PASSENGER), 'seat': '1A', 'flight_price': 100},
+			{'passenger': '_Test Missing Passenger', 'seat': '2B', 'flight_price': 100},
+		])
+
+		self.assertIsNone(results[0].error)
+		self.assertTrue(frappe.db.exists('Airplane Ticket', results[0].ticket))
+		self.assertIsNotNone(results[1].error)
+		self.assertFalse(frappe.db.exists('Airplane Ticket', {'flight': self.FLIGHT, 'passenger': '_Test Missing Passenger'}))
+
+		inventory = FlightInventory.lock(self.FLIGHT)
+		self.assertEqual(inventory.held, 2, "1 held before, 2 held for the batch, 1 given back")
+		self.assertTrue(inventory.seat_map.is_taken('1A'))
+		self.assertFalse(inventory.seat_map.is_taken('2B'), "Failed row's seat is free again")
+		self.assertEqual(frappe.db.get_value('Airplane Flight', self.FLIGHT, 'seats_available'), 4)
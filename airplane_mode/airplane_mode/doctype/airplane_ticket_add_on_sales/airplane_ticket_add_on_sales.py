@@ -0,0 +1,108 @@
+# Copyright (c) 2024, Weaver Marquez and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+from frappe.query_builder.functions import Count, Sum
+from airplane_mode.utils import report_cache, rollup
+
+
+class AirplaneTicketAddonSales(Document):
+	"""Units sold and revenue per add-on type and airline, from submitted tickets.
+
+	Maintained by Airplane Ticket on submit and cancel, so Add-on Popularity reads
+	one row per add-on and airline instead of every ticket's add-on items.
+	"""
+	# begin: auto-generated types
+	# This code is auto-generated. Do not modify anything in this block.
+
+	from typing import TYPE_CHECKING
+
+	if TYPE_CHECKING:
+		from frappe.types import DF
+
+		add_on: DF.Link | None
+		airline: DF.Link | None
+		revenue: DF.Currency
+		units_sold: DF.Int
+	# end: auto-generated types
+
+	KEY_FIELDS = ['add_on', 'airline']
+	VALUE_FIELDS = ['units_sold', 'revenue']
+
+	# ====================
+	# STATIC METHODS
+	# ====================
+
+	@staticmethod
+	def record_ticket(ticket, sign: int = 1) -> None:
+		"""Add a submitted ticket's add-ons to the counters, or take a cancelled one's (sign=-1) out."""
+		if not ticket.add_ons:
+			return
+
+		airline = rollup.flight_airline(ticket.flight)
+		rollup.upsert('Airplane Ticket Add-on Sales', AirplaneTicketAddonSales.KEY_FIELDS, AirplaneTicketAddonSales.VALUE_FIELDS, [
+			{'add_on': item.item, 'airline': airline, 'units_sold': sign, 'revenue': sign * (item.amount or 0)}
+			for item in ticket.add_ons
+		])
+
+	@staticmethod
+	def rebuild() -> int:
+		"""Replace every counter with totals grouped from submitted tickets' add-ons. Returns the row count."""
+		Item = frappe.qb.DocType('Airplane Ticket Add-on Item')
+		Ticket = frappe.qb.DocType('Airplane Ticket')
+		Flight = frappe.qb.DocType('Airplane Flight')
+		Airplane = frappe.qb.DocType('Airplane')
+		rows = (
+			frappe.qb.from_(Item)
+			.join(Ticket).on((Item.parent == Ticket.name) & (Item.parenttype == 'Airplane Ticket'))
+			.join(Flight).on(Ticket.flight == Flight.name)
+			.left_join(Airplane).on(Flight.airplane == Airplane.name)
+			.select(
+				Item.item.as_('add_on'), Airplane.airline,
+				Count(Item.name).as_('units_sold'),
+				Sum(Item.amount).as_('revenue'),
+			)
+			.where(Ticket.docstatus == 1)
+			.groupby(Item.item, Airplane.airline)
+		).run(as_dict=True)
+
+		frappe.db.delete('Airplane Ticket Add-on Sales')
+		rollup.upsert('Airplane Ticket Add-on Sales', AirplaneTicketAddonSales.KEY_FIELDS, AirplaneTicketAddonSales.VALUE_FIELDS, rows)
+		report_cache.bump_version('Airplane Ticket')
+		return len(rows)
+
+
+# ====================
+# DOC EVENTS
+# ====================
+
+def rekey_airplane(doc, method=None) -> None:
+	"""doc_events hook for Airplane, on update: move the add-ons sold on its flights to its new airline,
+	so a ticket cancelled later comes out of the airline it is counted under."""
+	before = doc.get_doc_before_save()
+	if not before or not doc.has_value_changed('airline'):
+		return
+
+	Item = frappe.qb.DocType('Airplane Ticket Add-on Item')
+	Ticket = frappe.qb.DocType('Airplane Ticket')
+	Flight = frappe.qb.DocType('Airplane Flight')
+	totals = (
+		frappe.qb.from_(Item)
+		.join(Ticket).on((Item.parent == Ticket.name) & (Item.parenttype == 'Airplane Ticket'))
+		.join(Flight).on(Ticket.flight == Flight.name)
+		.select(Item.item.as_('add_on'), Count(Item.name).as_('units_sold'), Sum(Item.amount).as_('revenue'))
+		.where(Ticket.docstatus == 1)
+		.where(Flight.airplane == doc.name)
+		.groupby(Item.item)
+	).run(as_dict=True)
+	if not totals:
+		return
+
+	rows = []
+	for total in totals:
+		units_sold, revenue = total.units_sold or 0, total.revenue or 0
+		rows.append({'add_on': total.add_on, 'airline': before.airline, 'units_sold': -units_sold, 'revenue': -revenue})
+		rows.append({'add_on': total.add_on, 'airline': doc.airline, 'units_sold': units_sold, 'revenue': revenue})
+	rollup.upsert('Airplane Ticket Add-on Sales', AirplaneTicketAddonSales.KEY_FIELDS, AirplaneTicketAddonSales.VALUE_FIELDS, rows)
+	report_cache.bump_version('Airplane Ticket')
@@ -0,0 +1,95 @@
+# Copyright (c) 2024, Weaver Marquez and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from airplane_mode.airplane_mode.doctype.airplane_ticket_add_on_sales.airplane_ticket_add_on_sales import AirplaneTicketAddonSales, rekey_airplane
+
+
+class TestAirplaneTicketAddonSales(FrappeTestCase):
+	"""Add-on sales counters against real Airplane, Airplane Flight and Airplane Ticket rows,
+	written with db_insert so no other controller logic runs."""
+
+	AIRLINE = '_Test Addon Airline'
+	NEW_AIRLINE = '_Test Addon New Airline'
+	AIRPLANE = '_Test Addon Airplane'
+	FLIGHT = '_Test Addon Flight'
+	ADD_ONS = ['_Test Addon Meal', '_Test Addon Bag', '_Test Addon Unsold']
+
+	def setUp(self):
+		for add_on in self.ADD_ONS:
+			frappe.get_doc({'doctype': 'Airplane Ticket Add-on Type', 'name': add_on}).db_insert()
+		frappe.get_doc({'doctype': 'Airplane', 'name': self.AIRPLANE, 'airline': self.AIRLINE}).db_insert()
+		frappe.get_doc({'doctype': 'Airplane Flight', 'name': self.FLIGHT, 'airplane': self.AIRPLANE}).db_insert()
+
+		tickets = [
+			# name, docstatus, add-ons
+			('_Test Addon Ticket 1', 1, [('_Test Addon Meal', 20), ('_Test Addon Bag', 50)]),
+			('_Test Addon Ticket 2', 1, [('_Test Addon Meal', 25)]),
+			('_Test Addon Ticket Cancelled', 2, [('_Test Addon Meal', 20)]),
+			('_Test Addon Ticket Draft', 0, [('_Test Addon Bag', 50)]),
+		]
+		for name, docstatus, add_ons in tickets:
+			frappe.get_doc({'doctype': 'Airplane Ticket', 'name': name, 'docstatus': docstatus, 'flight': self.FLIGHT}).db_insert()
+			for idx, (item, amount) in enumerate(add_ons, start=1):
+				frappe.get_doc({
+					'doctype': 'Airplane Ticket Add-on Item',
+					'name': f"{name} {idx}",
+					'parent': name,
+					'parenttype': 'Airplane Ticket',
+					'parentfield': 'add_ons',
+					'idx': idx,
+					'item': item,
+					'amount': amount,
+				}).db_insert()
+
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def sales(self, airline=AIRLINE):
+		rows = frappe.get_all('Airplane Ticket Add-on Sales', filters={'airline': airline, 'add_on': ['in', self.ADD_ONS]},
+			fields=['add_on', 'units_sold', 'revenue'])
+		return {row.add_on: (row.units_sold, row.revenue) for row in rows}
+
+	def test_record_ticket_on_submit_and_cancel(self):
+		"""Each add-on counts one unit and its amount for the flight's airline; cancelling takes it back out"""
+		ticket = frappe.get_doc({
+			'doctype': 'Airplane Ticket',
+			'flight': self.FLIGHT,
+			'add_ons': [{'item': '_Test Addon Meal', 'amount': 20}, {'item': '_Test Addon Bag', 'amount': 50}],
+		})
+
+		AirplaneTicketAddonSales.record_ticket(ticket)
+		self.assertEqual(self.sales(), {'_Test Addon Meal': (1, 20), '_Test Addon Bag': (1, 50)})
+
+		AirplaneTicketAddonSales.record_ticket(ticket, sign=-1)
+		self.assertEqual(self.sales(), {'_Test Addon Meal': (0, 0), '_Test Addon Bag': (0, 0)})
+
+	def test_rebuild(self):
+		"""Only submitted tickets count"""
+		AirplaneTicketAddonSales.rebuild()
+		self.assertEqual(self.sales(), {'_Test Addon Meal': (2, 45), '_Test Addon Bag': (1, 50)})
+
+	def test_rekey_airplane_moves_sales_to_new_airline(self):
+		"""Sales on an airplane's flights follow it to its new airline"""
+		AirplaneTicketAddonSales.rebuild()
+		airplane = frappe.get_doc('Airplane', self.AIRPLANE)
+		airplane._doc_before_save = frappe.copy_doc(airplane)
+		airplane.airline = self.NEW_AIRLINE
+
+		rekey_airplane(airplane)
+
+		self.assertEqual(self.sales(), {'_Test Addon Meal': (0, 0), '_Test Addon Bag': (0, 0)})
+		self.assertEqual(self.sales(self.NEW_AIRLINE), {'_Test Addon Meal': (2, 45), '_Test Addon Bag': (1, 50)})
+
+	def test_report_lists_add_ons_without_sales(self):
+		"""Add-on Popularity keeps a zero row for add-ons no ticket of the airline bought"""
+		from airplane_mode.airplane_mode.report.add_on_popularity.add_on_popularity import get_data
+
+		AirplaneTicketAddonSales.rebuild()
+		for airline in (self.AIRLINE, self.NEW_AIRLINE):
+			with self.subTest(airline=airline):
+				rows = {row.add_on: (row.sold_count, row.revenue) for row in get_data(frappe._dict(airline=airline))}
+				expected = {'_Test Addon Meal': (2, 45), '_Test Addon Bag': (1, 50)} if airline == self.AIRLINE else {}
+				for add_on in self.ADD_ONS:
+					self.assertEqual(rows[add_on], expected.get(add_on, (0, 0)))
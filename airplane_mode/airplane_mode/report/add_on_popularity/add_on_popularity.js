@@ -0,0 +1,13 @@
+// Copyright (c) 2024, Weaver Marquez and contributors
+// For license information, please see license.txt
+
+frappe.query_reports["Add-on Popularity"] = {
+	"filters": [
+		{
+			"fieldname": "airline",
+			"label": __("Airline"),
+			"fieldtype": "Link",
+			"options": "Airline",
+		},
+	]
+};
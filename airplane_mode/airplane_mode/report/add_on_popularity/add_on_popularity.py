@@ -0,0 +1,65 @@
+# Copyright (c) 2024, Weaver Marquez and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.query_builder import DocType
+from frappe.query_builder.functions import Coalesce, Sum
+from airplane_mode.utils import report_cache
+
+@report_cache.cached("Add-on Popularity", sources=["Airplane Ticket", "Airplane Ticket Add-on Type"])
+def execute(filters=None):
+	columns = get_columns()
+	data = get_data(frappe._dict(filters or {}))
+	return columns, data
+
+def get_data(filters):
+	"""Units sold and revenue per add-on type, from the Airplane Ticket Add-on Sales counters.
+
+	Every add-on type gets a row, even with no sales: the airline filter sits
+	in the left join's ON clause, not the WHERE clause."""
+	AddonType = DocType('Airplane Ticket Add-on Type')
+	Sales = DocType('Airplane Ticket Add-on Sales')
+
+	sales_on = Sales.add_on == AddonType.name
+	if filters.airline:
+		sales_on &= Sales.airline == filters.airline
+
+	query = (
+		frappe.qb
+		.from_(AddonType)
+		.left_join(Sales).on(sales_on)
+		.select(
+			AddonType.name.as_('add_on'),
+			Coalesce(Sum(Sales.units_sold), 0).as_('sold_count'),
+			Coalesce(Sum(Sales.revenue), 0).as_('revenue'),
+		)
+		.groupby(AddonType.name)
+		.orderby('sold_count', order=frappe.qb.desc)
+		.orderby(AddonType.name)
+	)
+
+	return query.run(as_dict=True)
+
+def get_columns():
+	columns = [
+		{
+			'label': 'Add-On Type',
+			'fieldtype': 'Link',
+			'fieldname': 'add_on',
+			'options': 'Airplane Ticket Add-on Type',
+			'width': 300
+		},
+		{
+			'label': 'Sold Count',
+			'fieldtype': 'Int',
+			'fieldname': 'sold_count',
+			'width': 150
+		},
+		{
+			'label': 'Revenue',
+			'fieldtype': 'Currency',
+			'fieldname': 'revenue',
+			'width': 150
+		}
+	]
+	return columns
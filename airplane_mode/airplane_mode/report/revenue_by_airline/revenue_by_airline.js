@@ -3,6 +3,25 @@
 
 frappe.query_reports["Revenue By Airline"] = {
 	"filters": [
+		{
+			"fieldname": "from_date",
+			"label": __("From Date"),
+			"fieldtype": "Date",
+		},
+		{
+			"fieldname": "to_date",
+			"label": __("To Date"),
+			"fieldtype": "Date",
+		},
+	],
 
-	]
+	onload: function (report) {
+		airplane_mode.add_background_export(report, [
+			{
+				fieldname: "ticket_detail",
+				label: __("One Row per Ticket"),
+				fieldtype: "Check",
+			},
+		]);
+	},
 };
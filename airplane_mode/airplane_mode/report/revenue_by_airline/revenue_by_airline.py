@@ -2,92 +2,94 @@
 # For license information, please see license.txt
 
 import frappe
+from frappe.query_builder import DocType
+from frappe.query_builder.functions import Coalesce, Sum
+from airplane_mode.utils import report_cache
 
+# Finance opens this report with the same few filters over and over.
+@report_cache.cached("Revenue By Airline", sources=["Airplane Ticket", "Airline"])
 def execute(filters=None):
+	filters = frappe._dict(filters or {})
+
+	publish_progress(10, "Summing revenue per airline")
 	columns = get_columns()
 	data = get_data(filters)
+
+	publish_progress(80, "Building chart and summary")
 	message = "OwO"
 	chart = get_chart(data)
 	report_summary = get_summary(data)
-	return columns, data, message, chart, report_summary
-
-def get_data(filters=None):
-	"""Finds total revenue for all Airlines from Airplane Tickets"""
-
-	airline_names = frappe.db.get_list('Airline', pluck='name')
-	data = []
-	for airline in airline_names:
-		revenue = get_revenue(airline, filters)
-		row = {'airline': airline, 'revenue': revenue}
 
-		data.append(row)
-
-	return data
-
-
-# Ah, but total_price is a Virtual Field. So, SQL calls don't work.
-# Get a list of Tickets
-# Ticket has flight
+	publish_progress(100, "Done")
+	return columns, data, message, chart, report_summary
 
-# What if we got a list of Flights
-# What if we got a list of Tickets grouped by Airline
-# flight has airplane
-# airplane has airline
+def publish_progress(percent, description):
+	frappe.publish_progress(percent, title="Revenue By Airline", description=description)
 
-def get_sql_call():
-	result = frappe.db.sql(
-		f"""
-		SELECT `path`,
-				COUNT(*) as count,
-				COUNT(CASE WHEN CAST(`is_unique` as Integer) = 1 THEN 1 END) as unique_count
-		FROM `tabWeb Page View`
-		WHERE `creation` BETWEEN {some_date} AND {some_later_date}
-		"""
-	)
-	pass
-
-def get_revenue(airline, filters=None):
-	"""For an Airline, grab the revenue"""
-
-	plane_names = get_airplanes_per_airline(airline, filters)
-	revenue = 0
-	for plane in plane_names:
-		flights = get_flights_per_airplane(plane)
-		for flight in flights:
-			revenue += get_revenue_per_flight(flight, filters)
-	return revenue
-
-def get_revenue_per_flight(flight, filters=None):
-	"""Return list of ticket revenues per Airplane Flight"""
-
-	if filters.booked:
-		# somehow affect the get_list
-		pass
-	flight_revenue = frappe.db.get_list('Airplane Ticket',
-		filters={'flight': flight}, # Tickets must be booked. 'docstatus': 1
-		pluck='total_amount'
+def get_data(filters=None):
+	"""Finds total revenue for all Airlines from the Airline Revenue Rollup of submitted tickets.
+
+	Airlines without rollup rows in range are kept by the left join, with the
+	date conditions in its ON clause, and report 0."""
+	return get_query(frappe._dict(filters or {})).run(as_dict=True)
+
+def get_query(filters):
+	Airline = DocType('Airline')
+	Rollup = DocType('Airline Revenue Rollup')
+
+	rollup_on = Rollup.airline == Airline.name
+	if filters.from_date:
+		rollup_on &= Rollup.departure_date >= filters.from_date
+	if filters.to_date:
+		rollup_on &= Rollup.departure_date <= filters.to_date
+
+	query = (
+		frappe.qb
+		.from_(Airline)
+		.left_join(Rollup).on(rollup_on)
+		.select(
+			Airline.name.as_('airline'),
+			Coalesce(Sum(Rollup.fare_revenue + Rollup.add_on_revenue), 0).as_('revenue'),
+		)
+		.groupby(Airline.name)
+		.orderby(Airline.name)
 	)
-	return sum(flight_revenue)
-
-def get_flights_per_airplane(airplane):
-	"""Returns a list of Airplane Flights that belong to an airplane"""
 
-	flights = frappe.db.get_list('Airplane Flight',
-		filters={'airplane': airplane},
-		pluck='name'
+	return query
+
+def get_export(filters):
+	"""Columns and query for airplane_mode.utils.export: the airline totals, or with
+	ticket_detail every submitted ticket behind them."""
+	if not filters.ticket_detail:
+		return get_columns(), get_query(filters)
+
+	Ticket = DocType('Airplane Ticket')
+	Flight = DocType('Airplane Flight')
+	Airplane = DocType('Airplane')
+
+	# Unordered, so the database can stream rows without sorting them all first.
+	query = (
+		frappe.qb
+		.from_(Ticket)
+		.join(Flight).on(Ticket.flight == Flight.name)
+		.left_join(Airplane).on(Flight.airplane == Airplane.name)
+		.select(
+			Ticket.name.as_('ticket'),
+			Airplane.airline,
+			Ticket.flight,
+			Ticket.departure_date,
+			Ticket.flight_price,
+			(Ticket.total_amount - Ticket.flight_price).as_('add_on_revenue'),
+			Ticket.total_amount,
+		)
+		.where(Ticket.docstatus == 1)
 	)
-	return flights
-	
+	if filters.from_date:
+		query = query.where(Ticket.departure_date >= filters.from_date)
+	if filters.to_date:
+		query = query.where(Ticket.departure_date <= filters.to_date)
 
-def get_airplanes_per_airline(airline, filters):
-	"""Returns a list of airplanes that belong to an airline."""
-
-	planes = frappe.db.get_list('Airplane',
-		filters={'airline': airline},
-		fields=['name', 'airline'],
-		pluck='name'
-	)
-	return planes
+	return get_ticket_columns(), query
 
 
 def get_columns():
@@ -108,6 +110,49 @@ def get_columns():
 	]
 	return columns
 
+def get_ticket_columns():
+	columns = [
+		{
+			'label': 'Ticket',
+			'fieldtype': 'Link',
+			'fieldname': 'ticket',
+			'options': 'Airplane Ticket',
+		},
+		{
+			'label': 'Airline',
+			'fieldtype': 'Link',
+			'fieldname': 'airline',
+			'options': 'Airline',
+		},
+		{
+			'label': 'Flight',
+			'fieldtype': 'Link',
+			'fieldname': 'flight',
+			'options': 'Airplane Flight',
+		},
+		{
+			'label': 'Departure Date',
+			'fieldtype': 'Date',
+			'fieldname': 'departure_date',
+		},
+		{
+			'label': 'Fare',
+			'fieldtype': 'Currency',
+			'fieldname': 'flight_price',
+		},
+		{
+			'label': 'Add-on Revenue',
+			'fieldtype': 'Currency',
+			'fieldname': 'add_on_revenue',
+		},
+		{
+			'label': 'Total Amount',
+			'fieldtype': 'Currency',
+			'fieldname': 'total_amount',
+		},
+	]
+	return columns
+
 def get_chart(data):
 	labels = [d.get('airline') for d in data]
 
@@ -122,7 +167,6 @@ def get_chart(data):
 def get_summary(data):
 	# Total Revenue
 	total_revenue = get_total_revenue_from_data(data)
-	frappe.errprint(total_revenue)
 
 	return [ {
 		"value": total_revenue,
@@ -0,0 +1,41 @@
+// Copyright (c) 2024, Weaver Marquez and contributors
+// For license information, please see license.txt
+
+frappe.query_reports["Revenue Drill-down"] = {
+	"filters": [
+		{
+			"fieldname": "bucket",
+			"label": __("Period"),
+			"fieldtype": "Select",
+			"options": ["Day", "Week", "Month"],
+			"default": "Month",
+			"reqd": 1,
+		},
+		{
+			"fieldname": "dimension",
+			"label": __("Group By"),
+			"fieldtype": "Select",
+			"options": ["Airline", "Route", "Airplane"],
+			"default": "Airline",
+			"reqd": 1,
+		},
+		{
+			"fieldname": "from_date",
+			"label": __("From Date"),
+			"fieldtype": "Date",
+			"default": frappe.datetime.add_months(frappe.datetime.get_today(), -12),
+		},
+		{
+			"fieldname": "to_date",
+			"label": __("To Date"),
+			"fieldtype": "Date",
+			"default": frappe.datetime.get_today(),
+		},
+		{
+			"fieldname": "airline",
+			"label": __("Airline"),
+			"fieldtype": "Link",
+			"options": "Airline",
+		},
+	]
+};
@@ -0,0 +1,171 @@
+# Copyright (c) 2024, Weaver Marquez and contributors
+# For license information, please see license.txt
+
+from collections import defaultdict
+
+import frappe
+from frappe.query_builder import DocType
+from frappe.query_builder.functions import Sum
+from pypika.functions import Concat
+from pypika.terms import Function
+from airplane_mode.airplane_mode.report.revenue_by_airline import revenue_by_airline
+from airplane_mode.utils import report_cache
+
+BUCKETS = ['Day', 'Week', 'Month']
+DIMENSIONS = {
+	# dimension: Link options of its column, or None for plain text
+	'Airline': 'Airline',
+	'Route': None,
+	'Airplane': 'Airplane',
+}
+CHART_SERIES_LIMIT = 10
+
+@report_cache.cached("Revenue Drill-down", sources=["Airplane Ticket"])
+def execute(filters=None):
+	filters = frappe._dict(filters or {})
+	columns = get_columns(filters)
+	data = get_data(filters)
+	message = None
+	chart = get_chart(get_series(data))
+	report_summary = get_summary(data)
+	return columns, data, message, chart, report_summary
+
+@frappe.whitelist()
+def get_revenue_series(filters: str | dict | None = None) -> dict:
+	"""Revenue per time bucket and dimension as {"labels": [...], "datasets": [...]},
+	ready to pass to a line chart.
+
+	Args:
+		filters: Same as the report: bucket, dimension, from_date, to_date, airline
+	"""
+	frappe.has_permission('Airline Revenue Rollup', 'read', throw=True)
+	filters = frappe.parse_json(filters) if isinstance(filters, str) else filters
+	return get_series(get_data(frappe._dict(filters or {})))
+
+def get_data(filters) -> list[dict]:
+	"""Ticket count and revenue per time bucket and dimension value, in one grouped
+	query over the Airline Revenue Rollup, ordered by bucket."""
+	Rollup = DocType('Airline Revenue Rollup')
+	bucket = get_bucket(filters.bucket, Rollup.departure_date).as_('bucket')
+	dimension = get_dimension(filters.dimension, Rollup).as_('dimension')
+
+	query = (
+		frappe.qb
+		.from_(Rollup)
+		.select(
+			bucket,
+			dimension,
+			Sum(Rollup.ticket_count).as_('ticket_count'),
+			Sum(Rollup.fare_revenue).as_('fare_revenue'),
+			Sum(Rollup.add_on_revenue).as_('add_on_revenue'),
+			Sum(Rollup.fare_revenue + Rollup.add_on_revenue).as_('revenue'),
+		)
+		.groupby(bucket, dimension)
+		.orderby(bucket)
+		.orderby(dimension)
+	)
+	if filters.from_date:
+		query = query.where(Rollup.departure_date >= filters.from_date)
+	if filters.to_date:
+		query = query.where(Rollup.departure_date <= filters.to_date)
+	if filters.airline:
+		query = query.where(Rollup.airline == filters.airline)
+
+	return query.run(as_dict=True)
+
+def get_bucket(bucket, date):
+	"""The first day of the bucket a date falls in. Weeks start on Monday."""
+	if bucket == 'Day':
+		return date
+	if bucket == 'Week':
+		return Function('SUBDATE', date, Function('WEEKDAY', date))
+	return Function('DATE_FORMAT', date, '%Y-%m-01')
+
+def get_dimension(dimension, Rollup):
+	if dimension == 'Route':
+		return Concat(Rollup.source_airport, ' - ', Rollup.destination_airport)
+	if dimension == 'Airplane':
+		return Rollup.airplane
+	return Rollup.airline
+
+def get_series(data, limit=CHART_SERIES_LIMIT) -> dict:
+	"""Pivot rows into one label per bucket and one dataset of revenues per dimension value.
+
+	Buckets where a value had no revenue get 0. Only the `limit` values with the
+	most revenue get a dataset, so a chart by route stays readable."""
+	labels = sorted({str(row.bucket) for row in data})
+	positions = {label: i for i, label in enumerate(labels)}
+
+	totals = defaultdict(float)
+	for row in data:
+		totals[row.dimension] += row.revenue or 0
+	top = sorted(totals, key=totals.get, reverse=True)[:limit]
+
+	values = {dimension: [0] * len(labels) for dimension in top}
+	for row in data:
+		if row.dimension in values:
+			values[row.dimension][positions[str(row.bucket)]] = row.revenue or 0
+
+	datasets = [{'name': dimension or 'Not Set', 'values': values[dimension]} for dimension in top]
+	return {'labels': labels, 'datasets': datasets}
+
+
+def get_columns(filters):
+	dimension = filters.dimension if filters.dimension in DIMENSIONS else 'Airline'
+	options = DIMENSIONS[dimension]
+	columns = [
+		{
+			'label': 'Period',
+			'fieldtype': 'Date',
+			'fieldname': 'bucket',
+			'width': 120
+		},
+		{
+			'label': dimension,
+			'fieldtype': 'Link' if options else 'Data',
+			'fieldname': 'dimension',
+			'options': options,
+			'width': 240
+		},
+		{
+			'label': 'Tickets',
+			'fieldtype': 'Int',
+			'fieldname': 'ticket_count',
+			'width': 100
+		},
+		{
+			'label': 'Fare Revenue',
+			'fieldtype': 'Currency',
+			'fieldname': 'fare_revenue',
+			'width': 150
+		},
+		{
+			'label': 'Add-on Revenue',
+			'fieldtype': 'Currency',
+			'fieldname': 'add_on_revenue',
+			'width': 150
+		},
+		{
+			'label': 'Revenue',
+			'fieldtype': 'Currency',
+			'fieldname': 'revenue',
+			'width': 150
+		}
+	]
+	return columns
+
+def get_chart(series):
+	chart = {'data': series}
+	chart['type'] = 'line'
+
+	return chart
+
+def get_summary(data):
+	ticket_count = sum(d.get('ticket_count') or 0 for d in data)
+
+	return revenue_by_airline.get_summary(data) + [ {
+		"value": ticket_count,
+		"indicator": "Blue",
+		"label": "Tickets Sold",
+		"datatype": "Int"
+	} ]
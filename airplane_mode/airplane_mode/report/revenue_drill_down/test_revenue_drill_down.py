@@ -0,0 +1,26 @@
+import unittest
+
+import frappe
+from airplane_mode.airplane_mode.report.revenue_drill_down.revenue_drill_down import get_series
+
+
+class TestRevenueDrillDown(unittest.TestCase):
+	def test_series_fills_missing_buckets_with_zero(self):
+		data = [
+			frappe._dict(bucket='2024-05-01', dimension='Air India', revenue=100),
+			frappe._dict(bucket='2024-06-01', dimension='Air India', revenue=150),
+			frappe._dict(bucket='2024-06-01', dimension='IndiGo', revenue=300),
+		]
+		series = get_series(data)
+
+		self.assertEqual(series['labels'], ['2024-05-01', '2024-06-01'])
+		self.assertEqual(series['datasets'], [
+			{'name': 'IndiGo', 'values': [0, 300]},
+			{'name': 'Air India', 'values': [100, 150]},
+		])
+
+	def test_series_keeps_the_highest_revenue_values(self):
+		data = [frappe._dict(bucket='2024-06-01', dimension=f'Route {i}', revenue=i) for i in range(5)]
+		series = get_series(data, limit=2)
+
+		self.assertEqual([d['name'] for d in series['datasets']], ['Route 4', 'Route 3'])
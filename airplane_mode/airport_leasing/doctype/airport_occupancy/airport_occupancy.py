@@ -0,0 +1,109 @@
+# Copyright (c) 2024, Weaver Marquez and contributors
+# For license information, please see license.txt
+
+from collections import defaultdict
+
+import frappe
+from frappe.model.document import Document
+from frappe.query_builder.functions import Count
+from airplane_mode.utils import report_cache, rollup
+
+
+class AirportOccupancy(Document):
+	"""Current room counts by status, shop count and vacancy rate of one airport.
+
+	Refreshed by Room.set_status whenever a room's status changes, and by Lease
+	events through lease_status.refresh_room whenever a room's leases do, so Vacancy
+	per Airport reads one row per airport instead of grouping every room and lease.
+	"""
+	# begin: auto-generated types
+	# This code is auto-generated. Do not modify anything in this block.
+
+	from typing import TYPE_CHECKING
+
+	if TYPE_CHECKING:
+		from frappe.types import DF
+
+		airport: DF.Link | None
+		available_rooms: DF.Int
+		maintenance_rooms: DF.Int
+		occupied_rooms: DF.Int
+		reserved_rooms: DF.Int
+		shop_count: DF.Int
+		total_rooms: DF.Int
+		vacancy_rate: DF.Percent
+	# end: auto-generated types
+
+	KEY_FIELDS = ['airport']
+	VALUE_FIELDS = ['available_rooms', 'reserved_rooms', 'occupied_rooms', 'maintenance_rooms',
+		'total_rooms', 'shop_count', 'vacancy_rate']
+	# Draft and Cancelled rooms are not counted.
+	STATUS_FIELDS = {
+		'Available': 'available_rooms',
+		'Reserved': 'reserved_rooms',
+		'Occupied': 'occupied_rooms',
+		'Maintenance': 'maintenance_rooms',
+	}
+
+	# ====================
+	# STATIC METHODS
+	# ====================
+
+	@staticmethod
+	def refresh(airport: str) -> None:
+		"""Recount one airport's snapshot."""
+		rows = AirportOccupancy.count(airport)
+		rollup.upsert('Airport Occupancy', AirportOccupancy.KEY_FIELDS, AirportOccupancy.VALUE_FIELDS, rows, increment=False)
+
+	@staticmethod
+	def rebuild() -> int:
+		"""Replace every airport's snapshot with a fresh count. Returns the row count."""
+		rows = AirportOccupancy.count()
+		frappe.db.delete('Airport Occupancy')
+		rollup.upsert('Airport Occupancy', AirportOccupancy.KEY_FIELDS, AirportOccupancy.VALUE_FIELDS, rows, increment=False)
+		report_cache.bump_version('Room')
+		return len(rows)
+
+	@staticmethod
+	def count(airport: str | None = None) -> list[dict]:
+		"""Snapshots of one airport, or all airports with rooms, from two grouped queries.
+
+		Rooms are counted by status alone: Room.set_status keeps Draft and Cancelled
+		in step with docstatus, and writes the new status before a submitting room's
+		docstatus reaches the database."""
+		Room = frappe.qb.DocType('Room')
+		Lease = frappe.qb.DocType('Lease')
+
+		rooms = (
+			frappe.qb.from_(Room)
+			.select(Room.airport, Room.status, Count(Room.name).as_('count'))
+			.where(Room.status.isin(list(AirportOccupancy.STATUS_FIELDS)))
+			.groupby(Room.airport, Room.status)
+		)
+		shops = (
+			frappe.qb.from_(Lease)
+			.join(Room).on(Lease.leasing_of == Room.name)
+			.select(Room.airport, Count(Lease.name).as_('count'))
+			.where(Lease.docstatus == 1)
+			.groupby(Room.airport)
+		)
+		if airport:
+			rooms = rooms.where(Room.airport == airport)
+			shops = shops.where(Room.airport == airport)
+
+		snapshots = defaultdict(lambda: dict.fromkeys(AirportOccupancy.VALUE_FIELDS, 0))
+		if airport:
+			# An airport whose last room went away still needs its zeros written.
+			snapshots[airport]
+		for row in rooms.run(as_dict=True):
+			snapshot = snapshots[row.airport]
+			snapshot[AirportOccupancy.STATUS_FIELDS[row.status]] = row.count
+			snapshot['total_rooms'] += row.count
+		for row in shops.run(as_dict=True):
+			snapshots[row.airport]['shop_count'] = row.count
+
+		for snapshot in snapshots.values():
+			vacant = snapshot['available_rooms'] + snapshot['reserved_rooms']
+			snapshot['vacancy_rate'] = 100 * vacant / snapshot['total_rooms'] if snapshot['total_rooms'] else 0
+
+		return [{'airport': name, **snapshot} for name, snapshot in snapshots.items()]
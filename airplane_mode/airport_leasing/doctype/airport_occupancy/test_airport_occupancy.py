@@ -0,0 +1,112 @@
+# Copyright (c) 2024, Weaver Marquez and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from airplane_mode.airport_leasing.doctype.airport_occupancy.airport_occupancy import AirportOccupancy
+
+
+def insert_rooms_and_leases(airport: str, prefix: str) -> None:
+	"""Rooms of every status at `airport` and leases on them, written with db_insert."""
+	rooms = [
+		# suffix, docstatus, status
+		('Available', 1, 'Available'),
+		('Reserved', 1, 'Reserved'),
+		('Occupied', 1, 'Occupied'),
+		('Occupied Twice', 1, 'Occupied'),
+		('Maintenance', 1, 'Maintenance'),
+		('Draft', 0, 'Draft'),
+	]
+	for suffix, docstatus, status in rooms:
+		frappe.get_doc({
+			'doctype': 'Room',
+			'name': f"{prefix} {suffix}",
+			'docstatus': docstatus,
+			'airport': airport,
+			'status': status,
+		}).db_insert()
+
+	leases = [
+		# suffix, room suffix, docstatus
+		('1', 'Occupied', 1),
+		('2', 'Occupied Twice', 1),
+		('3', 'Occupied Twice', 1),
+		('Draft', 'Reserved', 0),
+		('Cancelled', 'Available', 2),
+	]
+	for suffix, room, docstatus in leases:
+		frappe.get_doc({
+			'doctype': 'Lease',
+			'name': f"{prefix} Lease {suffix}",
+			'docstatus': docstatus,
+			'leasing_of': f"{prefix} {room}",
+			'leased_from': 'TEST_COMPANY',
+			'leased_to': 'TEST_SHOP',
+			'start_date': '2024-01-01',
+			'end_date': '2024-12-31',
+			'period_length': 'Monthly',
+		}).db_insert()
+
+
+class TestAirportOccupancy(FrappeTestCase):
+	"""AirportOccupancy against real Room and Lease rows, written with db_insert."""
+
+	AIRPORT = '_Test Occupancy Airport'
+	PREFIX = '_Test Occupancy Room'
+
+	def setUp(self):
+		insert_rooms_and_leases(self.AIRPORT, self.PREFIX)
+
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def snapshot(self, airport):
+		return frappe.db.get_value('Airport Occupancy', {'airport': airport}, AirportOccupancy.VALUE_FIELDS, as_dict=True)
+
+	def test_count(self):
+		"""Rooms by status, without Draft ones, and shops as submitted leases"""
+		(snapshot,) = AirportOccupancy.count(self.AIRPORT)
+
+		self.assertEqual(snapshot, {
+			'airport': self.AIRPORT,
+			'available_rooms': 1,
+			'reserved_rooms': 1,
+			'occupied_rooms': 2,
+			'maintenance_rooms': 1,
+			'total_rooms': 5,
+			'shop_count': 3,
+			'vacancy_rate': 40,
+		})
+
+	def test_count_airport_without_rooms(self):
+		"""An airport whose last room went away still gets its zeros"""
+		(snapshot,) = AirportOccupancy.count('_Test Occupancy Empty Airport')
+		self.assertEqual(snapshot['total_rooms'], 0)
+		self.assertEqual(snapshot['vacancy_rate'], 0)
+
+	def test_refresh_overwrites_snapshot(self):
+		AirportOccupancy.refresh(self.AIRPORT)
+		self.assertEqual(self.snapshot(self.AIRPORT).occupied_rooms, 2)
+
+		frappe.db.set_value('Room', f"{self.PREFIX} Available", 'status', 'Occupied', update_modified=False)
+		AirportOccupancy.refresh(self.AIRPORT)
+
+		snapshot = self.snapshot(self.AIRPORT)
+		self.assertEqual((snapshot.available_rooms, snapshot.occupied_rooms), (0, 3))
+		self.assertEqual(frappe.db.count('Airport Occupancy', {'airport': self.AIRPORT}), 1)
+
+	def test_lease_events_refresh_shop_count_of_unchanged_room(self):
+		"""A second lease on an Occupied room changes no room status, but does change the shop count"""
+		from airplane_mode.airport_leasing.doctype.lease import lease_status
+		from airplane_mode.airport_leasing.doctype.room.room import Room
+
+		room = f"{self.PREFIX} Occupied Twice"
+		frappe.db.set_value('Room', room, 'submitted_leases', 2, update_modified=False)
+		AirportOccupancy.refresh(self.AIRPORT)
+
+		frappe.db.set_value('Lease', f"{self.PREFIX} Lease 3", 'docstatus', 2, update_modified=False)
+		Room.add_to_lease_counts(room, submitted=-1)
+		lease_status.refresh_room(room)
+
+		self.assertEqual(frappe.db.get_value('Room', room, 'status'), 'Occupied')
+		self.assertEqual(self.snapshot(self.AIRPORT).shop_count, 2)
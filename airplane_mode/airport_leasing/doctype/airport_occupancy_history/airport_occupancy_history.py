@@ -0,0 +1,57 @@
+# Copyright (c) 2024, Weaver Marquez and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+from airplane_mode.airport_leasing.doctype.airport_occupancy.airport_occupancy import AirportOccupancy
+from airplane_mode.utils import report_cache, rollup
+
+
+class AirportOccupancyHistory(Document):
+	"""An Airport Occupancy snapshot as it stood on one day, for vacancy trends."""
+	# begin: auto-generated types
+	# This code is auto-generated. Do not modify anything in this block.
+
+	from typing import TYPE_CHECKING
+
+	if TYPE_CHECKING:
+		from frappe.types import DF
+
+		airport: DF.Link | None
+		available_rooms: DF.Int
+		date: DF.Date | None
+		maintenance_rooms: DF.Int
+		occupied_rooms: DF.Int
+		reserved_rooms: DF.Int
+		shop_count: DF.Int
+		total_rooms: DF.Int
+		vacancy_rate: DF.Percent
+	# end: auto-generated types
+
+	KEY_FIELDS = ['airport', 'date']
+
+	# ====================
+	# STATIC METHODS
+	# ====================
+
+	@staticmethod
+	def record(date: str | None = None) -> int:
+		"""Copy every airport's current snapshot into the history of `date`, today by default.
+		Running it again on the same day overwrites that day's rows. Returns the row count."""
+		date = date or frappe.utils.today()
+		snapshots = frappe.get_all('Airport Occupancy', fields=AirportOccupancy.KEY_FIELDS + AirportOccupancy.VALUE_FIELDS)
+		rows = [{**snapshot, 'date': date} for snapshot in snapshots]
+		rollup.upsert('Airport Occupancy History', AirportOccupancyHistory.KEY_FIELDS, AirportOccupancy.VALUE_FIELDS, rows, increment=False)
+		report_cache.bump_version('Airport Occupancy History')
+		return len(rows)
+
+
+def record_daily() -> None:
+	"""Recount the snapshots, so no drift reaches the history, then record today's."""
+	AirportOccupancy.rebuild()
+	AirportOccupancyHistory.record()
+
+
+def on_doctype_update():
+	# Serves Vacancy Trend: a range of dates, optionally for one airport.
+	frappe.db.add_index("Airport Occupancy History", ["date", "airport"])
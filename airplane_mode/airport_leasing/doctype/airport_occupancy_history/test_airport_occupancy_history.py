@@ -0,0 +1,44 @@
+# Copyright (c) 2024, Weaver Marquez and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from airplane_mode.airport_leasing.doctype.airport_occupancy.test_airport_occupancy import insert_rooms_and_leases
+from airplane_mode.airport_leasing.doctype.airport_occupancy_history.airport_occupancy_history import record_daily
+
+
+class TestAirportOccupancyHistory(FrappeTestCase):
+	"""record_daily against real Room and Lease rows, written with db_insert."""
+
+	AIRPORT = '_Test History Airport'
+
+	def setUp(self):
+		insert_rooms_and_leases(self.AIRPORT, '_Test History Room')
+
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def history(self):
+		return frappe.get_all('Airport Occupancy History',
+			filters={'airport': self.AIRPORT, 'date': frappe.utils.today()},
+			fields=['occupied_rooms', 'shop_count', 'total_rooms'])
+
+	def test_record_daily_recounts_then_records(self):
+		"""A stale snapshot is recounted before it reaches the history"""
+		frappe.get_doc({
+			'doctype': 'Airport Occupancy',
+			'airport': self.AIRPORT,
+			'occupied_rooms': 99,
+			'shop_count': 99,
+		}).db_insert()
+
+		record_daily()
+
+		self.assertEqual(self.history(), [{'occupied_rooms': 2, 'shop_count': 3, 'total_rooms': 5}])
+
+	def test_record_daily_again_overwrites_the_day(self):
+		record_daily()
+		frappe.db.set_value('Room', '_Test History Room Available', 'status', 'Occupied', update_modified=False)
+		record_daily()
+
+		self.assertEqual(self.history(), [{'occupied_rooms': 3, 'shop_count': 3, 'total_rooms': 5}])
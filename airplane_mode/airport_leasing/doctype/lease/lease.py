@@ -3,8 +3,13 @@
 
 from __future__ import annotations
 import frappe
+import functools
 import json
+import traceback
+from collections import defaultdict
 from frappe.model.document import Document
+from frappe.query_builder.functions import Sum
+from airplane_mode.airport_leasing.doctype.lease import lease_status
 from typing import Optional, List, Dict, Any, Tuple, Callable
 from typing import (TypeAlias, TYPE_CHECKING)
 
@@ -16,11 +21,18 @@ if TYPE_CHECKING:
 	# Room: TypeAlias = 'frappe.types.Document'
 
 class Lease(Document):
+	"""A shop's lease of a room, invoiced per period.
+
+	total_owing, total_paid and outstanding_balance are stored, and kept up to date
+	by Sales Invoice and Payment Entry events through add_to_balances.
+	"""
 	RENEWAL_BUFFER_DAYS = 14
 	PERIOD_WEEKS = {
 		'Monthly': 4,
 		'Quarterly': 12
 	}
+	# Outstanding is always owing less paid, as both the hooks and rebuild_balances keep it.
+	BALANCE_FIELDS = ['total_owing', 'total_paid', 'outstanding_balance']
 	# begin: auto-generated types
 	# This code is auto-generated. Do not modify anything in this block.
 
@@ -32,6 +44,7 @@ class Lease(Document):
 		from frappe.types import DF
 
 		amended_from: DF.Link | None
+		autorenew_date: DF.Date | None
 		discounted_rental_rate: DF.Currency
 		end_date: DF.Date
 		leased_from: DF.Link
@@ -43,6 +56,7 @@ class Lease(Document):
 		period_length: DF.Literal["Monthly", "Quarterly"]
 		periods: DF.Table[LeasePeriod]
 		rental_rate: DF.Currency
+		reminder_month: DF.Date | None
 		start_date: DF.Date
 		status: DF.Literal["Draft", "Submitted", "Active", "Overdue", "Offboarding", "Terminated", "Cancelled"]
 		total_owing: DF.Currency
@@ -91,8 +105,6 @@ class Lease(Document):
 		Lease._validate_from_to(earliest_backdate, self.start_date)
 
 	def validate(self) -> None:
-		room: Room = frappe.get_doc('Room', self.leasing_of)
-
 		self._validate_room_status()
 		self.validate_from_to_dates('start_date', 'end_date')
 		self._validate_minimum_one_period()
@@ -104,46 +116,38 @@ class Lease(Document):
 		"""Upon finalizing Lease, start the first Lease Period"""
 		self._validate_room_status(on_submit=True)
 		self.next_period()
+		self.load_balances()
 
-	def on_submit(self) -> None:
-		room = frappe.get_doc('Room', self.leasing_of)
-		room.set_status(update=True)
+	def before_update_after_submit(self) -> None:
+		self.load_balances()
+
+	def after_insert(self) -> None:
+		if self.docstatus == 0:
+			self._count_on_room(self.leasing_of, draft=1)
 
-	def on_update_after_submit(self) -> None:
-		# NOTE You can also use: validate_table_has_rows
-		room = frappe.get_doc('Room', self.leasing_of)
-		room.set_status(update=True)
+	def on_update(self) -> None:
+		"""A draft moved to another room leaves the old one's count."""
+		if self.flags.in_insert or not self.has_value_changed('leasing_of'):
+			return
+		self._count_on_room(self.get_doc_before_save().leasing_of, draft=-1)
+		self._count_on_room(self.leasing_of, draft=1)
+
+	def on_submit(self) -> None:
+		# A lease inserted already submitted was never counted as a draft.
+		self._count_on_room(self.leasing_of, draft=0 if self.flags.in_insert else -1, submitted=1)
 	
 	def on_cancel(self) -> None:
-		room = frappe.get_doc('Room', self.leasing_of)
-		room.set_status(update=True)
+		self._count_on_room(self.leasing_of, submitted=-1)
 
-	@property
-	def total_owing(self) -> DF.Currency:
-		periods = self.get_all_children('Lease Period')
-		total_owing = sum(frappe.get_cached_value('Sales Invoice', 
-							  period.invoice, 'grand_total') 
-							  for period in periods if period.invoice)
-		
-		return total_owing
-
-	@property
-	def total_paid(self) -> DF.Currency:
-		payments = self.get_all_children('Lease Payment')
-		total_paid = sum(frappe.get_cached_value('Payment Entry', 
-							  payment.payment_entry, 'paid_amount') 
-							  for payment in payments if payment.payment_entry)
-		return total_paid
+	def on_trash(self) -> None:
+		if self.docstatus == 0:
+			self._count_on_room(self.leasing_of, draft=-1)
 
-	@property
-	def outstanding_balance(self):
-		periods = self.get_all_children('Lease Period')
-		total_outstanding = sum(frappe.get_cached_value('Sales Invoice', 
-							  period.invoice, 'outstanding_amount') 
-							  for period in periods if period.invoice)
-		
-		return total_outstanding
-		# return self.total_owing - self.total_paid
+	def _count_on_room(self, room: str, *, draft: int = 0, submitted: int = 0) -> None:
+		"""Add to the room's stored lease counts, by docstatus, and refresh its status."""
+		from airplane_mode.airport_leasing.doctype.room.room import Room
+		Room.add_to_lease_counts(room, draft=draft, submitted=submitted)
+		lease_status.refresh_room(room)
 
 	@property
 	def rental_rate(self) -> float:
@@ -161,6 +165,18 @@ class Lease(Document):
 		# self.save()
 		# This will cause the "Saved after opening Error.""
 
+	def load_balances(self) -> None:
+		"""Read the stored balances back before this save writes the whole row, since
+		invoices and payments made during the save have added to them in the database."""
+		if not self.is_new():
+			self.update(frappe.db.get_value('Lease', self.name, Lease.BALANCE_FIELDS, as_dict=True) or {})
+
+	def add_period(self, period: LeasePeriod) -> None:
+		"""Append a period begun outside next_period, e.g. by LeasePeriod.next_periods, and save."""
+		self.append('periods', period)
+		self.next_date = Lease.next_renew_date(self)
+		self.save()
+
 	def auto_rental_rate(self) -> float:
 		"""Rental rates from most to least important priority:
 		1. User-set discounted rate in Lease
@@ -258,6 +274,8 @@ class Lease(Document):
 		Args:
 			update (bool): If True, updates the status in the database
 		"""
+		previous_status = self.status
+
 		if not self.docstatus.is_submitted():
 			if status:
 				self.status = status
@@ -277,9 +295,9 @@ class Lease(Document):
 		if status:
 			self.status = status
 
-		frappe.log_error(f'set_status({self.status}, {status}, {update})')
-		if update:
-			self.db_set("status", self.status, update_modified=update_modified, notify=True, commit=True)
+		lease_status.trace("Lease %s: %s -> %s (requested %s, update %s)", self.name, previous_status, self.status, status, update)
+		if update and self.status != previous_status:
+			self.db_set("status", self.status, update_modified=update_modified, notify=True)
 
 
 	# ==================== 
@@ -307,24 +325,34 @@ class Lease(Document):
 		else:
 			lease = doc
 
-		today = frappe.utils.today()
-
 		lease.set_status(update_modified=False)
 
+		action = Lease.renewal_action(lease)
+		if action == 'next_period':
+			return lease.next_period()
+		elif action:
+			return lease.set_status(status=action, update=True)
+
+	@staticmethod
+	def renewal_action(lease: Lease) -> Optional[str]:
+		"""What autorenew does to a lease today: 'next_period', a new status
+		('Terminated' or 'Offboarding'), or None when the lease is not due."""
+		today = frappe.utils.today()
+
 		# NOTE I can pre-filter all the leases in the daily scan, so this may be redundant.
 		if any((lease.next_date != today, lease.docstatus.is_draft(), lease.docstatus.is_cancelled())):
-			return
-		
+			return None
+
 		ends_today = lease.end_date == today
 		expiring_soon = Lease.calculate_renewal_buffer(lease.end_date) <= today
 
 		if ends_today:
 			# TODO Handle offboarding logic here if needed
-			return lease.set_status(status='Terminated', update=True)
+			return 'Terminated'
 		elif expiring_soon:
-			return lease.set_status(status='Offboarding', update=True)
+			return 'Offboarding'
 		else:
-			return lease.next_period()
+			return 'next_period'
 
 
 	@staticmethod
@@ -357,6 +385,61 @@ class Lease(Document):
 		renewal_date = max(today, renewal_buffer)
 		return min(lease.end_date, renewal_date)
 
+	@staticmethod
+	def add_to_balances(lease: str, *, owing: float = 0, paid: float = 0, outstanding: float = 0) -> None:
+		"""Add amounts to a lease's stored balances in one UPDATE, without reading them first."""
+		Table = frappe.qb.DocType('Lease')
+		(
+			frappe.qb.update(Table)
+			.set(Table.total_owing, Table.total_owing + owing)
+			.set(Table.total_paid, Table.total_paid + paid)
+			.set(Table.outstanding_balance, Table.outstanding_balance + outstanding)
+			.where(Table.name == lease)
+		).run()
+
+	@staticmethod
+	def rebuild_balances() -> int:
+		"""Recompute every lease's balances from its submitted period invoices and the
+		payments allocated to them, outstanding being owing less paid as the hooks keep it.
+		Returns the number of leases with any."""
+		Period = frappe.qb.DocType('Lease Period')
+		Invoice = frappe.qb.DocType('Sales Invoice')
+		Payment = frappe.qb.DocType('Payment Entry')
+		Reference = frappe.qb.DocType('Payment Entry Reference')
+		Table = frappe.qb.DocType('Lease')
+
+		owed = (
+			frappe.qb.from_(Period)
+			.join(Invoice).on(Period.invoice == Invoice.name)
+			.select(Period.parent.as_('lease'), Sum(Invoice.grand_total).as_('total_owing'))
+			.where(Period.parenttype == 'Lease')
+			.where(Invoice.docstatus == 1)
+			.groupby(Period.parent)
+		)
+		paid = (
+			frappe.qb.from_(Reference)
+			.join(Payment).on(Reference.parent == Payment.name)
+			.join(Period).on((Period.invoice == Reference.reference_name) & (Period.parenttype == 'Lease'))
+			.select(Period.parent.as_('lease'), Sum(Reference.allocated_amount).as_('total_paid'))
+			.where(Reference.reference_doctype == 'Sales Invoice')
+			.where(Payment.docstatus == 1)
+			.groupby(Period.parent)
+		)
+
+		balances = defaultdict(lambda: dict.fromkeys(Lease.BALANCE_FIELDS, 0))
+		for query in (owed, paid):
+			for row in query.run(as_dict=True):
+				balances[row.pop('lease')].update(row)
+		for values in balances.values():
+			values['outstanding_balance'] = values['total_owing'] - values['total_paid']
+
+		reset = frappe.qb.update(Table)
+		for field in Lease.BALANCE_FIELDS:
+			reset = reset.set(Table[field], 0)
+		reset.run()
+		for lease, values in balances.items():
+			frappe.db.set_value('Lease', lease, values, update_modified=False)
+		return len(balances)
 
 
 @frappe.whitelist()
@@ -387,31 +470,233 @@ def get_filtered_child_rows(doctype, txt, searchfield, start, page_len, filters)
 
 	return query.run(as_dict=False)
 
+# ====================
+# AUTORENEW
+# ====================
+
+AUTORENEW_CHUNK_SIZE = 100
+
 def autorenew_daily() -> None:
-	"""Run autorenew on all Submitted leases daily"""
-	pluck = 'name'
-	filters = [
-		["docstatus", '=', 1], 
-		["next_date", '=', frappe.utils.today()],
-	]
+	"""Queue today's due leases for autorenew in background chunks."""
+	enqueue_autorenew()
+
+def resume_autorenew() -> None:
+	"""Hourly: queue again any lease not yet processed today, e.g. after a worker died mid-chunk."""
+	enqueue_autorenew()
+
+def enqueue_autorenew() -> int:
+	"""Queue one job per AUTORENEW_CHUNK_SIZE due leases. Returns the number of jobs.
+
+	The cursor is the data itself: a lease stays due until its chunk commits its
+	autorenew_date stamp, so queueing again only picks up unfinished leases."""
+	today = frappe.utils.today()
+	due = autorenew_due(today)
+
+	chunks = list(frappe.utils.create_batch(due, AUTORENEW_CHUNK_SIZE))
+	for chunk in chunks:
+		frappe.enqueue(
+			'airplane_mode.airport_leasing.doctype.lease.lease.autorenew_chunk',
+			queue='long',
+			# A chunk still queued from an earlier run is not queued twice.
+			job_id=f"autorenew:{today}:{chunk[0]}:{chunk[-1]}",
+			deduplicate=True,
+			leases=chunk,
+			date=today,
+		)
+	return len(chunks)
+
+def autorenew_due(date: str) -> list[str]:
+	"""Names of the leases autorenew still has to process on this date."""
+	Table = frappe.qb.DocType('Lease')
+	return (
+		frappe.qb.from_(Table)
+		.select(Table.name)
+		.where(Table.docstatus == 1)
+		.where(Table.next_date == date)
+		.where(Table.status != 'Terminated')
+		.where(Table.autorenew_date.isnull() | (Table.autorenew_date < date))
+		.orderby(Table.name)
+	).run(pluck=True)
+
+def autorenew_chunk(leases: list[str], date: str) -> None:
+	"""Autorenew a chunk of leases and commit them together.
+
+	The leases still due are locked first, skipping any another worker holds, so
+	overlapping chunks never renew a lease twice. Each lease's status and renewal
+	decision runs under its own savepoint, and new periods are invoiced as one
+	batch; a lease that fails either step is rolled back and logged, and the rest
+	carry on.
+	Every claimed lease is stamped with autorenew_date in the same commit, so one
+	that failed or only changed status is processed once a day, not on every
+	hourly resume."""
+	if date != frappe.utils.today():
+		# Queued yesterday; today's run has its own chunks.
+		return
+
+	Table = frappe.qb.DocType('Lease')
+	claimed = (
+		frappe.qb.from_(Table)
+		.select(Table.name)
+		.where(Table.name.isin(leases))
+		.where(Table.docstatus == 1)
+		.where(Table.next_date == date)
+		.where(Table.autorenew_date.isnull() | (Table.autorenew_date < date))
+		.for_update(skip_locked=True)
+	).run(pluck=True)
+
+	from airplane_mode.airport_leasing.doctype.lease_period.lease_period import LeasePeriod
+
+	# Rooms of the saved leases are recounted once, when the batch ends.
+	with lease_status.batch():
+		renewing, results = [], {}
+		for idx, lease_name in enumerate(claimed):
+			# By position, as in LeasePeriod.next_periods.
+			savepoint = f"autorenew_{idx}"
+			try:
+				frappe.db.savepoint(savepoint)
+				lease: Lease = frappe.get_doc('Lease', lease_name)
+				lease.set_status(update_modified=False)
+				action = Lease.renewal_action(lease)
+				if action == 'next_period':
+					renewing.append(lease)
+				elif action:
+					lease.set_status(status=action, update=True)
+			except Exception as e:
+				frappe.db.rollback(save_point=savepoint)
+				results[lease_name] = e
+
+		results.update(LeasePeriod.next_periods(renewing, on_period=Lease.add_period))
+
+	for lease_name, result in results.items():
+		if isinstance(result, Exception):
+			frappe.log_error(
+				title=f"Autorenew failed for Lease {lease_name}",
+				message="".join(traceback.format_exception(result)),
+				reference_doctype='Lease',
+				reference_name=lease_name,
+			)
+
+	if claimed:
+		frappe.qb.update(Table).set(Table.autorenew_date, date).where(Table.name.isin(claimed)).run()
+	frappe.db.commit()
+
+# ====================
+# REMINDERS
+# ====================
 
-	for lease_name in frappe.get_all("Lease", pluck=pluck, filters=filters):
-		lease: Lease = frappe.get_doc('Lease', lease_name)
-		Lease.autorenew(lease)
+REMINDER_NOTIFICATION = 'Monthly Rent Reminder'
+REMINDER_BATCH_SIZE = 500
 
 def send_reminder_monthly() -> None:
-	"""Check lease rent reminders to be sent monthly"""
-	enabled = frappe.get_single('Airport Leasing Settings').enable_payment_reminders
-	if not enabled:
+	"""Queue this month's rent reminder to every tenant whose lease has an outstanding balance.
+
+	Rendered from the Monthly Rent Reminder notification's subject and message, compiled
+	once. Each batch's emails and reminder_month stamps commit together, so a retried run
+	only reaches the leases not yet reminded this month."""
+	if not frappe.db.get_single_value('Airport Leasing Settings', 'enable_payment_reminders'):
+		return
+	notification = frappe.get_cached_doc('Notification', REMINDER_NOTIFICATION)
+	if not notification.enabled:
 		return
 
-	pluck = 'name'
-	filters = [
-		["docstatus", '=', 1], 
-		# ['outstanding_balance', ">", 0], 
-		# NOTE I could use status == Overdue. But frankly just every active lease is fine.
-	]
+	month = frappe.utils.get_first_day(frappe.utils.today())
+	subject = compile_template(notification.subject)
+	message = compile_template(notification.message)
+	Table = frappe.qb.DocType('Lease')
+
+	for batch in frappe.utils.create_batch(reminders_due(month), REMINDER_BATCH_SIZE):
+		for lease in batch:
+			body = message.render(doc=lease)
+			frappe.sendmail(
+				recipients=[lease.email_id],
+				subject=subject.render(doc=lease),
+				message=frappe.utils.md_to_html(body) if notification.message_type == 'Markdown' else body,
+				reference_doctype='Lease',
+				reference_name=lease.name,
+			)
+		frappe.qb.update(Table).set(Table.reminder_month, month).where(Table.name.isin([lease.name for lease in batch])).run()
+		frappe.db.commit()
+
+def reminders_due(month) -> list[frappe._dict]:
+	"""Submitted leases with an outstanding balance and no reminder yet in `month`,
+	with the fields the reminder shows and the email of the customer owning their shop."""
+	Lease = frappe.qb.DocType('Lease')
+	Shop = frappe.qb.DocType('Shop')
+	Customer = frappe.qb.DocType('Customer')
+	return (
+		frappe.qb.from_(Lease)
+		.join(Shop).on(Lease.leased_to == Shop.name)
+		.join(Customer).on(Shop.owned_by == Customer.name)
+		.select(
+			Lease.name, Lease.leased_to, Lease.leased_from, Lease.leasing_of, Lease.status,
+			Lease.outstanding_balance, Lease.next_date, Lease.end_date, Customer.email_id,
+		)
+		.where(Lease.docstatus == 1)
+		.where(Lease.outstanding_balance > 0)
+		.where(Lease.reminder_month.isnull() | (Lease.reminder_month < month))
+		.where(Customer.email_id.notnull() & (Customer.email_id != ''))
+		.orderby(Lease.name)
+	).run(as_dict=True)
+
+@functools.lru_cache(maxsize=16)
+def compile_template(source: str):
+	"""Jinja template for `source`, compiled once per worker."""
+	return frappe.get_jenv().from_string(source)
+
+
+# ====================
+# BALANCES
+# ====================
+
+MAX_BALANCE_LEASES = 500
+
+@frappe.whitelist()
+def get_balances(leases: str | list) -> dict[str, dict]:
+	"""Balances and latest period status of many leases in two queries, keyed by lease name.
+	For list views and dashboards, instead of loading each lease.
+
+	Args:
+		leases: List of up to MAX_BALANCE_LEASES Lease names, or its JSON
+	"""
+	from airplane_mode.airport_leasing.doctype.lease_period.lease_period import LeasePeriod
+	names = frappe.parse_json(leases) if isinstance(leases, str) else leases
+	if not names:
+		return {}
+	if len(names) > MAX_BALANCE_LEASES:
+		frappe.throw(f"Balances can be read for at most {MAX_BALANCE_LEASES} leases at a time.")
+
+	rows = frappe.get_list('Lease', filters={'name': ['in', names]}, fields=['name', *Lease.BALANCE_FIELDS], limit=len(names))
+	balances = {row.name: row for row in rows}
+	if not balances:
+		return {}
+
+	statuses = LeasePeriod.latest_statuses(list(balances))
+	for name, row in balances.items():
+		row.latest_period_status = statuses.get(name)
+	return balances
+
+def update_invoice_balances(doc, method=None) -> None:
+	"""doc_events hook for Sales Invoice, on submit and cancel: the whole invoice is owing,
+	and outstanding until payments are allocated to it."""
+	from airplane_mode.airport_leasing.doctype.lease_period.lease_period import LeasePeriod
+	lease = LeasePeriod.invoice_lease(doc)
+	if not lease:
+		return
+
+	sign = -1 if method == 'on_cancel' else 1
+	Lease.add_to_balances(lease, owing=sign * doc.grand_total, outstanding=sign * doc.grand_total)
+
+def update_payment_balances(doc, method=None) -> None:
+	"""doc_events hook for Payment Entry, on submit and cancel: payments allocated to
+	lease invoices are paid, and no longer outstanding."""
+	from airplane_mode.airport_leasing.doctype.lease_period.lease_period import LeasePeriod
+	invoices = [ref for ref in doc.references if ref.reference_doctype == 'Sales Invoice']
+	if not invoices:
+		return
 
-	for lease_name in frappe.get_all("Lease", pluck=pluck, filters=filters):
-		lease: Lease = frappe.get_doc('Lease', lease_name)
-		lease.send_reminder(with_hooks=True)
\ No newline at end of file
+	leases = LeasePeriod.invoice_leases([ref.reference_name for ref in invoices])
+	sign = -1 if method == 'on_cancel' else 1
+	for ref in invoices:
+		if ref.reference_name in leases:
+			amount = sign * ref.allocated_amount
+			Lease.add_to_balances(leases[ref.reference_name], paid=amount, outstanding=-amount)
@@ -0,0 +1,50 @@
+// Copyright (c) 2024, Weaver Marquez and contributors
+// For license information, please see license.txt
+
+const PERIOD_STATUS_COLORS = {
+	Draft: "gray",
+	Paid: "green",
+	Unpaid: "orange",
+	"Partly Paid": "orange",
+	Overdue: "red",
+	"Partly Paid and Overdue": "red",
+	Cancelled: "red",
+};
+
+// Names per get_balances call, as capped by MAX_BALANCE_LEASES in lease.py.
+const BALANCE_BATCH_SIZE = 500;
+
+frappe.listview_settings["Lease"] = {
+	// Shows each lease's latest period status, with its balances on hover,
+	// fetched for the whole page in a call per 500 leases rather than per lease.
+	refresh(listview) {
+		const names = listview.data.map((doc) => doc.name);
+		for (let start = 0; start < names.length; start += BALANCE_BATCH_SIZE) {
+			const batch = names.slice(start, start + BALANCE_BATCH_SIZE);
+			frappe
+				.xcall("airplane_mode.airport_leasing.doctype.lease.lease.get_balances", { leases: batch })
+				.then((balances) => show_balances(listview, balances));
+		}
+	},
+};
+
+function show_balances(listview, balances) {
+	for (const [name, balance] of Object.entries(balances)) {
+		const $row = listview.$result
+			.find(`.list-row-checkbox[data-name="${CSS.escape(name)}"]`)
+			.closest(".list-row");
+		$row.find(".lease-balance").remove();
+		if (!balance.latest_period_status) continue;
+
+		const title = [
+			`${__("Owing")}: ${format_currency(balance.total_owing)}`,
+			`${__("Paid")}: ${format_currency(balance.total_paid)}`,
+			`${__("Outstanding")}: ${format_currency(balance.outstanding_balance)}`,
+		].join("\n");
+		const color = PERIOD_STATUS_COLORS[balance.latest_period_status] || "blue";
+		$(`<span class="lease-balance indicator-pill ${color} ellipsis"></span>`)
+			.text(__(balance.latest_period_status))
+			.attr("title", title)
+			.prependTo($row.find(".list-row-activity"));
+	}
+}
@@ -0,0 +1,209 @@
+# Copyright (c) 2024, Weaver Marquez and contributors
+# For license information, please see license.txt
+
+"""Lease and Room statuses for any set of documents, computed in bulk.
+
+Lease.set_status and Room.set_status work on one document in memory, during its
+own save. This recomputes many at once from a couple of grouped queries and
+writes only the statuses that changed, one UPDATE per new status, inside the
+caller's transaction.
+
+Room statuses come from the lease counts stored on each room, which Lease
+events keep up to date before refreshing their room through `refresh_room`.
+That also recounts the room's airport, whose shop count follows the leases
+even when the room's status stays the same.
+Inside `batch()` those rooms are collected and recomputed once when the batch
+ends, so renewing a chunk of leases updates their rooms in one go instead of
+once per save.
+"""
+
+import functools
+import random
+from collections import defaultdict
+from contextlib import contextmanager
+
+import frappe
+from frappe.query_builder.functions import Sum
+from frappe.utils import create_batch
+from pypika.terms import Case
+from airplane_mode.airport_leasing.doctype.airport_occupancy.airport_occupancy import AirportOccupancy
+from airplane_mode.utils import report_cache
+
+# Statuses autorenew sets, which invoices alone cannot tell.
+AUTORENEW_LEASE_STATUSES = ('Offboarding', 'Terminated')
+# Share of status computations written to the 'airplane_mode.status' debug log.
+TRACE_SAMPLE_RATE = 0.01
+BATCH_SIZE = 1000
+
+
+# ====================
+# COMPUTE
+# ====================
+
+def lease_statuses(leases: list[str] | None = None) -> list[frappe._dict]:
+	"""Current and computed status of the leases, or of every lease, as rows of name, status, new_status.
+
+	- Draft leases keep their status; cancelled ones are Cancelled.
+	- Submitted leases are Overdue if any period's invoice is overdue, else Active,
+	  unless autorenew has moved them to Offboarding or Terminated."""
+	Lease = frappe.qb.DocType('Lease')
+	Period = frappe.qb.DocType('Lease Period')
+	Invoice = frappe.qb.DocType('Sales Invoice')
+
+	query = (
+		frappe.qb.from_(Lease)
+		.left_join(Period).on((Period.parent == Lease.name) & (Period.parenttype == 'Lease'))
+		.left_join(Invoice).on(Period.invoice == Invoice.name)
+		.select(
+			Lease.name, Lease.docstatus, Lease.status,
+			Sum(Case().when(Invoice.status.like('Overdue%'), 1).else_(0)).as_('overdue'),
+		)
+		.groupby(Lease.name, Lease.docstatus, Lease.status)
+	)
+	if leases is not None:
+		query = query.where(Lease.name.isin(leases))
+
+	rows = query.run(as_dict=True)
+	for row in rows:
+		if row.docstatus == 0:
+			row.new_status = row.status or 'Draft'
+		elif row.docstatus == 2:
+			row.new_status = 'Cancelled'
+		elif row.status in AUTORENEW_LEASE_STATUSES:
+			row.new_status = row.status
+		else:
+			row.new_status = 'Overdue' if row.overdue else 'Active'
+	return rows
+
+def room_statuses(rooms: list[str] | None = None) -> list[frappe._dict]:
+	"""Current and computed status of the rooms, or of every room, as rows of name, airport, status, new_status.
+	Same rules as Room.set_status, from the rooms' stored lease counts."""
+	Room = frappe.qb.DocType('Room')
+
+	query = frappe.qb.from_(Room).select(
+		Room.name, Room.airport, Room.docstatus, Room.maintenance, Room.status,
+		Room.draft_leases, Room.submitted_leases,
+	)
+	if rooms is not None:
+		query = query.where(Room.name.isin(rooms))
+
+	rows = query.run(as_dict=True)
+	for row in rows:
+		if row.docstatus == 0:
+			row.new_status = 'Draft'
+		elif row.docstatus == 2:
+			row.new_status = 'Cancelled'
+		elif row.maintenance:
+			row.new_status = 'Maintenance'
+		elif row.submitted_leases:
+			row.new_status = 'Occupied'
+		elif row.draft_leases:
+			row.new_status = 'Reserved'
+		else:
+			row.new_status = 'Available'
+	return rows
+
+
+# ====================
+# UPDATE
+# ====================
+
+def update_lease_statuses(leases: list[str] | None = None) -> list[str]:
+	"""Write the leases' changed statuses. Returns the names of the changed leases."""
+	if leases is not None and not leases:
+		return []
+	return write('Lease', lease_statuses(leases))
+
+def update_room_statuses(rooms: list[str] | None = None, *, leases_changed: bool = False) -> list[str]:
+	"""Write the rooms' changed statuses and refresh their airports' occupancy: of every room
+	if their leases changed, else only of the rooms whose status did. Returns the names of the changed rooms."""
+	if rooms is not None and not rooms:
+		return []
+
+	rows = room_statuses(rooms)
+	changed = write('Room', rows)
+	changed_set = set(changed)
+	for airport in sorted({row.airport for row in rows if leases_changed or row.name in changed_set}):
+		AirportOccupancy.refresh(airport)
+	return changed
+
+def write(doctype: str, rows: list[frappe._dict]) -> list[str]:
+	"""One UPDATE per new status and batch of names, for the rows whose status changed."""
+	changes = defaultdict(list)
+	for row in rows:
+		if row.new_status != row.status:
+			changes[row.new_status].append(row.name)
+
+	trace("%s: %d computed, %d changed %s", doctype, len(rows), sum(map(len, changes.values())), dict(changes))
+	if not changes:
+		return []
+
+	Table = frappe.qb.DocType(doctype)
+	now, user = frappe.utils.now(), frappe.session.user
+	for status, names in changes.items():
+		for batch in create_batch(names, BATCH_SIZE):
+			(
+				frappe.qb.update(Table)
+				.set(Table.status, status)
+				.set(Table.modified, now)
+				.set(Table.modified_by, user)
+				.where(Table.name.isin(batch))
+			).run()
+		for name in names:
+			# db_set would have, and Lease validation reads rooms through get_cached_doc.
+			frappe.clear_document_cache(doctype, name)
+
+	# Written directly, so do what doc_events would have.
+	frappe.db.after_commit.add(functools.partial(report_cache.bump_version, doctype))
+	frappe.publish_realtime('list_update', {'doctype': doctype, 'name': None}, after_commit=True)
+	return [name for names in changes.values() for name in names]
+
+def recompute_daily() -> None:
+	"""Catch every lease up with its invoices turning overdue, and every room with its leases."""
+	update_lease_statuses()
+	update_room_statuses()
+
+def recompute_rooms() -> int:
+	"""Recount every room's leases and update the statuses that changed, e.g. after an import
+	that bypassed Lease events. Returns the number of rooms whose status changed."""
+	from airplane_mode.airport_leasing.doctype.room.room import Room
+	Room.rebuild_lease_counts()
+	return len(update_room_statuses())
+
+
+# ====================
+# BATCHING
+# ====================
+
+@contextmanager
+def batch():
+	"""Collect the rooms refresh_room is asked for inside, and update them together at the end.
+	Nested batches join the outermost one."""
+	if frappe.flags.room_status_batch is not None:
+		yield
+		return
+
+	frappe.flags.room_status_batch = set()
+	try:
+		yield
+		update_room_statuses(sorted(frappe.flags.room_status_batch), leases_changed=True)
+	finally:
+		frappe.flags.room_status_batch = None
+
+def refresh_room(room: str) -> None:
+	"""After a change to the room's leases, recompute its status and its airport's occupancy
+	now, or at the end of the current batch."""
+	if frappe.flags.room_status_batch is not None:
+		frappe.flags.room_status_batch.add(room)
+	else:
+		update_room_statuses([room], leases_changed=True)
+
+
+# ====================
+# TRACING
+# ====================
+
+def trace(message: str, *args) -> None:
+	"""Log a sample of status computations at debug level, instead of an Error Log row each."""
+	if random.random() < TRACE_SAMPLE_RATE:
+		frappe.logger('airplane_mode.status').debug(message, *args)
@@ -5,7 +5,8 @@ import frappe
 from frappe.tests.utils import FrappeTestCase
 from contextlib import contextmanager
 
-from airplane_mode.airport_leasing.doctype.lease.lease import Lease
+from airplane_mode.airport_leasing.doctype.lease.lease import MAX_BALANCE_LEASES, Lease, get_balances, send_reminder_monthly, update_invoice_balances, update_payment_balances
+from airplane_mode.airport_leasing.doctype.lease_period.lease_period import LeasePeriod
 from unittest.mock import (MagicMock, Mock, patch, call)
 
 # from typing import TYPE_CHECKING
@@ -290,67 +291,129 @@ class TestLeaseUnit(FrappeTestCase):
 	# PROPERTIES
 	# ===============================
 
-	def test_total_owing(self):
-		self.fail("Unit and Integration. If I mock, I'm testing the summing. \
-			If not, I'm testing the biz logic.")
+	def test_rental_rate(self):
+		self.fail("Integration: Relies on Room.")
 
+	# ===============================
+	# BALANCES
+	# ===============================
 
-	@patch('frappe.get_cached_value')
-	def test_total_paid(self, mock_get_cached_value):
-		"""Test total_paid property calculates sum of all payments correctly"""
-		# Setup test data
-		self.lease.payments = [
-			frappe._dict({'payment_entry': 'PAY001'}),
-			frappe._dict({'payment_entry': 'PAY002'}),
+	@patch.object(Lease, 'add_to_balances')
+	@patch.object(LeasePeriod, 'invoice_lease')
+	def test_update_invoice_balances(self, mock_invoice_lease, mock_add_to_balances):
+		"""Submitting a lease invoice adds it to owing and outstanding, cancelling takes it back out.
+		Outstanding follows the grand total, as rebuild_balances derives it, not the invoice's own outstanding."""
+		mock_invoice_lease.return_value = '_Test Lease'
+		invoice = frappe._dict({'grand_total': 1000, 'outstanding_amount': 700})
+
+		for method, sign in (('on_submit', 1), ('on_cancel', -1)):
+			with self.subTest(method):
+				mock_add_to_balances.reset_mock()
+				update_invoice_balances(invoice, method)
+				mock_add_to_balances.assert_called_once_with('_Test Lease', owing=sign * 1000, outstanding=sign * 1000)
+
+	@patch.object(Lease, 'add_to_balances')
+	@patch.object(LeasePeriod, 'invoice_leases')
+	def test_update_payment_balances(self, mock_invoice_leases, mock_add_to_balances):
+		"""Payments allocated to lease invoices move from outstanding to paid; other references are ignored"""
+		mock_invoice_leases.return_value = {'INV001': '_Test Lease'}
+		payment = frappe._dict({'references': [
+			frappe._dict({'reference_doctype': 'Sales Invoice', 'reference_name': 'INV001', 'allocated_amount': 500}),
+			frappe._dict({'reference_doctype': 'Sales Invoice', 'reference_name': 'INV002', 'allocated_amount': 200}),
+			frappe._dict({'reference_doctype': 'Journal Entry', 'reference_name': 'JV001', 'allocated_amount': 300}),
+		]})
+
+		update_payment_balances(payment, 'on_submit')
+
+		mock_invoice_leases.assert_called_once_with(['INV001', 'INV002'])
+		mock_add_to_balances.assert_called_once_with('_Test Lease', paid=500, outstanding=-500)
+
+	@patch.object(LeasePeriod, 'latest_statuses')
+	@patch('frappe.get_list')
+	def test_get_balances(self, mock_get_list, mock_latest_statuses):
+		"""Stored balances and the latest period status, for the permitted leases only"""
+		mock_get_list.return_value = [
+			frappe._dict({'name': 'LEASE001', 'total_owing': 1000, 'total_paid': 400, 'outstanding_balance': 600}),
+			frappe._dict({'name': 'LEASE002', 'total_owing': 0, 'total_paid': 0, 'outstanding_balance': 0}),
 		]
-		
-		# Mock frappe's database layer more generally
-		test_payments = {
-			'PAY001': {'paid_amount': 1000},
-			'PAY002': {'paid_amount': 500},
-		}
-		
-		def mock_db_get(*args, **kwargs):
-			"""Simulate database responses without caring about specific function used"""
-			if len(args) >= 2:
-				payment_id = args[1]
-				return test_payments[payment_id]['paid_amount']
-			return None
-
-		# Apply the mock to both potential functions
-		with patch('frappe.get_value', mock_db_get), \
-			 patch('frappe.get_cached_value', mock_db_get):
-			self.assertEqual(self.lease.total_paid, 1500)
-
-	@patch('frappe.get_cached_value')
-	def test_outstanding_balance(self, mock_get_cached_value):
-		"""Test outstanding_balance property calculates total outstanding correctly"""
-		# Setup test data
-		self.lease.periods = [
-			frappe._dict({'invoice': 'INV001'}),
-			frappe._dict({'invoice': 'INV002'}),
+		mock_latest_statuses.return_value = {'LEASE001': 'Partly Paid'}
+
+		balances = get_balances('["LEASE001", "LEASE002", "LEASE003"]')
+
+		self.assertEqual(mock_get_list.call_args.kwargs['limit'], 3)
+		mock_latest_statuses.assert_called_once_with(['LEASE001', 'LEASE002'])
+		self.assertEqual(set(balances), {'LEASE001', 'LEASE002'})
+		self.assertEqual(balances['LEASE001'].outstanding_balance, 600)
+		self.assertEqual(balances['LEASE001'].latest_period_status, 'Partly Paid')
+		self.assertIsNone(balances['LEASE002'].latest_period_status)
+		self.assertEqual(get_balances([]), {})
+		with self.assertRaises(frappe.ValidationError):
+			get_balances([f'LEASE{i}' for i in range(MAX_BALANCE_LEASES + 1)])
+
+	# ===============================
+	# REMINDERS
+	# ===============================
+
+	@patch('frappe.db.commit')
+	@patch('frappe.sendmail')
+	@patch('airplane_mode.airport_leasing.doctype.lease.lease.reminders_due')
+	@patch('frappe.get_cached_doc')
+	@patch('frappe.db.get_single_value')
+	def test_send_reminder_monthly(self, mock_enabled, mock_get_cached_doc, mock_reminders_due, mock_sendmail, mock_commit):
+		"""One email per lease due a reminder, rendered from the notification, and one commit per batch"""
+		mock_enabled.return_value = 1
+		mock_get_cached_doc.return_value = frappe._dict({
+			'enabled': 1,
+			'subject': '{{ doc.name }} Rent Reminder',
+			'message': '<p>{{ doc.leased_to }} owes {{ doc.outstanding_balance }}</p>',
+			'message_type': 'HTML',
+		})
+		mock_reminders_due.return_value = [
+			frappe._dict({'name': 'LEASE001', 'leased_to': 'Tenant A', 'outstanding_balance': 600, 'email_id': 'a@example.com'}),
+			frappe._dict({'name': 'LEASE002', 'leased_to': 'Tenant B', 'outstanding_balance': 50, 'email_id': 'b@example.com'}),
 		]
-		
-		test_invoices = {
-			'INV001': {'outstanding_amount': 500},
-			'INV002': {'outstanding_amount': 300},
-		}
-		
-		def mock_db_get(*args, **kwargs):
-			"""Simulate database responses without caring about specific function used"""
-			if len(args) >= 2:
-				invoice_id = args[1]
-				return test_invoices[invoice_id]['outstanding_amount']
-			return None
 
-		# Apply the mock to both potential functions
-		with patch('frappe.get_value', mock_db_get), \
-			 patch('frappe.get_cached_value', mock_db_get):
-			self.assertEqual(self.lease.outstanding_balance, 800)
+		send_reminder_monthly()
 
+		mock_reminders_due.assert_called_once_with(frappe.utils.get_first_day(frappe.utils.today()))
+		self.assertEqual(mock_sendmail.call_count, 2)
+		self.assertEqual(mock_sendmail.call_args.kwargs['recipients'], ['b@example.com'])
+		self.assertEqual(mock_sendmail.call_args.kwargs['subject'], 'LEASE002 Rent Reminder')
+		self.assertEqual(mock_sendmail.call_args.kwargs['message'], '<p>Tenant B owes 50</p>')
+		mock_commit.assert_called_once()
 
-	def test_rental_rate(self):
-		self.fail("Integration: Relies on Room.")
+		with self.subTest("disabled"):
+			mock_enabled.return_value = 0
+			mock_sendmail.reset_mock()
+			send_reminder_monthly()
+			mock_sendmail.assert_not_called()
+
+	# ===============================
+	# ROOM LEASE COUNTS
+	# ===============================
+
+	@patch('airplane_mode.airport_leasing.doctype.lease.lease_status.refresh_room')
+	@patch('airplane_mode.airport_leasing.doctype.room.room.Room.add_to_lease_counts')
+	def test_room_lease_counts(self, mock_add_to_lease_counts, mock_refresh_room):
+		"""Each lifecycle event moves the lease between its room's counts and refreshes the room"""
+		cases = [
+			('after_insert', 0, False, {'draft': 1, 'submitted': 0}),
+			('on_submit', 1, False, {'draft': -1, 'submitted': 1}),
+			('on_submit', 1, True, {'draft': 0, 'submitted': 1}),
+			('on_cancel', 2, False, {'draft': 0, 'submitted': -1}),
+			('on_trash', 0, False, {'draft': -1, 'submitted': 0}),
+		]
+		for method, docstatus, in_insert, counts in cases:
+			with self.subTest(method, in_insert=in_insert):
+				mock_add_to_lease_counts.reset_mock()
+				mock_refresh_room.reset_mock()
+				self.lease.docstatus = docstatus
+				self.lease.flags.in_insert = in_insert
+
+				getattr(self.lease, method)()
+
+				mock_add_to_lease_counts.assert_called_once_with('TEST_ROOM', **counts)
+				mock_refresh_room.assert_called_once_with('TEST_ROOM')
 
 	# ===============================
 	# PUBLIC INSTANCE METHODS
@@ -423,6 +486,368 @@ class TestLeaseUnit(FrappeTestCase):
 
 TestLeaseUnit.make_comprehensive_autorenew_tests()
 
+
+class TestLeaseReminders(FrappeTestCase):
+	"""reminders_due against real Lease, Shop and Customer rows,
+	written with db_insert so no other controller logic runs."""
+
+	MONTH = '2024-06-01'
+
+	def setUp(self):
+		frappe.get_doc({
+			'doctype': 'Customer',
+			'name': '_Test Reminder Customer',
+			'customer_name': '_Test Reminder Customer',
+			'email_id': 'tenant@example.com',
+		}).db_insert()
+		frappe.get_doc({
+			'doctype': 'Shop',
+			'name': '_Test Reminder Shop',
+			'shop_name': '_Test Reminder Shop',
+			'owned_by': '_Test Reminder Customer',
+		}).db_insert()
+
+		leases = [
+			# name, docstatus, outstanding_balance, reminder_month
+			('_Test Reminder Due', 1, 600, None),
+			('_Test Reminder Last Month', 1, 600, '2024-05-01'),
+			('_Test Reminder Sent', 1, 600, self.MONTH),
+			('_Test Reminder Paid Up', 1, 0, None),
+			('_Test Reminder Draft', 0, 600, None),
+		]
+		for name, docstatus, outstanding_balance, reminder_month in leases:
+			frappe.get_doc({
+				'doctype': 'Lease',
+				'name': name,
+				'docstatus': docstatus,
+				'leasing_of': 'TEST_ROOM',
+				'leased_from': 'TEST_COMPANY',
+				'leased_to': '_Test Reminder Shop',
+				'start_date': '2024-01-01',
+				'end_date': '2024-12-31',
+				'period_length': 'Monthly',
+				'outstanding_balance': outstanding_balance,
+				'reminder_month': reminder_month,
+			}).db_insert()
+
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def test_reminders_due(self):
+		"""Submitted leases owing money and not yet reminded this month, with the shop owner's email"""
+		from airplane_mode.airport_leasing.doctype.lease.lease import reminders_due
+
+		rows = [row for row in reminders_due(self.MONTH) if row.name.startswith('_Test Reminder')]
+
+		self.assertEqual([row.name for row in rows], ['_Test Reminder Due', '_Test Reminder Last Month'])
+		self.assertEqual({row.email_id for row in rows}, {'tenant@example.com'})
+		self.assertEqual({row.leased_to for row in rows}, {'_Test Reminder Shop'})
+
+class TestLeaseAutorenewDue(FrappeTestCase):
+	"""autorenew_due against real Lease rows, written with db_insert."""
+
+	DATE = '2024-06-15'
+
+	def setUp(self):
+		leases = [
+			# name, docstatus, next_date, status, autorenew_date
+			('_Test Autorenew Due', 1, self.DATE, 'Active', None),
+			('_Test Autorenew Yesterday', 1, self.DATE, 'Overdue', '2024-06-14'),
+			('_Test Autorenew Processed', 1, self.DATE, 'Offboarding', self.DATE),
+			('_Test Autorenew Terminated', 1, self.DATE, 'Terminated', None),
+			('_Test Autorenew Not Due', 1, '2024-06-16', 'Active', None),
+			('_Test Autorenew Draft', 0, self.DATE, 'Draft', None),
+		]
+		for name, docstatus, next_date, status, autorenew_date in leases:
+			frappe.get_doc({
+				'doctype': 'Lease',
+				'name': name,
+				'docstatus': docstatus,
+				'leasing_of': 'TEST_ROOM',
+				'leased_from': 'TEST_COMPANY',
+				'leased_to': 'TEST_SHOP',
+				'start_date': '2024-01-01',
+				'end_date': '2024-12-31',
+				'period_length': 'Monthly',
+				'next_date': next_date,
+				'status': status,
+				'autorenew_date': autorenew_date,
+			}).db_insert()
+
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def test_autorenew_due(self):
+		"""Submitted leases due on the date, not terminated and not yet processed that day"""
+		from airplane_mode.airport_leasing.doctype.lease.lease import autorenew_due
+
+		due = [name for name in autorenew_due(self.DATE) if name.startswith('_Test Autorenew')]
+
+		self.assertEqual(due, ['_Test Autorenew Due', '_Test Autorenew Yesterday'])
+
+class TestLeaseRebuildBalances(FrappeTestCase):
+	"""Lease.rebuild_balances against real Lease, Lease Period, Sales Invoice and Payment Entry rows,
+	written with db_insert so no other controller logic runs."""
+
+	LEASE = '_Test Balances Lease'
+
+	def setUp(self):
+		frappe.get_doc({
+			'doctype': 'Lease',
+			'name': self.LEASE,
+			'docstatus': 1,
+			'leasing_of': 'TEST_ROOM',
+			'leased_from': 'TEST_COMPANY',
+			'leased_to': 'TEST_SHOP',
+			'start_date': '2024-01-01',
+			'end_date': '2024-12-31',
+			'period_length': 'Monthly',
+			'outstanding_balance': 999,
+		}).db_insert()
+
+		invoices = [
+			# name, docstatus, grand_total, outstanding_amount (lowered by a credit note on the first)
+			('_Test Balances Invoice 1', 1, 1000, 300),
+			('_Test Balances Invoice 2', 1, 500, 500),
+			('_Test Balances Invoice Cancelled', 2, 800, 800),
+		]
+		for idx, (name, docstatus, grand_total, outstanding_amount) in enumerate(invoices, start=1):
+			frappe.get_doc({
+				'doctype': 'Sales Invoice',
+				'name': name,
+				'docstatus': docstatus,
+				'grand_total': grand_total,
+				'outstanding_amount': outstanding_amount,
+			}).db_insert()
+			frappe.get_doc({
+				'doctype': 'Lease Period',
+				'name': f"{name} Period",
+				'parent': self.LEASE,
+				'parenttype': 'Lease',
+				'parentfield': 'periods',
+				'idx': idx,
+				'invoice': name,
+			}).db_insert()
+
+		frappe.get_doc({'doctype': 'Payment Entry', 'name': '_Test Balances Payment', 'docstatus': 1}).db_insert()
+		frappe.get_doc({
+			'doctype': 'Payment Entry Reference',
+			'name': '_Test Balances Payment Reference',
+			'parent': '_Test Balances Payment',
+			'parenttype': 'Payment Entry',
+			'parentfield': 'references',
+			'reference_doctype': 'Sales Invoice',
+			'reference_name': '_Test Balances Invoice 1',
+			'allocated_amount': 400,
+		}).db_insert()
+
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def test_rebuild_balances_matches_the_hooks(self):
+		"""Outstanding is owing less paid, as the invoice and payment hooks add it up"""
+		Lease.rebuild_balances()
+
+		balances = frappe.db.get_value('Lease', self.LEASE, Lease.BALANCE_FIELDS, as_dict=True)
+		self.assertEqual(balances, {'total_owing': 1500, 'total_paid': 400, 'outstanding_balance': 1100})
+
+class TestLeaseAutorenewChunk(FrappeTestCase):
+	"""autorenew_chunk against real Lease rows, written with db_insert.
+	Renewal decisions are mocked: '_Test Autorenew Chunk Broken' raises, the others go Offboarding."""
+
+	LEASES = ['_Test Autorenew Chunk 1', '_Test Autorenew Chunk Broken', '_Test Autorenew Chunk 2']
+
+	def setUp(self):
+		self.today = frappe.utils.today()
+		for name in self.LEASES:
+			frappe.get_doc({
+				'doctype': 'Lease',
+				'name': name,
+				'docstatus': 1,
+				'status': 'Active',
+				'leasing_of': 'TEST_ROOM',
+				'leased_from': 'TEST_COMPANY',
+				'leased_to': 'TEST_SHOP',
+				'start_date': frappe.utils.add_months(self.today, -6),
+				'end_date': frappe.utils.add_days(self.today, 10),
+				'period_length': 'Monthly',
+				'next_date': self.today,
+			}).db_insert()
+
+	def tearDown(self):
+		frappe.db.rollback()
+
+	@staticmethod
+	def renewal_action(lease):
+		if lease.name.endswith('Broken'):
+			raise frappe.ValidationError("Cannot decide")
+		return 'Offboarding'
+
+	def test_failing_lease_does_not_stop_the_chunk(self):
+		"""The failing lease is rolled back and logged; every claimed lease is stamped"""
+		from airplane_mode.airport_leasing.doctype.lease.lease import autorenew_chunk
+
+		with patch.object(Lease, 'renewal_action', side_effect=self.renewal_action), \
+			patch.object(LeasePeriod, 'next_periods', return_value={}), \
+			patch.object(frappe.db, 'commit') as mock_commit, \
+			patch('frappe.log_error') as mock_log_error:
+			autorenew_chunk(self.LEASES, self.today)
+
+		statuses = dict(frappe.get_all('Lease', filters={'name': ['in', self.LEASES]}, fields=['name', 'status'], as_list=True))
+		self.assertEqual(statuses, {
+			'_Test Autorenew Chunk 1': 'Offboarding',
+			'_Test Autorenew Chunk Broken': 'Active',
+			'_Test Autorenew Chunk 2': 'Offboarding',
+		})
+		stamps = frappe.get_all('Lease', filters={'name': ['in', self.LEASES]}, pluck='autorenew_date')
+		self.assertEqual([str(stamp) for stamp in stamps], [self.today] * 3)
+
+		mock_log_error.assert_called_once()
+		self.assertEqual(mock_log_error.call_args.kwargs['reference_name'], '_Test Autorenew Chunk Broken')
+		mock_commit.assert_called_once()
+
+class TestLeaseStatus(FrappeTestCase):
+	"""lease_status against real Lease, Room, Lease Period and Sales Invoice rows,
+	written with db_insert so no other controller logic runs."""
+
+	AIRPORT = '_Test Status Airport'
+	MODIFIED = '2024-01-01 00:00:00'
+
+	def setUp(self):
+		rooms = [
+			# name, docstatus, maintenance, draft_leases, submitted_leases, stored status
+			('_Test Status Room Available', 1, 0, 0, 0, 'Reserved'),
+			('_Test Status Room Reserved', 1, 0, 1, 0, 'Reserved'),
+			('_Test Status Room Occupied', 1, 0, 1, 1, 'Reserved'),
+			('_Test Status Room Maintenance', 1, 1, 0, 1, 'Occupied'),
+			('_Test Status Room Draft', 0, 0, 0, 0, 'Draft'),
+		]
+		for name, docstatus, maintenance, draft_leases, submitted_leases, status in rooms:
+			frappe.get_doc({
+				'doctype': 'Room',
+				'name': name,
+				'docstatus': docstatus,
+				'airport': self.AIRPORT,
+				'maintenance': maintenance,
+				'draft_leases': draft_leases,
+				'submitted_leases': submitted_leases,
+				'status': status,
+				'modified': self.MODIFIED,
+			}).db_insert()
+		self.rooms = [room[0] for room in rooms]
+
+		leases = [
+			# name, docstatus, stored status, status of its period's invoice
+			('_Test Status Lease Active', 1, 'Overdue', 'Paid'),
+			('_Test Status Lease Overdue', 1, 'Active', 'Overdue and Discounted'),
+			('_Test Status Lease Offboarding', 1, 'Offboarding', 'Overdue'),
+			('_Test Status Lease Draft', 0, 'Draft', None),
+			('_Test Status Lease Cancelled', 2, 'Active', None),
+		]
+		for name, docstatus, status, invoice_status in leases:
+			frappe.get_doc({
+				'doctype': 'Lease',
+				'name': name,
+				'docstatus': docstatus,
+				'status': status,
+				'leasing_of': '_Test Status Room Occupied',
+				'leased_from': 'TEST_COMPANY',
+				'leased_to': 'TEST_SHOP',
+				'start_date': '2024-01-01',
+				'end_date': '2024-12-31',
+				'period_length': 'Monthly',
+			}).db_insert()
+			if invoice_status:
+				frappe.get_doc({'doctype': 'Sales Invoice', 'name': f"{name} Invoice", 'status': invoice_status}).db_insert()
+				frappe.get_doc({
+					'doctype': 'Lease Period',
+					'name': f"{name} Period",
+					'parent': name,
+					'parenttype': 'Lease',
+					'parentfield': 'periods',
+					'invoice': f"{name} Invoice",
+				}).db_insert()
+		self.leases = [lease[0] for lease in leases]
+
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def room_status(self, room):
+		return frappe.db.get_value('Room', room, 'status')
+
+	def test_lease_status_rules(self):
+		"""Invoices decide between Active and Overdue; drafts, cancellations and autorenew's statuses stand"""
+		from airplane_mode.airport_leasing.doctype.lease import lease_status
+
+		computed = {row.name: row.new_status for row in lease_status.lease_statuses(self.leases)}
+
+		self.assertEqual(computed, {
+			'_Test Status Lease Active': 'Active',
+			'_Test Status Lease Overdue': 'Overdue',
+			'_Test Status Lease Offboarding': 'Offboarding',
+			'_Test Status Lease Draft': 'Draft',
+			'_Test Status Lease Cancelled': 'Cancelled',
+		})
+
+	def test_room_status_rules(self):
+		"""Same order as Room.set_status: docstatus, maintenance, submitted leases, draft leases"""
+		from airplane_mode.airport_leasing.doctype.lease import lease_status
+
+		computed = {row.name: row.new_status for row in lease_status.room_statuses(self.rooms)}
+
+		self.assertEqual(computed, {
+			'_Test Status Room Available': 'Available',
+			'_Test Status Room Reserved': 'Reserved',
+			'_Test Status Room Occupied': 'Occupied',
+			'_Test Status Room Maintenance': 'Maintenance',
+			'_Test Status Room Draft': 'Draft',
+		})
+
+	def test_update_writes_only_what_changed(self):
+		"""Unchanged rooms keep their modified; changed ones are written, uncached and counted for their airport"""
+		from airplane_mode.airport_leasing.doctype.lease import lease_status
+
+		self.assertEqual(frappe.get_cached_doc('Room', '_Test Status Room Occupied').status, 'Reserved')
+
+		changed = lease_status.update_room_statuses(self.rooms)
+
+		self.assertEqual(sorted(changed), [
+			'_Test Status Room Available', '_Test Status Room Maintenance', '_Test Status Room Occupied',
+		])
+		self.assertEqual(str(frappe.db.get_value('Room', '_Test Status Room Reserved', 'modified')), self.MODIFIED)
+		self.assertNotEqual(str(frappe.db.get_value('Room', '_Test Status Room Occupied', 'modified')), self.MODIFIED)
+		self.assertEqual(self.room_status('_Test Status Room Occupied'), 'Occupied')
+		# Lease._validate_room_status reads the room through the document cache.
+		self.assertEqual(frappe.get_cached_doc('Room', '_Test Status Room Occupied').status, 'Occupied')
+
+		occupancy = frappe.db.get_value('Airport Occupancy', {'airport': self.AIRPORT},
+			['available_rooms', 'reserved_rooms', 'occupied_rooms', 'maintenance_rooms'], as_dict=True)
+		self.assertEqual(occupancy, {'available_rooms': 1, 'reserved_rooms': 1, 'occupied_rooms': 1, 'maintenance_rooms': 1})
+
+		self.assertEqual(lease_status.update_room_statuses(self.rooms), [], "Nothing left to change")
+		self.assertEqual(lease_status.update_lease_statuses([]), [])
+
+	def test_batch_defers_room_updates_to_the_end(self):
+		"""Rooms refreshed inside a batch, nested or not, are written once when the outermost batch ends"""
+		from airplane_mode.airport_leasing.doctype.lease import lease_status
+
+		with patch.object(lease_status, 'update_room_statuses', wraps=lease_status.update_room_statuses) as mock_update:
+			with lease_status.batch():
+				lease_status.refresh_room('_Test Status Room Occupied')
+				with lease_status.batch():
+					lease_status.refresh_room('_Test Status Room Available')
+					lease_status.refresh_room('_Test Status Room Occupied')
+				self.assertEqual(self.room_status('_Test Status Room Occupied'), 'Reserved')
+				mock_update.assert_not_called()
+
+		mock_update.assert_called_once_with(['_Test Status Room Available', '_Test Status Room Occupied'], leases_changed=True)
+		self.assertEqual(self.room_status('_Test Status Room Occupied'), 'Occupied')
+		self.assertEqual(self.room_status('_Test Status Room Available'), 'Available')
+		self.assertIsNone(frappe.flags.room_status_batch)
+
+		lease_status.refresh_room('_Test Status Room Maintenance')
+		self.assertEqual(self.room_status('_Test Status Room Maintenance'), 'Maintenance', "Written at once outside a batch")
+
 # class TestLeaseIntegration(FrappeTestCase):
 # 	def setUp(self):
 # 		# Create test records
@@ -0,0 +1,8 @@
+// Copyright (c) 2024, Weaver Marquez and contributors
+// For license information, please see license.txt
+
+// frappe.ui.form.on("Lease Ledger", {
+// 	refresh(frm) {
+
+// 	},
+// });
@@ -0,0 +1,141 @@
+# Copyright (c) 2024, Weaver Marquez and contributors
+# For license information, please see license.txt
+
+from collections import defaultdict
+
+import frappe
+from frappe.model.document import Document
+from frappe.query_builder.functions import Sum
+from pypika.terms import Function
+from airplane_mode.airport_leasing.doctype.lease_period.lease_period import LeasePeriod
+from airplane_mode.utils import report_cache, rollup
+
+
+class LeaseLedger(Document):
+	"""Rent invoiced and paid on one lease in one month.
+
+	Maintained from Sales Invoice and Payment Entry submit and cancel, so Lease
+	Payments per Month sums a row per lease and month instead of joining every
+	invoice to every payment.
+	"""
+	# begin: auto-generated types
+	# This code is auto-generated. Do not modify anything in this block.
+
+	from typing import TYPE_CHECKING
+
+	if TYPE_CHECKING:
+		from frappe.types import DF
+
+		airport: DF.Link | None
+		invoiced: DF.Currency
+		lease: DF.Link | None
+		month: DF.Date | None
+		outstanding: DF.Currency
+		paid: DF.Currency
+	# end: auto-generated types
+
+	KEY_FIELDS = ['month', 'airport', 'lease']
+	VALUE_FIELDS = ['invoiced', 'paid', 'outstanding']
+
+	# ====================
+	# STATIC METHODS
+	# ====================
+
+	@staticmethod
+	def record(lease: str, posting_date, *, invoiced: float = 0, paid: float = 0) -> None:
+		"""Add amounts to a lease's row for the month of posting_date."""
+		room = frappe.get_cached_value('Lease', lease, 'leasing_of')
+		LeaseLedger.upsert([{
+			'month': frappe.utils.get_first_day(posting_date),
+			'airport': frappe.get_cached_value('Room', room, 'airport'),
+			'lease': lease,
+			'invoiced': invoiced,
+			'paid': paid,
+		}])
+
+	@staticmethod
+	def upsert(rows: list[dict]) -> None:
+		for row in rows:
+			row['outstanding'] = (row.get('invoiced') or 0) - (row.get('paid') or 0)
+		rollup.upsert('Lease Ledger', LeaseLedger.KEY_FIELDS, LeaseLedger.VALUE_FIELDS, rows)
+
+	@staticmethod
+	def rebuild() -> int:
+		"""Replace the ledger with totals grouped from submitted invoices and payments of
+		lease periods. Each invoice belongs to one period, so nothing is counted twice.
+		Returns the row count."""
+		Lease = frappe.qb.DocType('Lease')
+		Room = frappe.qb.DocType('Room')
+		Period = frappe.qb.DocType('Lease Period')
+		Invoice = frappe.qb.DocType('Sales Invoice')
+		Payment = frappe.qb.DocType('Payment Entry')
+		Reference = frappe.qb.DocType('Payment Entry Reference')
+
+		def month(date):
+			return Function('DATE_FORMAT', date, '%Y-%m-01')
+
+		invoiced = (
+			frappe.qb.from_(Period)
+			.join(Invoice).on(Period.invoice == Invoice.name)
+			.join(Lease).on(Period.parent == Lease.name)
+			.join(Room).on(Lease.leasing_of == Room.name)
+			.select(month(Invoice.posting_date).as_('month'), Room.airport, Lease.name.as_('lease'),
+				Sum(Invoice.grand_total).as_('amount'))
+			.where(Period.parenttype == 'Lease')
+			.where(Invoice.docstatus == 1)
+			.groupby(month(Invoice.posting_date), Room.airport, Lease.name)
+		)
+		paid = (
+			frappe.qb.from_(Reference)
+			.join(Payment).on(Reference.parent == Payment.name)
+			.join(Period).on((Period.invoice == Reference.reference_name) & (Period.parenttype == 'Lease'))
+			.join(Lease).on(Period.parent == Lease.name)
+			.join(Room).on(Lease.leasing_of == Room.name)
+			.select(month(Payment.posting_date).as_('month'), Room.airport, Lease.name.as_('lease'),
+				Sum(Reference.allocated_amount).as_('amount'))
+			.where(Reference.reference_doctype == 'Sales Invoice')
+			.where(Payment.docstatus == 1)
+			.groupby(month(Payment.posting_date), Room.airport, Lease.name)
+		)
+
+		rows = defaultdict(lambda: {'invoiced': 0, 'paid': 0})
+		for field, query in (('invoiced', invoiced), ('paid', paid)):
+			for row in query.run(as_dict=True):
+				rows[(str(row.month), row.airport, row.lease)][field] = row.amount
+
+		frappe.db.delete('Lease Ledger')
+		LeaseLedger.upsert([dict(zip(LeaseLedger.KEY_FIELDS, key), **amounts) for key, amounts in rows.items()])
+		report_cache.bump_version('Sales Invoice')
+		return len(rows)
+
+
+# ====================
+# DOC EVENTS
+# ====================
+
+def record_invoice(doc, method=None) -> None:
+	"""doc_events hook for Sales Invoice, on submit and cancel."""
+	lease = LeasePeriod.invoice_lease(doc)
+	if not lease:
+		return
+
+	sign = -1 if method == 'on_cancel' else 1
+	LeaseLedger.record(lease, doc.posting_date, invoiced=sign * doc.grand_total)
+
+def record_payment(doc, method=None) -> None:
+	"""doc_events hook for Payment Entry, on submit and cancel."""
+	invoices = [ref for ref in doc.references if ref.reference_doctype == 'Sales Invoice']
+	if not invoices:
+		return
+
+	leases = LeasePeriod.invoice_leases([ref.reference_name for ref in invoices])
+
+	sign = -1 if method == 'on_cancel' else 1
+	for ref in invoices:
+		if ref.reference_name in leases:
+			LeaseLedger.record(leases[ref.reference_name], doc.posting_date, paid=sign * ref.allocated_amount)
+
+
+def on_doctype_update():
+	# Serves Lease Payments per Month: a range of months grouped by airport.
+	frappe.db.add_index("Lease Ledger", ["month", "airport"])
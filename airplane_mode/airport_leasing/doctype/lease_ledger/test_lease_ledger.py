@@ -0,0 +1,118 @@
+# Copyright (c) 2024, Weaver Marquez and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from airplane_mode.airport_leasing.doctype.lease_ledger.lease_ledger import LeaseLedger, record_invoice, record_payment
+
+
+class TestLeaseLedger(FrappeTestCase):
+	"""LeaseLedger against real Room, Lease, Lease Period, Sales Invoice and Payment Entry rows,
+	written with db_insert so no other controller logic runs."""
+
+	AIRPORT = '_Test Ledger Airport'
+	LEASE = '_Test Ledger Lease'
+
+	def setUp(self):
+		frappe.get_doc({'doctype': 'Room', 'name': '_Test Ledger Room', 'docstatus': 1, 'airport': self.AIRPORT}).db_insert()
+		frappe.get_doc({
+			'doctype': 'Lease',
+			'name': self.LEASE,
+			'docstatus': 1,
+			'leasing_of': '_Test Ledger Room',
+			'leased_from': 'TEST_COMPANY',
+			'leased_to': 'TEST_SHOP',
+			'start_date': '2024-01-01',
+			'end_date': '2024-12-31',
+			'period_length': 'Monthly',
+		}).db_insert()
+
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def insert_invoice(self, name, grand_total, posting_date='2024-06-03', docstatus=1, idx=1):
+		frappe.get_doc({
+			'doctype': 'Sales Invoice',
+			'name': name,
+			'docstatus': docstatus,
+			'posting_date': posting_date,
+			'grand_total': grand_total,
+		}).db_insert()
+		frappe.get_doc({
+			'doctype': 'Lease Period',
+			'name': f"{name} Period",
+			'parent': self.LEASE,
+			'parenttype': 'Lease',
+			'parentfield': 'periods',
+			'idx': idx,
+			'invoice': name,
+		}).db_insert()
+
+	def insert_payment(self, name, allocations, posting_date='2024-06-20', docstatus=1):
+		frappe.get_doc({'doctype': 'Payment Entry', 'name': name, 'docstatus': docstatus, 'posting_date': posting_date}).db_insert()
+		for idx, (invoice, amount) in enumerate(allocations, start=1):
+			frappe.get_doc({
+				'doctype': 'Payment Entry Reference',
+				'name': f"{name} {idx}",
+				'parent': name,
+				'parenttype': 'Payment Entry',
+				'parentfield': 'references',
+				'idx': idx,
+				'reference_doctype': 'Sales Invoice',
+				'reference_name': invoice,
+				'allocated_amount': amount,
+			}).db_insert()
+
+	def ledger(self):
+		return frappe.get_all('Lease Ledger', filters={'lease': self.LEASE},
+			fields=['month', 'airport', 'invoiced', 'paid', 'outstanding'], order_by='month')
+
+	def test_record_invoice_signs_and_resolves_lease_from_flags(self):
+		"""A period invoice is submitted before its period row exists, so the lease comes from its flags"""
+		invoice = frappe.get_doc({'doctype': 'Sales Invoice', 'posting_date': '2024-06-03', 'grand_total': 1000})
+		invoice.name = '_Test Ledger Unlinked Invoice'
+		invoice.flags.lease = self.LEASE
+
+		record_invoice(invoice, 'on_submit')
+		self.assertEqual(self.ledger(), [
+			{'month': frappe.utils.getdate('2024-06-01'), 'airport': self.AIRPORT, 'invoiced': 1000, 'paid': 0, 'outstanding': 1000},
+		])
+
+		record_invoice(invoice, 'on_cancel')
+		row = self.ledger()[0]
+		self.assertEqual((row.invoiced, row.outstanding), (0, 0))
+
+		invoice.flags.lease = None
+		record_invoice(invoice, 'on_submit')
+		self.assertEqual(self.ledger()[0].invoiced, 0, "Invoices of no lease are ignored")
+
+	def test_record_payment_signs(self):
+		"""Allocations to lease invoices count as paid in the payment's month; cancelling takes them back"""
+		self.insert_invoice('_Test Ledger Invoice', 1000)
+		payment = frappe._dict({'posting_date': '2024-07-02', 'references': [
+			frappe._dict({'reference_doctype': 'Sales Invoice', 'reference_name': '_Test Ledger Invoice', 'allocated_amount': 400}),
+			frappe._dict({'reference_doctype': 'Sales Invoice', 'reference_name': '_Test Ledger Other Invoice', 'allocated_amount': 50}),
+		]})
+
+		record_payment(payment, 'on_submit')
+		(row,) = self.ledger()
+		self.assertEqual((row.month, row.paid, row.outstanding), (frappe.utils.getdate('2024-07-01'), 400, -400))
+
+		record_payment(payment, 'on_cancel')
+		(row,) = self.ledger()
+		self.assertEqual((row.paid, row.outstanding), (0, 0))
+
+	def test_rebuild_counts_each_invoice_and_payment_once(self):
+		"""Several invoices and payments of one lease in a month are not multiplied by each other"""
+		self.insert_invoice('_Test Ledger Invoice 1', 1000, idx=1)
+		self.insert_invoice('_Test Ledger Invoice 2', 500, idx=2)
+		self.insert_invoice('_Test Ledger Invoice Cancelled', 700, docstatus=2, idx=3)
+		self.insert_payment('_Test Ledger Payment 1', [('_Test Ledger Invoice 1', 600), ('_Test Ledger Invoice 2', 100)])
+		self.insert_payment('_Test Ledger Payment 2', [('_Test Ledger Invoice 2', 200)])
+		self.insert_payment('_Test Ledger Payment Cancelled', [('_Test Ledger Invoice 1', 400)], docstatus=2)
+
+		LeaseLedger.rebuild()
+
+		self.assertEqual(self.ledger(), [
+			{'month': frappe.utils.getdate('2024-06-01'), 'airport': self.AIRPORT, 'invoiced': 1500, 'paid': 900, 'outstanding': 600},
+		])
@@ -5,7 +5,7 @@ from __future__ import annotations
 import frappe
 from frappe.model.document import Document
 
-from typing import TypeAlias
+from typing import Callable, TypeAlias
 
 # Type aliases for better readability
 SalesInvoice: TypeAlias = 'frappe.types.Document'
@@ -55,6 +55,44 @@ class LeasePeriod(Document):
 	# PUBLIC INSTANCE METHODS
 	# ====================
 
+	@staticmethod
+	def invoice_lease(invoice: SalesInvoice) -> str | None:
+		"""Lease billed by a Sales Invoice, if any.
+		LeasePeriod submits its invoice before the period row linking it to the lease exists,
+		so for those the lease comes from the invoice's flags."""
+		return invoice.flags.lease or frappe.db.get_value('Lease Period', {'invoice': invoice.name, 'parenttype': 'Lease'}, 'parent')
+
+	@staticmethod
+	def invoice_leases(invoices: list[str]) -> dict[str, str]:
+		"""Lease billed by each of these Sales Invoices, for those billing one."""
+		return dict(frappe.get_all('Lease Period',
+			filters={'invoice': ['in', invoices], 'parenttype': 'Lease'},
+			fields=['invoice', 'parent'], as_list=True))
+
+	@staticmethod
+	def latest_statuses(leases: list[str]) -> dict[str, str]:
+		"""Status of each lease's latest period, as LeasePeriod.status gives it, in one query
+		joining the periods with the latest start date per lease to their invoices."""
+		from frappe.query_builder.functions import Max
+
+		Period = frappe.qb.DocType('Lease Period')
+		Invoice = frappe.qb.DocType('Sales Invoice')
+		latest = (
+			frappe.qb.from_(Period)
+			.select(Period.parent, Max(Period.start_date).as_('start_date'))
+			.where(Period.parenttype == 'Lease')
+			.where(Period.parent.isin(leases))
+			.groupby(Period.parent)
+		)
+		rows = (
+			frappe.qb.from_(Period)
+			.join(latest).on((Period.parent == latest.parent) & (Period.start_date == latest.start_date))
+			.left_join(Invoice).on(Period.invoice == Invoice.name)
+			.select(Period.parent, Invoice.status)
+			.where(Period.parenttype == 'Lease')
+		).run()
+		return {lease: status or 'Draft' for lease, status in rows}
+
 	@staticmethod
 	def next_period(lease: Document) -> 'LeasePeriod':
 		"""Begin a new Lease Period and send an invoice."""
@@ -68,6 +106,100 @@ class LeasePeriod(Document):
 			invoice=invoice.name
 		)
 
+	@staticmethod
+	def next_periods(leases: list[Document], on_period: Callable | None = None) -> dict[str, 'LeasePeriod | Exception']:
+		"""Begin the next period of many leases at once, like next_period.
+
+		Customers, rooms, items, rates and company accounts are looked up for the
+		whole batch in a few queries, instead of per lease while building each invoice.
+		Each lease's invoice is submitted under its own savepoint, with
+		on_period(lease, period) if given, so a lease that fails is rolled back on its
+		own and the rest of the batch goes on.
+
+		Returns:
+			Per lease name, its new Lease Period, or the exception that stopped it
+		"""
+		context = LeasePeriod.batch_context(leases)
+		results = {}
+
+		for idx, lease in enumerate(leases):
+			# By position: lease names are typed by users and may not be valid identifiers.
+			savepoint = f"lease_period_{idx}"
+			try:
+				frappe.db.savepoint(savepoint)
+				dates = LeasePeriod.calculate_period_dates(lease)
+				invoice = LeasePeriod.batch_invoice(lease, dates, context)
+				period = frappe.new_doc(
+					'Lease Period',
+					start_date=dates['start_date'],
+					end_date=dates['end_date'],
+					invoice=invoice.name
+				)
+				if on_period:
+					on_period(lease, period)
+				results[lease.name] = period
+			except Exception as e:
+				frappe.db.rollback(save_point=savepoint)
+				results[lease.name] = e
+
+		return results
+
+	@staticmethod
+	def batch_context(leases: list[Document]) -> frappe._dict:
+		"""Everything the batch's invoices read besides the lease, each in one query."""
+		shops = list({lease.leased_to for lease in leases})
+		rooms = list({lease.leasing_of for lease in leases})
+		companies = {lease.leased_from for lease in leases}
+		company_fields = ['default_currency', 'default_receivable_account', 'default_income_account', 'cost_center']
+
+		return frappe._dict(
+			today=frappe.utils.today(),
+			customers=dict(frappe.get_all('Shop', filters={'name': ['in', shops]}, fields=['name', 'owned_by'], as_list=True)),
+			room_rates=dict(frappe.get_all('Room', filters={'name': ['in', rooms]}, fields=['name', 'rental_rate_override'], as_list=True)),
+			items=set(frappe.get_all('Item', filters={'name': ['in', rooms]}, pluck='name')),
+			default_rate=frappe.db.get_single_value('Airport Leasing Settings', 'default_rental_rate'),
+			companies={
+				company: frappe.get_cached_value('Company', company, company_fields, as_dict=True)
+				for company in companies
+			},
+		)
+
+	@staticmethod
+	def batch_invoice(lease: Document, dates: dict, context: frappe._dict) -> SalesInvoice:
+		"""Create and submit one period's invoice from the batch context.
+		Rates follow Lease.auto_rental_rate: the lease's discount, the room's override, the default."""
+		from airplane_mode.airport_leasing.doctype.room.room import Room
+
+		room = lease.leasing_of
+		if room not in context.room_rates:
+			frappe.throw(f'Room {room} does not exist')
+		if room not in context.items:
+			frappe.throw(f'Room {room} has no Item to invoice')
+		customer = context.customers.get(lease.leased_to)
+		if not customer:
+			frappe.throw(f'Shop {lease.leased_to} is not owned by a customer')
+
+		company = context.companies[lease.leased_from] or frappe._dict()
+		sales_invoice: SalesInvoice = frappe.new_doc('Sales Invoice',
+			customer = customer,
+			company = lease.leased_from,
+			posting_date = context.today,
+			due_date = frappe.utils.add_days(context.today, LeasePeriod.INVOICE_BUFFER_DAYS),
+			currency = company.default_currency,
+			debit_to = company.default_receivable_account,
+			items = [{
+				'item_code': room,
+				'delivery_date': dates['start_date'],
+				'qty': lease.period_weeks(),
+				'uom': Room.UOM,
+				'rate': lease.discounted_rental_rate or context.room_rates[room] or context.default_rate,
+				'income_account': company.default_income_account,
+				'cost_center': company.cost_center,
+			}],
+		)
+		sales_invoice.flags.lease = lease.name
+		return sales_invoice.submit()
+
 	@staticmethod
 	def calculate_period_dates(lease: Document) -> dict:
 		"""Calculate start and end dates for the next period.
@@ -118,7 +250,8 @@ class LeasePeriod(Document):
 		return LeasePeriod.new_sales_invoice(
 			item=item,
 			company=company,
-			customer=customer
+			customer=customer,
+			lease=lease.name,
 		)
 
 	@staticmethod
@@ -152,13 +285,14 @@ class LeasePeriod(Document):
 
 
 	@staticmethod
-	def new_sales_invoice(item: SalesInvoiceItem, company: str, customer: str) -> SalesInvoice:
+	def new_sales_invoice(item: SalesInvoiceItem, company: str, customer: str, lease: str | None = None) -> SalesInvoice:
 		"""Create and submit a new sales invoice for a lease period.
 
 		Args:
 			item: The invoice item for the room rental
 			company: Company issuing the invoice
 			customer: Customer being billed
+			lease: Lease being billed, for the Lease Ledger, as its period row does not exist yet
 			
 		Returns:
 			SalesInvoice: The submitted sales invoice document
@@ -177,6 +311,7 @@ class LeasePeriod(Document):
 			due_date = frappe.utils.add_days(frappe.utils.today(), LeasePeriod.INVOICE_BUFFER_DAYS),
 			items = [ item ],
 		)
+		sales_invoice.flags.lease = lease
 		return sales_invoice.submit()
 
 		# Does customer need Payment Terms set up?
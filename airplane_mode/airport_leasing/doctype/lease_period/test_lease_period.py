@@ -115,3 +115,102 @@ class TestLeasePeriod(FrappeTestCase):
 			# Verify invoice creation
 			mock_new_invoice.assert_called_once()
 
+
+
+class TestLeasePeriodBatch(FrappeTestCase):
+	"""LeasePeriod.next_periods and batch_invoice against real Lease, Room, Shop and Item rows,
+	written with db_insert so no other controller logic runs."""
+
+	DEFAULT_RATE = 100
+
+	def setUp(self):
+		frappe.db.set_single_value('Airport Leasing Settings', 'default_rental_rate', self.DEFAULT_RATE)
+		frappe.get_doc({'doctype': 'Customer', 'name': '_Test Batch Customer', 'customer_name': '_Test Batch Customer'}).db_insert()
+		frappe.get_doc({'doctype': 'Shop', 'name': '_Test Batch Shop', 'owned_by': '_Test Batch Customer'}).db_insert()
+
+		rooms = [
+			# name, rental_rate_override
+			('_Test Batch Room Override', 300),
+			('_Test Batch Room Plain', 0),
+		]
+		for name, override in rooms:
+			frappe.get_doc({'doctype': 'Room', 'name': name, 'docstatus': 1, 'airport': '_Test Batch Airport', 'rental_rate_override': override}).db_insert()
+			frappe.get_doc({'doctype': 'Item', 'name': name, 'item_code': name, 'item_name': name}).db_insert()
+
+		leases = [
+			# name, room, discounted_rental_rate
+			('_Test Batch Lease Discounted', '_Test Batch Room Plain', 150),
+			('_Test Batch Lease Override', '_Test Batch Room Override', 0),
+			('_Test Batch Lease Default', '_Test Batch Room Plain', 0),
+		]
+		for name, room, discount in leases:
+			frappe.get_doc({
+				'doctype': 'Lease',
+				'name': name,
+				'docstatus': 1,
+				'leasing_of': room,
+				'leased_from': 'TEST_COMPANY',
+				'leased_to': '_Test Batch Shop',
+				'start_date': '2024-01-01',
+				'end_date': '2024-12-31',
+				'period_length': 'Monthly',
+				'discounted_rental_rate': discount,
+			}).db_insert()
+		self.leases = [frappe.get_doc('Lease', lease[0]) for lease in leases]
+
+	def tearDown(self):
+		frappe.db.rollback()
+
+	@staticmethod
+	def invoice_or_fail(lease, dates, context):
+		"""Stands in for batch_invoice: writes to the lease, then fails for the overridden room's lease."""
+		frappe.db.set_value('Lease', lease.name, 'total_owing', 100, update_modified=False)
+		if lease.leasing_of == '_Test Batch Room Override':
+			raise frappe.ValidationError("Cannot invoice")
+		return frappe._dict(name=f"{lease.name} Invoice")
+
+	def test_failing_lease_rolls_back_alone(self):
+		"""The failing lease's writes are rolled back and it comes back as an Exception; the rest are invoiced"""
+		on_period = MagicMock()
+
+		with patch.object(LeasePeriod, 'batch_invoice', side_effect=self.invoice_or_fail):
+			results = LeasePeriod.next_periods(self.leases, on_period=on_period)
+
+		self.assertIsInstance(results['_Test Batch Lease Override'], frappe.ValidationError)
+		for name in ('_Test Batch Lease Discounted', '_Test Batch Lease Default'):
+			with self.subTest(name):
+				self.assertEqual(results[name].invoice, f"{name} Invoice")
+				self.assertEqual(str(results[name].start_date), '2024-01-01')
+
+		owing = dict(frappe.get_all('Lease', filters={'name': ['like', '_Test Batch Lease%']}, fields=['name', 'total_owing'], as_list=True))
+		self.assertEqual(owing, {
+			'_Test Batch Lease Discounted': 100,
+			'_Test Batch Lease Override': 0,
+			'_Test Batch Lease Default': 100,
+		})
+		self.assertEqual([args[0][0].name for args in on_period.call_args_list],
+			['_Test Batch Lease Discounted', '_Test Batch Lease Default'])
+
+	def test_batch_invoice_rate_matches_create_period_invoice(self):
+		"""The lease's discount, else the room's override, else the default rate, as Lease.rental_rate gives it"""
+		expected = {
+			'_Test Batch Lease Discounted': 150,
+			'_Test Batch Lease Override': 300,
+			'_Test Batch Lease Default': self.DEFAULT_RATE,
+		}
+		context = LeasePeriod.batch_context(self.leases)
+
+		for lease in self.leases:
+			with self.subTest(lease.name):
+				dates = LeasePeriod.calculate_period_dates(lease)
+				with patch('frappe.new_doc') as mock_new_doc:
+					LeasePeriod.batch_invoice(lease, dates, context)
+				batch_rate = mock_new_doc.call_args.kwargs['items'][0]['rate']
+
+				with patch.object(LeasePeriod, 'new_invoice_item') as mock_item, \
+					patch.object(LeasePeriod, 'new_sales_invoice'):
+					LeasePeriod.create_period_invoice(lease, dates)
+				single_rate = mock_item.call_args.kwargs['rate']
+
+				self.assertEqual(batch_rate, single_rate)
+				self.assertEqual(batch_rate, expected[lease.name])
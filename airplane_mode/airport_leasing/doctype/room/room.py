@@ -3,7 +3,10 @@
 
 import frappe
 import json
+from collections import defaultdict
 from frappe.model.document import Document
+from frappe.query_builder.functions import Count
+from airplane_mode.airport_leasing.doctype.airport_occupancy.airport_occupancy import AirportOccupancy
 
 from typing import TYPE_CHECKING
 from typing import Optional
@@ -25,6 +28,7 @@ class Room(Document):
 		amended_from: DF.Link | None
 		area: DF.Int
 		capacity: DF.Int
+		draft_leases: DF.Int
 		entrances_and_exits: DF.Int
 		height: DF.Float
 		length: DF.Float
@@ -34,6 +38,7 @@ class Room(Document):
 		rental_rate_override: DF.Currency
 		room_number: DF.Int
 		status: DF.Literal["Draft", "Available", "Reserved", "Occupied", "Maintenance", "Cancelled"]
+		submitted_leases: DF.Int
 		width: DF.Float
 	# end: auto-generated types
 	pass
@@ -43,6 +48,7 @@ class Room(Document):
 	LEASE_INVALID_ROOM_STATUS = ('Draft', 'Cancelled')
 	LEASE_DRAFT_ROOM_STATUS = ('Available', 'Reserved', 'Occupied', 'Maintenance')	
 	LEASE_SUBMIT_ROOM_STATUS = ('Available', 'Reserved')
+	LEASE_COUNT_FIELDS = {0: 'draft_leases', 1: 'submitted_leases'}
 
 	# ==================== 
 	# CONTROLLERS 
@@ -53,8 +59,12 @@ class Room(Document):
 		self.name = f"{airport_code}{self.room_number}"
 
 	def validate(self) -> None:
+		self.load_lease_counts()
 		self.set_status(update=True)
 
+	def before_update_after_submit(self) -> None:
+		self.load_lease_counts()
+
 	def on_submit(self) -> None:
 		self.set_status(update=True)
 		if not self.item_exists():
@@ -63,6 +73,9 @@ class Room(Document):
 	def on_update_after_submit(self) -> None:
 		self.set_status(update=True)
 
+	def on_cancel(self) -> None:
+		self.set_status(update=True)
+
 	@property
 	def rental_rate(self) -> float:
 		return self.auto_rental_rate()
@@ -108,8 +121,14 @@ class Room(Document):
 			indicator='green')
 
 
+	def load_lease_counts(self) -> None:
+		"""Read the stored lease counts back before this save writes the whole row,
+		since Lease events add to them in the database."""
+		if not self.is_new():
+			self.update(frappe.db.get_value('Room', self.name, list(Room.LEASE_COUNT_FIELDS.values()), as_dict=True) or {})
+
 	def set_status(self, update=False) -> None:
-		"""Set the room status based on maintenance flag and lease status.
+		"""Set the room status based on maintenance flag and lease counts.
 
 		Status values:
 		- Maintenance: Room is under maintenance
@@ -118,35 +137,64 @@ class Room(Document):
 		- Available: Room has no leases and is not under maintenance
 		
 		Args:
-			update (bool): If True, updates the status in the database
+			update (bool): If True and the status changed, updates it in the database
+				and the airport's occupancy snapshot
 		"""
-		def room_leases(docstatus: int) -> list[dict] | list[str]:
-			return frappe.get_all('Lease', filters={
-					'leasing_of': self.name,
-					'docstatus': ['in', [docstatus]]
-				})
+		previous_status = self.status
 
 		if self.docstatus.is_draft():
 			self.status = "Draft"
 			return 
 		elif self.docstatus.is_cancelled():
 			self.status = "Cancelled"
-			return 
-
-		draft_leases = room_leases(0)
-		active_leases = room_leases(1)
-
-		if self.maintenance:
+		elif self.maintenance:
 			self.status = "Maintenance"
-		elif any(active_leases):
+		elif self.submitted_leases:
 			self.status = "Occupied"
-		elif any(draft_leases):
+		elif self.draft_leases:
 			self.status = "Reserved"
 		else:
 			self.status = "Available"
 
-		if update:
-			self.db_set("status", self.status, update_modified=True, notify=True, commit=True)
+		if update and self.status != previous_status:
+			self.db_set("status", self.status, update_modified=True, notify=True)
+			AirportOccupancy.refresh(self.airport)
+
+	# ====================
+	# STATIC METHODS
+	# ====================
+
+	@staticmethod
+	def add_to_lease_counts(room: str, *, draft: int = 0, submitted: int = 0) -> None:
+		"""Add to a room's stored lease counts in one UPDATE, without reading them first."""
+		Table = frappe.qb.DocType('Room')
+		(
+			frappe.qb.update(Table)
+			.set(Table.draft_leases, Table.draft_leases + draft)
+			.set(Table.submitted_leases, Table.submitted_leases + submitted)
+			.where(Table.name == room)
+		).run()
+
+	@staticmethod
+	def rebuild_lease_counts() -> int:
+		"""Recount every room's draft and submitted leases in one grouped query.
+		Returns the number of rooms with any."""
+		Lease = frappe.qb.DocType('Lease')
+		Table = frappe.qb.DocType('Room')
+
+		counts = defaultdict(lambda: dict.fromkeys(Room.LEASE_COUNT_FIELDS.values(), 0))
+		for row in (
+			frappe.qb.from_(Lease)
+			.select(Lease.leasing_of, Lease.docstatus, Count(Lease.name).as_('count'))
+			.where(Lease.docstatus < 2)
+			.groupby(Lease.leasing_of, Lease.docstatus)
+		).run(as_dict=True):
+			counts[row.leasing_of][Room.LEASE_COUNT_FIELDS[row.docstatus]] = row.count
+
+		frappe.qb.update(Table).set(Table.draft_leases, 0).set(Table.submitted_leases, 0).run()
+		for room, values in counts.items():
+			frappe.db.set_value('Room', room, values, update_modified=False)
+		return len(counts)
 
 	
 # TODO Fix the fragility of this function with try / except.
@@ -69,78 +69,75 @@ class TestRoomUnit(FrappeTestCase):
 				"expected_status": "Available",
 				"docstatus" : SUBMITTED,
 				"maintenance": False,
-				"draft_leases": [],
-				"active_leases": []
+				"draft_leases": 0,
+				"submitted_leases": 0
 			},
 			{
 				"expected_status": "Occupied",
 				"docstatus" : SUBMITTED,
 				"maintenance": False,
-				"draft_leases": [],
-				"active_leases": [{"name": "ACTIVE1"}]
+				"draft_leases": 0,
+				"submitted_leases": 1
 			},
 			{
 				"expected_status": "Occupied",
 				"docstatus" : SUBMITTED,
 				"maintenance": False,
-				"draft_leases": [{"name": "DRAFT1"}],
-				"active_leases": [{"name": "ACTIVE1"}]
+				"draft_leases": 1,
+				"submitted_leases": 1
 			},
 			{
 				"expected_status": "Reserved",
 				"docstatus" : SUBMITTED,
 				"maintenance": False,
-				"draft_leases": [{"name": "DRAFT1"}],
-				"active_leases": []
+				"draft_leases": 1,
+				"submitted_leases": 0
 			},
 			{
 				"expected_status": "Maintenance",
 				"docstatus" : SUBMITTED,
 				"maintenance": True,
-				"draft_leases": [],
-				"active_leases": []
+				"draft_leases": 0,
+				"submitted_leases": 0
 			},
 			{
 				"expected_status": "Maintenance",
 				"docstatus" : SUBMITTED,
 				"maintenance": True,
-				"draft_leases": [{"name": "DRAFT1"}],
-				"active_leases": [{"name": "ACTIVE1"}]
+				"draft_leases": 1,
+				"submitted_leases": 1
 			},
 			{
 				"expected_status": "Cancelled",
 				"docstatus": CANCELLED,
 				"maintenance": True,
-				"draft_leases": [{"name": "DRAFT1"}],
-				"active_leases": [{"name": "ACTIVE1"}]
+				"draft_leases": 1,
+				"submitted_leases": 1
 			},
 			{
 				"expected_status": "Draft",
 				"docstatus": DRAFT,
 				"maintenance": True,
-				"draft_leases": [{"name": "DRAFT1"}],
-				"active_leases": [{"name": "ACTIVE1"}]
+				"draft_leases": 1,
+				"submitted_leases": 1
 			},
 		]
 
 
 	@classmethod
 	def _add_status_test(cls, case_number, case):
-		def mock_get_all(doctype, filters=None):
-			docstatus = filters.get('docstatus')[1]
-			draft_active_leases = {
-				0: case['draft_leases'], 
-				1: case['active_leases']
-			}
-			return draft_active_leases.get(docstatus[0], [])
-
-		@patch('frappe.get_all', mock_get_all)
-		def test_method(self):
+		@patch('frappe.get_all')
+		def test_method(self, mock_get_all):
 			self.room.maintenance = case['maintenance']
 			self.room.docstatus = case['docstatus']
+			self.room.draft_leases = case['draft_leases']
+			self.room.submitted_leases = case['submitted_leases']
 
 			self.room.set_status(update=False)
 
+			with self.subTest("Status comes from the stored lease counts, without queries"):
+				mock_get_all.assert_not_called()
+
 			self.assertEqual(
 				self.room.status, 
 				case['expected_status'],
@@ -0,0 +1,27 @@
+// Copyright (c) 2024, Weaver Marquez and contributors
+// For license information, please see license.txt
+
+frappe.query_reports["Lease Payments per Month"] = {
+	"filters": [
+		{
+			"fieldname": "from_date",
+			"label": __("From Date"),
+			"fieldtype": "Date",
+		},
+		{
+			"fieldname": "to_date",
+			"label": __("To Date"),
+			"fieldtype": "Date",
+		},
+		{
+			"fieldname": "airport",
+			"label": __("Airport"),
+			"fieldtype": "Link",
+			"options": "Airport",
+		},
+	],
+
+	onload: function (report) {
+		airplane_mode.add_background_export(report);
+	},
+};
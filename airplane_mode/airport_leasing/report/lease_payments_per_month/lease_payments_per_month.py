@@ -0,0 +1,85 @@
+# Copyright (c) 2024, Weaver Marquez and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.query_builder import DocType
+from frappe.query_builder.functions import Count, Sum
+from airplane_mode.utils import report_cache
+
+@report_cache.cached("Lease Payments per Month", sources=["Sales Invoice", "Payment Entry"])
+def execute(filters=None):
+	filters = frappe._dict(filters or {})
+	columns = get_columns()
+	data = get_data(filters)
+	return columns, data
+
+def get_data(filters):
+	"""Rent invoiced and paid per airport and month, summed from the Lease Ledger."""
+	return get_query(filters).run(as_dict=True)
+
+def get_export(filters):
+	"""Columns and query for airplane_mode.utils.export."""
+	return get_columns(), get_query(filters)
+
+def get_query(filters):
+	Ledger = DocType("Lease Ledger")
+
+	query = (
+		frappe.qb
+		.from_(Ledger)
+		.select(
+			Ledger.airport.as_("airport_name"),
+			Count(Ledger.lease).distinct().as_("active_leases"),
+			Ledger.month,
+			Sum(Ledger.paid).as_("payments_received"),
+			Sum(Ledger.invoiced).as_("rent_invoiced"),
+			Sum(Ledger.outstanding).as_("outstanding"),
+		)
+		.groupby(Ledger.airport, Ledger.month)
+		.orderby(Ledger.month)
+		.orderby(Ledger.airport)
+	)
+	if filters.from_date:
+		query = query.where(Ledger.month >= frappe.utils.get_first_day(filters.from_date))
+	if filters.to_date:
+		query = query.where(Ledger.month <= filters.to_date)
+	if filters.airport:
+		query = query.where(Ledger.airport == filters.airport)
+
+	return query
+
+def get_columns():
+	columns = [
+		{
+			'fieldname': 'airport_name',
+			'label': 'Airport',
+			'fieldtype': 'Link',
+			'options': 'Airport'
+		},
+		{
+			'fieldname': 'active_leases',
+			'label': 'Active Leases',
+			'fieldtype': 'Int',
+		},
+		{
+			'fieldname': 'month',
+			'label': 'Month',
+			'fieldtype': 'Date',
+		},
+		{
+			'fieldname': 'payments_received',
+			'label': 'Payments Received',
+			'fieldtype': 'Currency',
+		},
+		{
+			'fieldname': 'rent_invoiced',
+			'label': 'Rent Invoiced',
+			'fieldtype': 'Currency',
+		},
+		{
+			'fieldname': 'outstanding',
+			'label': 'Outstanding',
+			'fieldtype': 'Currency',
+		},
+	]
+	return columns
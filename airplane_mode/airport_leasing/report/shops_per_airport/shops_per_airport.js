@@ -0,0 +1,13 @@
+// Copyright (c) 2024, Weaver Marquez and contributors
+// For license information, please see license.txt
+
+frappe.query_reports["Shops per Airport"] = {
+	"filters": [
+		{
+			"fieldname": "airport",
+			"label": __("Airport"),
+			"fieldtype": "Link",
+			"options": "Airport",
+		},
+	]
+};
@@ -0,0 +1,66 @@
+# Copyright (c) 2024, Weaver Marquez and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.query_builder import DocType
+from airplane_mode.utils import report_cache
+
+@report_cache.cached("Shops per Airport", sources=["Lease", "Room"])
+def execute(filters=None):
+	filters = frappe._dict(filters or {})
+	columns = get_columns()
+	data = get_data(filters)
+	return columns, data
+
+def get_data(filters):
+	"""Rooms with a lease, with the shop leasing them."""
+	Lease = DocType("Lease")
+	Room = DocType("Room")
+
+	query = (
+		frappe.qb
+		.from_(Lease)
+		.join(Room)
+		.on(Lease.leasing_of == Room.name)
+		.select(
+			Room.name.as_("room_name"),
+			Lease.leased_to.as_("shop_name"),
+			Room.airport.as_("airport_name"),
+			Room.status.as_("room_status"),
+		)
+		.distinct()
+		.orderby(Room.airport)
+		.orderby(Room.name)
+	)
+	if filters.airport:
+		query = query.where(Room.airport == filters.airport)
+
+	return query.run(as_dict=True)
+
+def get_columns():
+	columns = [
+		{
+			'fieldname': 'room_name',
+			'label': 'Room Name',
+			'fieldtype': 'Link',
+			'options': 'Room'
+		},
+		{
+			'fieldname': 'shop_name',
+			'label': 'Shop Name',
+			'fieldtype': 'Link',
+			'options': 'Shop'
+		},
+		{
+			'fieldname': 'airport_name',
+			'label': 'Airport Name',
+			'fieldtype': 'Link',
+			'options': 'Airport'
+		},
+		{
+			'fieldname': 'room_status',
+			'label': 'Room Status',
+			'fieldtype': 'Data',
+		},
+	]
+	return columns
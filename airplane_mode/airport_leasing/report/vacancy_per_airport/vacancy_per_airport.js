@@ -3,6 +3,21 @@
 
 frappe.query_reports["Vacancy per Airport"] = {
 	"filters": [
-
+		{
+			"fieldname": "airport",
+			"label": __("Airport"),
+			"fieldtype": "Link",
+			"options": "Airport",
+		},
+		{
+			"fieldname": "city",
+			"label": __("City"),
+			"fieldtype": "Data",
+		},
+		{
+			"fieldname": "country",
+			"label": __("Country"),
+			"fieldtype": "Data",
+		},
 	]
 };
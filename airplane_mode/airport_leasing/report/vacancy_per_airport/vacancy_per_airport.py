@@ -3,30 +3,48 @@
 
 import frappe
 from frappe.query_builder import DocType
-from frappe.query_builder.functions import Count
-from pypika.terms import Case
+from frappe.query_builder.functions import Coalesce
+from airplane_mode.utils import report_cache
 
+@report_cache.cached("Vacancy per Airport", sources=["Room", "Lease", "Airport"])
 def execute(filters=None):
-	columns_room, rooms = room_count(filters)
-	columns_shop, shops = shop_count(filters)
-	columns = columns_room + columns_shop
+	filters = frappe._dict(filters or {})
+	columns = get_columns()
+	data = get_data(filters)
+	return columns, data
+
+def get_data(filters):
+	"""Current vacancy per airport, one Airport Occupancy row each.
+
+	Airports without rooms or leases are kept by the left join and report 0."""
+	Airport = DocType("Airport")
+	Occupancy = DocType("Airport Occupancy")
 
 	query = (
 		frappe.qb
-		.from_(rooms)
-		.join(shops)
-		.on_field('airport_name')
+		.from_(Airport)
+		.left_join(Occupancy)
+		.on(Occupancy.airport == Airport.name)
 		.select(
-			rooms.star,
-			shops.shop_count
+			Airport.name.as_("airport_name"),
+			(Coalesce(Occupancy.available_rooms, 0) + Coalesce(Occupancy.reserved_rooms, 0)).as_("available_rooms"),
+			Coalesce(Occupancy.occupied_rooms, 0).as_("occupied_rooms"),
+			Coalesce(Occupancy.total_rooms, 0).as_("total_rooms"),
+			Coalesce(Occupancy.vacancy_rate, 0).as_("vacancy_rate"),
+			Coalesce(Occupancy.shop_count, 0).as_("shop_count"),
 		)
+		.orderby(Airport.name)
 	)
+	if filters.airport:
+		query = query.where(Airport.name == filters.airport)
+	if filters.city:
+		query = query.where(Airport.city == filters.city)
+	if filters.country:
+		query = query.where(Airport.country == filters.country)
 
-	results = query.run()
+	return query.run(as_dict=True)
 
-	return columns, results
-
-def room_count(filters=None):
+def get_columns():
 	columns = [
 		{
 			'fieldname': 'airport_name',
@@ -49,55 +67,15 @@ def room_count(filters=None):
 			'label': 'Total Rooms',
 			'fieldtype': 'Int',
 		},
-	]
-
-	Room = DocType("Room")
-	Airport = DocType("Airport")
-
-	query = (
-		frappe.qb
-		.from_(Room)
-		.join(Airport)
-		.on(Room.airport == Airport.name)
-		.select(
-			Airport.name.as_("airport_name"),
-			Count(Case()
-				.when((Room.status == 'Available') | (Room.status == 'Reserved'), 1)
-		  		.else_(None)).as_("available_rooms"),
-			Count(Case()
-				.when(Room.status == 'Occupied', 1)
-				.else_(None)).as_("occupied_rooms"),
-			Count(Room.name).as_("total_rooms"),
-		)
-		.where(Room.docstatus==1)
-		.groupby(Airport.name)
-	)
-
-	return columns, query
-
-def shop_count(filters=None):
-	columns = [
+		{
+			'fieldname': 'vacancy_rate',
+			'label': 'Vacancy Rate',
+			'fieldtype': 'Percent',
+		},
 		{
 			'fieldname': 'shop_count',
 			'label': 'Shop Count',
 			'fieldtype': 'Int',
-		}
+		},
 	]
-
-	Room = DocType("Room")
-	Lease = DocType("Lease")
-
-	query = (
-		frappe.qb
-		.from_(Lease)
-		.join(Room)
-		.on(Lease.leasing_of == Room.name)
-		.select(
-			Room.airport.as_("airport_name"),
-			Count(Lease.leased_to).as_("shop_count"),
-		)
-		.where(Lease.docstatus==1)
-		.groupby(Room.airport)
-	)
-	return columns, query
-	
\ No newline at end of file
+	return columns
@@ -0,0 +1,99 @@
+# Copyright (c) 2024, Weaver Marquez and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.query_builder import DocType
+from airplane_mode.utils import report_cache
+
+@report_cache.cached("Vacancy Trend", sources=["Airport Occupancy History"])
+def execute(filters=None):
+	filters = frappe._dict(filters or {})
+	columns = get_columns()
+	data = get_data(filters)
+	chart = get_chart(data)
+	return columns, data, None, chart
+
+def get_data(filters):
+	"""Daily Airport Occupancy History rows in range, as recorded; nothing is recounted."""
+	History = DocType("Airport Occupancy History")
+
+	query = (
+		frappe.qb
+		.from_(History)
+		.select(
+			History.date,
+			History.airport,
+			History.available_rooms,
+			History.reserved_rooms,
+			History.occupied_rooms,
+			History.total_rooms,
+			History.vacancy_rate,
+		)
+		.orderby(History.date)
+		.orderby(History.airport)
+	)
+	if filters.from_date:
+		query = query.where(History.date >= filters.from_date)
+	if filters.to_date:
+		query = query.where(History.date <= filters.to_date)
+	if filters.airport:
+		query = query.where(History.airport == filters.airport)
+
+	return query.run(as_dict=True)
+
+def get_chart(data):
+	"""Vacancy rate over time, one line per airport."""
+	labels = sorted({str(d.date) for d in data})
+	positions = {label: i for i, label in enumerate(labels)}
+
+	rates = {}
+	for d in data:
+		values = rates.setdefault(d.airport, [None] * len(labels))
+		values[positions[str(d.date)]] = d.vacancy_rate
+
+	datasets = [{'name': airport, 'values': values} for airport, values in rates.items()]
+	chart = {'data': {'labels': labels, 'datasets': datasets}}
+	chart['type'] = 'line'
+
+	return chart
+
+def get_columns():
+	columns = [
+		{
+			'fieldname': 'date',
+			'label': 'Date',
+			'fieldtype': 'Date',
+		},
+		{
+			'fieldname': 'airport',
+			'label': 'Airport',
+			'fieldtype': 'Link',
+			'options': 'Airport'
+		},
+		{
+			'fieldname': 'available_rooms',
+			'label': 'Available Rooms',
+			'fieldtype': 'Int',
+		},
+		{
+			'fieldname': 'reserved_rooms',
+			'label': 'Reserved Rooms',
+			'fieldtype': 'Int',
+		},
+		{
+			'fieldname': 'occupied_rooms',
+			'label': 'Occupied Rooms',
+			'fieldtype': 'Int',
+		},
+		{
+			'fieldname': 'total_rooms',
+			'label': 'Total Rooms',
+			'fieldtype': 'Int',
+		},
+		{
+			'fieldname': 'vacancy_rate',
+			'label': 'Vacancy Rate',
+			'fieldtype': 'Percent',
+		},
+	]
+	return columns
@@ -0,0 +1,126 @@
+# Copyright (c) 2024, Weaver Marquez and contributors
+# For license information, please see license.txt
+
+import click
+from frappe.commands import pass_context
+from frappe.exceptions import SiteNotSpecifiedError
+
+
+def run_on_sites(context, method):
+	"""Call method() on every site of the command, committing after each."""
+	import frappe
+
+	if not context.sites:
+		raise SiteNotSpecifiedError
+
+	for site in context.sites:
+		try:
+			frappe.init(site=site)
+			frappe.connect()
+			message = method()
+			frappe.db.commit()
+			click.echo(f"{site}: {message}")
+		finally:
+			frappe.destroy()
+
+
+@click.command('rebuild-revenue-rollup')
+@pass_context
+def rebuild_revenue_rollup(context):
+	"""Rebuild Airline Revenue Rollup and Airplane Ticket Add-on Sales from submitted Airplane Tickets."""
+	from airplane_mode.airplane_mode.doctype.airline_revenue_rollup.airline_revenue_rollup import AirlineRevenueRollup
+	from airplane_mode.airplane_mode.doctype.airplane_ticket_add_on_sales.airplane_ticket_add_on_sales import AirplaneTicketAddonSales
+
+	def rebuild():
+		revenue_rows = AirlineRevenueRollup.rebuild()
+		add_on_rows = AirplaneTicketAddonSales.rebuild()
+		return f"rebuilt {revenue_rows} revenue rollup rows and {add_on_rows} add-on sales rows"
+
+	run_on_sites(context, rebuild)
+
+
+@click.command('rebuild-lease-ledger')
+@pass_context
+def rebuild_lease_ledger(context):
+	"""Rebuild Lease Ledger from submitted Sales Invoices and Payment Entries of lease periods."""
+	from airplane_mode.airport_leasing.doctype.lease_ledger.lease_ledger import LeaseLedger
+
+	run_on_sites(context, lambda: f"rebuilt {LeaseLedger.rebuild()} lease ledger rows")
+
+
+@click.command('rebuild-lease-balances')
+@pass_context
+def rebuild_lease_balances(context):
+	"""Recompute the stored total owing, total paid and outstanding balance of every Lease."""
+	from airplane_mode.airport_leasing.doctype.lease.lease import Lease
+
+	run_on_sites(context, lambda: f"rebuilt balances of {Lease.rebuild_balances()} leases")
+
+
+@click.command('recompute-room-statuses')
+@pass_context
+def recompute_room_statuses(context):
+	"""Recount every Room's draft and submitted leases and update their statuses, e.g. after an import."""
+	from airplane_mode.airport_leasing.doctype.lease import lease_status
+
+	run_on_sites(context, lambda: f"updated the status of {lease_status.recompute_rooms()} rooms")
+
+
+@click.command('generate-synthetic-data')
+@click.option('--scale', default=1.0, type=float, help='Multiplier on the number of airlines, passengers and airports')
+@click.option('--seed', default=42, type=int, help='Same seed, same data')
+@click.option('--years', default=3, type=int, help='Years of flights and lease periods up to today')
+@pass_context
+def generate_synthetic_data(context, scale, seed, years):
+	"""Replace the synthetic airline and leasing data with a deterministic dataset. For throwaway sites only."""
+	from airplane_mode.utils.synthetic_data import SyntheticData
+
+	def generate():
+		counts = SyntheticData(scale=scale, seed=seed, years=years).generate()
+		return ", ".join(f"{count} {doctype}" for doctype, count in counts.items())
+
+	run_on_sites(context, generate)
+
+
+@click.command('run-benchmark')
+@click.option('--target', 'targets', multiple=True, help='Target to run, e.g. "report: Revenue By Airline"; all by default')
+@click.option('--runs', default=20, type=int, help='Runs per target')
+@click.option('--output', help='Write the results to this JSON file, as a baseline')
+@click.option('--compare', 'baseline', help='Compare with this baseline JSON file and fail on regressions')
+@pass_context
+def run_benchmark(context, targets, runs, output, baseline):
+	"""Time every report, scheduler job and web page of the app, with query counts and latency percentiles."""
+	from airplane_mode.utils import benchmark
+
+	regressed = []
+
+	def run():
+		results = benchmark.run(list(targets), runs)
+		for name, result in results['results'].items():
+			if 'error' in result:
+				click.echo(f"{name}: failed\n{result['error']}")
+			else:
+				click.echo(f"{name}: p50 {result['p50_ms']:.1f} ms, p95 {result['p95_ms']:.1f} ms, p99 {result['p99_ms']:.1f} ms, {result['queries']} queries")
+		if output:
+			benchmark.save(output, results)
+		if baseline:
+			for row in benchmark.compare(benchmark.load(baseline), results):
+				flag = "REGRESSED" if row['regressed'] else "ok"
+				click.echo(f"{flag} {row['target']}: p95 x{row['ratio']:.2f}, queries {row['baseline_queries']} -> {row['queries']}")
+				if row['regressed']:
+					regressed.append(row['target'])
+		return f"benchmarked {len(results['results'])} targets"
+
+	run_on_sites(context, run)
+	if regressed:
+		raise click.ClickException(f"{len(regressed)} targets regressed")
+
+
+commands = [
+	rebuild_revenue_rollup,
+	rebuild_lease_ledger,
+	rebuild_lease_balances,
+	recompute_room_statuses,
+	generate_synthetic_data,
+	run_benchmark,
+]
@@ -11,7 +11,7 @@ app_license = "mit"
 
 # include js, css files in header of desk.html
 # app_include_css = "/assets/airplane_mode/css/airplane_mode.css"
-# app_include_js = "/assets/airplane_mode/js/airplane_mode.js"
+app_include_js = "/assets/airplane_mode/js/airplane_mode.js"
 
 # include js, css files in header of web template
 # web_include_css = "/assets/airplane_mode/css/airplane_mode.css"
@@ -70,6 +70,10 @@ app_license = "mit"
 # before_install = "airplane_mode.install.before_install"
 # after_install = "airplane_mode.install.after_install"
 
+after_migrate = [
+	"airplane_mode.utils.propagation.clear_dependency_cache",
+]
+
 # Uninstallation
 # ------------
 
@@ -122,6 +126,62 @@ app_license = "mit"
 # ---------------
 # Hook on document methods and events
 
+doc_events = {
+	# Push changed values to documents that copy them with fetch_from.
+	"Airplane Flight": {
+		"on_update": [
+			"airplane_mode.utils.propagation.propagate_changes",
+			"airplane_mode.airplane_mode.doctype.airline_revenue_rollup.airline_revenue_rollup.rekey_flight",
+		],
+	},
+	"Airplane": {
+		"on_update": [
+			"airplane_mode.utils.propagation.propagate_changes",
+			"airplane_mode.airplane_mode.doctype.airline_revenue_rollup.airline_revenue_rollup.rekey_airplane",
+			"airplane_mode.airplane_mode.doctype.airplane_ticket_add_on_sales.airplane_ticket_add_on_sales.rekey_airplane",
+			"airplane_mode.airplane_mode.doctype.airplane_flight.flight_inventory.refresh_load_factors",
+			"airplane_mode.airplane_mode.doctype.airplane_flight.airplane_flight.clear_airplane_flight_pages",
+		],
+	},
+	"Airport": {
+		"on_update": "airplane_mode.utils.propagation.propagate_changes",
+		"on_change": "airplane_mode.utils.report_cache.invalidate",
+		"on_trash": "airplane_mode.utils.report_cache.invalidate",
+	},
+	"Sales Invoice": {
+		"on_submit": [
+			"airplane_mode.airport_leasing.doctype.lease_ledger.lease_ledger.record_invoice",
+			"airplane_mode.airport_leasing.doctype.lease.lease.update_invoice_balances",
+		],
+		"on_cancel": [
+			"airplane_mode.airport_leasing.doctype.lease_ledger.lease_ledger.record_invoice",
+			"airplane_mode.airport_leasing.doctype.lease.lease.update_invoice_balances",
+		],
+		"on_change": "airplane_mode.utils.report_cache.invalidate",
+		"on_trash": "airplane_mode.utils.report_cache.invalidate",
+	},
+	"Payment Entry": {
+		"on_submit": [
+			"airplane_mode.airport_leasing.doctype.lease_ledger.lease_ledger.record_payment",
+			"airplane_mode.airport_leasing.doctype.lease.lease.update_payment_balances",
+		],
+		"on_cancel": [
+			"airplane_mode.airport_leasing.doctype.lease_ledger.lease_ledger.record_payment",
+			"airplane_mode.airport_leasing.doctype.lease.lease.update_payment_balances",
+		],
+		"on_change": "airplane_mode.utils.report_cache.invalidate",
+		"on_trash": "airplane_mode.utils.report_cache.invalidate",
+	},
+	# Retire cached report results that read these doctypes.
+	**{
+		doctype: {
+			"on_change": "airplane_mode.utils.report_cache.invalidate",
+			"on_trash": "airplane_mode.utils.report_cache.invalidate",
+		}
+		for doctype in ["Airplane Ticket", "Airline", "Airplane Ticket Add-on Type", "Lease", "Room"]
+	},
+}
+
 # doc_events = {
 # 	"*": {
 # 		"on_update": "method",
@@ -143,11 +203,13 @@ scheduler_events = {
 	# 	"airplane_mode.tasks.all"
 	# ],
 	"daily": [
-		"airplane_mode.airport_leasing.doctype.lease.lease.autorenew_daily"
+		"airplane_mode.airport_leasing.doctype.lease.lease.autorenew_daily",
+		"airplane_mode.airport_leasing.doctype.lease.lease_status.recompute_daily",
+		"airplane_mode.airport_leasing.doctype.airport_occupancy_history.airport_occupancy_history.record_daily",
+	],
+	"hourly": [
+		"airplane_mode.airport_leasing.doctype.lease.lease.resume_autorenew",
 	],
-	# "hourly": [
-	# 	"airplane_mode.tasks.hourly"
-	# ],
 	# "weekly": [
 	# 	"airplane_mode.tasks.weekly"
 	# ],
@@ -0,0 +1,23 @@
+import frappe
+
+
+def execute():
+	"""Fill Airplane Flight capacity and booking counters for flights booked before they existed."""
+	frappe.db.sql("""
+		UPDATE `tabAirplane Flight` flight
+		JOIN `tabAirplane` plane ON flight.airplane = plane.name
+		SET flight.capacity = plane.capacity
+	""")
+
+	frappe.db.sql("""
+		UPDATE `tabAirplane Flight` flight
+		SET
+			flight.tickets_held = (
+				SELECT COUNT(*) FROM `tabAirplane Ticket` ticket
+				WHERE ticket.flight = flight.name AND ticket.docstatus = 0
+			),
+			flight.tickets_sold = (
+				SELECT COUNT(*) FROM `tabAirplane Ticket` ticket
+				WHERE ticket.flight = flight.name AND ticket.docstatus = 1
+			)
+	""")
@@ -0,0 +1,5 @@
+from airplane_mode.airplane_mode.doctype.airplane_flight.flight_inventory import FlightInventory
+
+
+def execute():
+	FlightInventory.refresh_availability()
@@ -0,0 +1,5 @@
+from airplane_mode.airplane_mode.doctype.airplane_ticket_add_on_sales.airplane_ticket_add_on_sales import AirplaneTicketAddonSales
+
+
+def execute():
+	AirplaneTicketAddonSales.rebuild()
@@ -0,0 +1,5 @@
+from airplane_mode.airplane_mode.doctype.airline_revenue_rollup.airline_revenue_rollup import AirlineRevenueRollup
+
+
+def execute():
+	AirlineRevenueRollup.rebuild()
@@ -0,0 +1,10 @@
+import frappe
+from airplane_mode.airport_leasing.doctype.airport_occupancy.airport_occupancy import AirportOccupancy
+from airplane_mode.airport_leasing.doctype.airport_occupancy_history.airport_occupancy_history import AirportOccupancyHistory
+
+
+def execute():
+	# Rooms used to keep their last status when cancelled; occupancy counts rooms by status.
+	frappe.db.set_value('Room', {'docstatus': 2}, 'status', 'Cancelled', update_modified=False)
+	AirportOccupancy.rebuild()
+	AirportOccupancyHistory.record()
@@ -0,0 +1,29 @@
+import frappe
+from airplane_mode.airplane_mode.doctype.airplane_flight.seat_map import SeatMap
+
+
+def execute():
+	"""Fill Airplane Flight seat maps from the seats of tickets sold before they existed.
+	Seats that do not fit the plane stay on their tickets but are not marked as taken."""
+	seats_by_flight: dict[str, list[str]] = {}
+	for ticket in frappe.get_all('Airplane Ticket', filters={'docstatus': ['<', 2]}, fields=['flight', 'seat']):
+		seats_by_flight.setdefault(ticket.flight, []).append(ticket.seat)
+
+	flights = frappe.get_all('Airplane Flight', fields=['name', 'airplane'])
+	airplanes = {
+		plane.name: plane
+		for plane in frappe.get_all('Airplane', fields=['name', 'capacity', 'seats_per_row'])
+	}
+
+	for flight in flights:
+		plane = airplanes.get(flight.airplane)
+		if not plane:
+			continue
+
+		seat_map = SeatMap(plane.capacity, plane.seats_per_row)
+		for seat in seats_by_flight.get(flight.name, []):
+			index = seat_map.parse(seat)
+			if index is not None:
+				seat_map.taken |= 1 << index
+
+		frappe.db.set_value('Airplane Flight', flight.name, 'seat_map', seat_map.encode(), update_modified=False)
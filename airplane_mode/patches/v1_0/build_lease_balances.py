@@ -0,0 +1,5 @@
+from airplane_mode.airport_leasing.doctype.lease.lease import Lease
+
+
+def execute():
+	Lease.rebuild_balances()
@@ -0,0 +1,5 @@
+from airplane_mode.airport_leasing.doctype.lease_ledger.lease_ledger import LeaseLedger
+
+
+def execute():
+	LeaseLedger.rebuild()
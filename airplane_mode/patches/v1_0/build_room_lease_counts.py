@@ -0,0 +1,5 @@
+from airplane_mode.airport_leasing.doctype.room.room import Room
+
+
+def execute():
+	Room.rebuild_lease_counts()
@@ -0,0 +1,38 @@
+// Copyright (c) 2024, Weaver Marquez and contributors
+// For license information, please see license.txt
+
+frappe.provide("airplane_mode");
+
+// Adds an "Export in Background" button to a query report. The file is written
+// by airplane_mode.utils.export on the long queue and linked in a message when ready.
+airplane_mode.add_background_export = function (report, extra_fields = []) {
+	report.page.add_inner_button(__("Export in Background"), () => {
+		frappe.prompt(
+			[
+				{
+					fieldname: "file_format",
+					label: __("File Format"),
+					fieldtype: "Select",
+					options: "CSV\nExcel",
+					default: "CSV",
+				},
+				...extra_fields,
+			],
+			(values) => {
+				frappe.call({
+					method: "airplane_mode.utils.export.export_report",
+					args: {
+						report: report.report_name,
+						filters: Object.assign(report.get_filter_values(), values),
+						file_format: values.file_format,
+					},
+					callback: () => {
+						frappe.show_alert(__("Export started. You will get a link when it is ready."));
+					},
+				});
+			},
+			__("Export {0}", [report.report_name]),
+			__("Export")
+		);
+	});
+};
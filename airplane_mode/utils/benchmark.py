@@ -0,0 +1,194 @@
+# Copyright (c) 2024, Weaver Marquez and contributors
+# For license information, please see license.txt
+
+"""Time the app's reports, scheduler jobs and web pages against a baseline.
+
+	bench --site bench.localhost run-benchmark --output baseline.json
+	bench --site bench.localhost run-benchmark --compare baseline.json
+
+Each target runs `runs` times. Per run it records wall time and the number of
+statements the connection sent to MariaDB (the session's Questions counter),
+then rolls back, so jobs start from the same data every run. Reports are timed
+uncached, through the function under the report_cache decorator.
+
+While measuring, commits are skipped, nothing is queued and emails are muted, so
+every run sees the same data and leaves nothing behind. Jobs whose hook only
+queues the work are timed on the work itself: autorenew runs autorenew_chunk
+over all of today's due leases.
+
+Results hold latency percentiles and query counts per target, plus the row
+counts of the main doctypes, so baselines from different datasets are not
+compared by mistake. Use with synthetic_data on a throwaway site.
+"""
+
+import json
+import statistics
+import time
+from contextlib import contextmanager
+from unittest.mock import patch
+
+import frappe
+from frappe.core.doctype.report.report import get_report_module_dotted_path
+
+DEFAULT_RUNS = 20
+# A target regresses when its p95 grows by more than this ratio, or its query count grows.
+LATENCY_THRESHOLD = 1.2
+DATASET_DOCTYPES = ['Airplane Ticket', 'Airplane Flight', 'Airline', 'Lease', 'Lease Period', 'Room', 'Shop']
+PAGES = ['airport_shops']
+MODULES = ['Airplane Mode', 'Airport Leasing']
+
+
+# ====================
+# TARGETS
+# ====================
+
+def get_targets() -> dict:
+	"""Every target by name: the app's script reports, scheduler jobs and web pages."""
+	targets = {}
+
+	for report in frappe.get_all('Report', filters={'module': ['in', MODULES], 'report_type': 'Script Report', 'is_standard': 'Yes'}, fields=['name', 'module'], order_by='name'):
+		execute = frappe.get_attr(f"{get_report_module_dotted_path(report.module, report.name)}.execute")
+		targets[f"report: {report.name}"] = _report_runner(getattr(execute, '__wrapped__', execute))
+
+	for methods in frappe.get_hooks('scheduler_events', app_name='airplane_mode').values():
+		if isinstance(methods, dict):
+			# cron: {expression: [methods]}
+			methods = [method for cron_methods in methods.values() for method in cron_methods]
+		for method in methods:
+			name = method.rsplit('.', 1)[-1]
+			if name in QUEUEING_JOBS:
+				name, runner = QUEUEING_JOBS[name]()
+			else:
+				runner = frappe.get_attr(method)
+			targets[f"job: {name}"] = runner
+
+	for page in PAGES:
+		targets[f"page: {page}"] = _page_runner(page)
+
+	return targets
+
+def _autorenew_runner():
+	from airplane_mode.airport_leasing.doctype.lease.lease import autorenew_chunk, autorenew_due
+
+	def run():
+		today = frappe.utils.today()
+		autorenew_chunk(autorenew_due(today), today)
+	return 'autorenew_chunk', run
+
+# Hooks that only queue background jobs, by the runner doing their work instead.
+QUEUEING_JOBS = {
+	'autorenew_daily': _autorenew_runner,
+	'resume_autorenew': _autorenew_runner,
+}
+
+def _report_runner(execute):
+	return lambda: execute(frappe._dict())
+
+def _page_runner(path):
+	from frappe.website.serve import get_response_content
+	return lambda: get_response_content(path)
+
+
+# ====================
+# RUNNER
+# ====================
+
+def run(targets: list[str] | None = None, runs: int = DEFAULT_RUNS) -> dict:
+	"""Benchmark the named targets, or all of them. Returns the results to save as a baseline."""
+	available = get_targets()
+	unknown = set(targets or []) - set(available)
+	if unknown:
+		frappe.throw(f"Unknown benchmark targets: {', '.join(sorted(unknown))}. Available: {', '.join(available)}")
+
+	results = {}
+	for name in targets or available:
+		results[name] = measure(available[name], runs)
+
+	return {
+		'site': frappe.local.site,
+		'timestamp': frappe.utils.now(),
+		'runs': runs,
+		'dataset': {doctype: frappe.db.count(doctype) for doctype in DATASET_DOCTYPES},
+		'results': results,
+	}
+
+def measure(target, runs: int) -> dict:
+	timings, queries = [], []
+	try:
+		for _ in range(runs):
+			frappe.db.rollback()
+			with isolated():
+				before = _questions()
+				start = time.perf_counter()
+				target()
+				timings.append((time.perf_counter() - start) * 1000)
+				# Less the SHOW STATUS statement reading the counter.
+				queries.append(_questions() - before - 1)
+	except Exception:
+		return {'error': frappe.get_traceback()}
+	finally:
+		frappe.db.rollback()
+
+	return {
+		'p50_ms': percentile(timings, 50),
+		'p95_ms': percentile(timings, 95),
+		'p99_ms': percentile(timings, 99),
+		'mean_ms': statistics.fmean(timings),
+		'queries': int(statistics.median(queries)),
+		'max_queries': max(queries),
+	}
+
+@contextmanager
+def isolated():
+	"""Skip commits, queue no jobs and send no emails, so a run can be rolled back whole."""
+	mute_emails = frappe.flags.mute_emails
+	frappe.flags.mute_emails = True
+	try:
+		with patch.object(frappe.db, 'commit'), patch('frappe.enqueue'):
+			yield
+	finally:
+		frappe.flags.mute_emails = mute_emails
+
+def _questions() -> int:
+	return int(frappe.db.sql("SHOW SESSION STATUS LIKE 'Questions'")[0][1])
+
+def percentile(values: list[float], p: float) -> float:
+	"""Nearest-rank percentile."""
+	ordered = sorted(values)
+	rank = max(1, -(-len(ordered) * p // 100))
+	return ordered[int(rank) - 1]
+
+
+# ====================
+# COMPARISON
+# ====================
+
+def compare(baseline: dict, current: dict, threshold: float = LATENCY_THRESHOLD) -> list[dict]:
+	"""Per target in both, the baseline and current p95 and query count, and whether it regressed."""
+	if baseline.get('dataset') != current.get('dataset'):
+		frappe.msgprint("The baseline was recorded on a different dataset; ratios may not mean much.")
+
+	rows = []
+	for name, result in current['results'].items():
+		before = baseline['results'].get(name)
+		if not before or 'error' in before or 'error' in result:
+			continue
+		ratio = result['p95_ms'] / before['p95_ms'] if before['p95_ms'] else 1
+		rows.append({
+			'target': name,
+			'baseline_p95_ms': before['p95_ms'],
+			'p95_ms': result['p95_ms'],
+			'ratio': ratio,
+			'baseline_queries': before['queries'],
+			'queries': result['queries'],
+			'regressed': ratio > threshold or result['queries'] > before['queries'],
+		})
+	return rows
+
+def load(path: str) -> dict:
+	with open(path) as f:
+		return json.load(f)
+
+def save(path: str, results: dict) -> None:
+	with open(path, 'w') as f:
+		json.dump(results, f, indent=1, sort_keys=True, default=str)
@@ -0,0 +1,131 @@
+# Copyright (c) 2024, Weaver Marquez and contributors
+# For license information, please see license.txt
+
+"""Export report rows to a private file in a background job, in constant memory.
+
+The regular report export runs execute(), holds every row in a list and builds
+the file in the web request. Here the report's query is read through an
+unbuffered cursor, so rows arrive from the database as they are written and
+never all at once, and CSV or XLSX is written row by row straight to disk.
+The file is attached to the Report and the user is told when it is ready.
+
+A report opts in by defining get_export(filters), returning its columns and the
+unrun query selecting those columns' fieldnames.
+"""
+
+import csv
+import hashlib
+import os
+
+import frappe
+
+EXPORTS = {
+	"Revenue By Airline": "airplane_mode.airplane_mode.report.revenue_by_airline.revenue_by_airline",
+	"Lease Payments per Month": "airplane_mode.airport_leasing.report.lease_payments_per_month.lease_payments_per_month",
+}
+FORMATS = ['CSV', 'Excel']
+CHUNK_SIZE = 1000
+
+
+@frappe.whitelist()
+def export_report(report: str, filters: str | dict | None = None, file_format: str = 'CSV') -> str:
+	"""Queue an export of `report` and return the job id."""
+	if report not in EXPORTS:
+		frappe.throw(f"{report} cannot be exported in the background.")
+	if file_format not in FORMATS:
+		frappe.throw(f"File format must be one of {', '.join(FORMATS)}.")
+	if not frappe.get_doc('Report', report).is_permitted():
+		frappe.throw(f"Not permitted to export {report}.", frappe.PermissionError)
+
+	job = frappe.enqueue(
+		'airplane_mode.utils.export.export_job',
+		queue='long',
+		timeout=60 * 60,
+		report=report,
+		filters=frappe.parse_json(filters or {}),
+		file_format=file_format,
+	)
+	return job.id
+
+def export_job(report: str, filters: dict, file_format: str) -> str:
+	"""Write the export file, attach it to the Report and notify the user. Returns the file url."""
+	columns, query = frappe.get_module(EXPORTS[report]).get_export(frappe._dict(filters))
+	extension = 'xlsx' if file_format == 'Excel' else 'csv'
+	file_name = f"{frappe.scrub(report)}-{frappe.utils.nowdate()}-{frappe.generate_hash(length=6)}.{extension}"
+	path = frappe.get_site_path('private', 'files', file_name)
+
+	rows = stream_rows(query, [column['fieldname'] for column in columns])
+	header = [column['label'] for column in columns]
+	row_count = write_xlsx(path, header, rows) if extension == 'xlsx' else write_csv(path, header, rows)
+
+	file = frappe.get_doc({
+		'doctype': 'File',
+		'file_name': file_name,
+		'file_url': f"/private/files/{file_name}",
+		'is_private': 1,
+		'attached_to_doctype': 'Report',
+		'attached_to_name': report,
+		'file_size': os.path.getsize(path),
+		# Set here so File does not read the whole file back to hash it.
+		'content_hash': content_hash(path),
+	}).insert(ignore_permissions=True)
+	frappe.db.commit()
+
+	frappe.publish_realtime(
+		'msgprint',
+		f"{report} export is ready: <a href='{file.file_url}'>{file_name}</a> ({row_count} rows)",
+		user=frappe.session.user,
+	)
+	return file.file_url
+
+
+# ====================
+# STREAMING
+# ====================
+
+def stream_rows(query, fieldnames: list[str]):
+	"""Yield the query's rows as lists ordered like `fieldnames`, read through an
+	unbuffered cursor in chunks of CHUNK_SIZE. Run through frappe.qb, so filter
+	values are bound as parameters rather than written into the SQL."""
+	with frappe.db.unbuffered_cursor():
+		cursor = query.run(as_dict=True, as_iterator=True)
+		while chunk := list(_take(cursor, CHUNK_SIZE)):
+			for row in chunk:
+				yield [row.get(fieldname) for fieldname in fieldnames]
+
+def _take(iterator, count: int):
+	for _, row in zip(range(count), iterator):
+		yield row
+
+def write_csv(path: str, header: list[str], rows) -> int:
+	count = 0
+	with open(path, 'w', newline='', encoding='utf-8') as f:
+		writer = csv.writer(f)
+		writer.writerow(header)
+		for row in rows:
+			writer.writerow(row)
+			count += 1
+	return count
+
+def write_xlsx(path: str, header: list[str], rows) -> int:
+	"""Write with openpyxl's write-only workbook, which spools rows to disk
+	instead of keeping a cell object for each."""
+	from openpyxl import Workbook
+
+	workbook = Workbook(write_only=True)
+	sheet = workbook.create_sheet()
+	sheet.append(header)
+	count = 0
+	for row in rows:
+		sheet.append(row)
+		count += 1
+	workbook.save(path)
+	return count
+
+def content_hash(path: str) -> str:
+	"""md5 of the file, as File computes it, read in blocks."""
+	md5 = hashlib.md5()
+	with open(path, 'rb') as f:
+		while block := f.read(1024 * 1024):
+			md5.update(block)
+	return md5.hexdigest()
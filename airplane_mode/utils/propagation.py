@@ -0,0 +1,198 @@
+# Copyright (c) 2024, Weaver Marquez and contributors
+# For license information, please see license.txt
+
+"""Keep fetch_from copies in sync when their source document changes.
+
+Frappe only fetches linked values when the dependent document itself is saved,
+so e.g. a ticket keeps its flight's old departure time after a schedule change.
+This reads every `fetch_from` in the doctype metadata into a dependency graph:
+
+	Airport.code -> Airplane Flight.source_airport_code -> Airplane Ticket.source_airport_code
+
+and when a source document changes, rewrites its dependents with one UPDATE per
+dependent doctype and chunk of links, hop by hop. Dependents are written
+directly, so instead of a Version row and realtime message per document the
+source gets one summary comment and each touched doctype one list_update.
+"""
+
+from collections import defaultdict
+
+import frappe
+from frappe.query_builder import Criterion
+from frappe.query_builder.functions import Count
+from frappe.utils import create_batch
+
+# Past this many dependent rows, counted across every hop, propagate_changes runs in the background.
+BACKGROUND_THRESHOLD = 100
+CHUNK_SIZE = 500
+MAX_DEPTH = 4
+CACHE_KEY = 'airplane_mode:fetch_from_dependents'
+
+
+# ====================
+# DEPENDENCY GRAPH
+# ====================
+
+def get_dependents(doctype: str) -> list[dict]:
+	"""Every doctype copying values from `doctype`, as
+	{'doctype': target, 'link_field': link on target, 'fields': {source field: target field}}."""
+	graph = frappe.cache().get_value(CACHE_KEY)
+	if graph is None:
+		graph = build_dependency_graph()
+		frappe.cache().set_value(CACHE_KEY, graph)
+	return graph.get(doctype, [])
+
+def source_fields(doctype: str) -> set[str]:
+	return {field for dependent in get_dependents(doctype) for field in dependent['fields']}
+
+def build_dependency_graph() -> dict[str, list[dict]]:
+	filters = {'fetch_from': ['is', 'set'], 'fetch_if_empty': 0}
+	fetched = frappe.get_all('DocField', filters=filters, fields=['parent', 'fieldname', 'fetch_from'])
+	fetched += frappe.get_all('Custom Field', filters=filters, fields=['dt as parent', 'fieldname', 'fetch_from'])
+
+	graph = defaultdict(lambda: defaultdict(dict))
+	for row in fetched:
+		link_field, _, source_field = row.fetch_from.partition('.')
+		link = frappe.get_meta(row.parent).get_field(link_field)
+		if not (source_field and link and link.fieldtype == 'Link'):
+			continue
+		graph[link.options][(row.parent, link_field)][source_field] = row.fieldname
+
+	return {
+		source: [
+			{'doctype': doctype, 'link_field': link_field, 'fields': fields}
+			for (doctype, link_field), fields in dependents.items()
+		]
+		for source, dependents in graph.items()
+	}
+
+def clear_dependency_cache() -> None:
+	"""after_migrate hook: fetch_from fields may have changed."""
+	frappe.cache().delete_value(CACHE_KEY)
+
+
+# ====================
+# PROPAGATION
+# ====================
+
+def propagate_changes(doc, method=None) -> None:
+	"""doc_events hook: push the changed source fields of `doc` to every fetch_from copy."""
+	if not doc.get_doc_before_save():
+		# Nothing has fetched from a brand new document yet.
+		return
+
+	fields = sorted(field for field in source_fields(doc.doctype) if doc.has_value_changed(field))
+	if not fields:
+		return
+
+	if count_dependents(doc.doctype, [doc.name]) > BACKGROUND_THRESHOLD:
+		frappe.enqueue(
+			'airplane_mode.utils.propagation.propagate_job',
+			queue='short',
+			enqueue_after_commit=True,
+			doctype=doc.doctype,
+			name=doc.name,
+			fields=fields,
+		)
+		frappe.msgprint("Linked documents will show the new values in a moment.", alert=True)
+	else:
+		propagate_job(doc.doctype, doc.name, fields, doc=doc)
+
+def propagate_job(doctype: str, name: str, fields: list[str], doc=None) -> None:
+	"""Propagate the current values of `fields`, so a job queued behind a newer change
+	still settles on the latest values."""
+	doc = doc or frappe.get_doc(doctype, name)
+	changed = propagate(doctype, [name], {field: doc.get(field) for field in fields})
+	changed = {target: count for target, count in changed.items() if count}
+	if not changed:
+		return
+
+	summary = ", ".join(f"{count} {target}" for target, count in changed.items())
+	doc.add_comment('Info', f"Copied {', '.join(fields)} to {summary}.")
+	for target in changed:
+		frappe.publish_realtime('list_update', {'doctype': target, 'name': None}, after_commit=True)
+
+	if 'Airplane Flight' in changed:
+		# Written directly, so the flights' on_change never cleared their cached search and list rows.
+		from airplane_mode.airplane_mode.doctype.airplane_flight.airplane_flight import clear_flight_cache
+		clear_flight_cache()
+
+def propagate(doctype: str, names: list[str], values: dict, depth: int = 0) -> dict[str, int]:
+	"""Copy `values` (source field -> new value), shared by the documents `names`, to all their dependents.
+
+	Returns:
+		The number of rows changed per dependent doctype
+	"""
+	changed = defaultdict(int)
+	if not names or depth >= MAX_DEPTH:
+		return changed
+
+	for dependent in get_dependents(doctype):
+		target, link_field = dependent['doctype'], dependent['link_field']
+		target_values = {
+			target_field: values[source_field]
+			for source_field, target_field in dependent['fields'].items()
+			if source_field in values
+		}
+		if not target_values:
+			continue
+
+		for batch in create_batch(names, CHUNK_SIZE):
+			changed[target] += _update_dependents(target, link_field, batch, target_values)
+
+		# The rows just written may be sources themselves, e.g. Airport -> Airplane Flight -> Airplane Ticket.
+		if get_dependents(target):
+			target_names = frappe.get_all(
+				target, filters={link_field: ['in', names], 'docstatus': ['<', 2]}, pluck='name'
+			)
+			for next_target, count in propagate(target, target_names, target_values, depth + 1).items():
+				changed[next_target] += count
+
+	return changed
+
+def count_dependents(doctype: str, names: list[str], limit: int = BACKGROUND_THRESHOLD, depth: int = 0) -> int:
+	"""Rows linked to the documents through fetch_from links, hop by hop as propagate follows them.
+	Stops once past `limit`, as propagate_changes only needs to know whether it is."""
+	total = 0
+	if not names or depth >= MAX_DEPTH:
+		return total
+
+	for dependent in get_dependents(doctype):
+		target = dependent['doctype']
+		filters = {dependent['link_field']: ['in', names], 'docstatus': ['<', 2]}
+		if get_dependents(target):
+			target_names = frappe.get_all(target, filters=filters, pluck='name', limit=limit - total + 1)
+			total += len(target_names)
+			if total <= limit:
+				total += count_dependents(target, target_names, limit - total, depth + 1)
+		else:
+			total += frappe.db.count(target, filters)
+		if total > limit:
+			break
+
+	return total
+
+def _update_dependents(doctype: str, link_field: str, names: list[str], values: dict) -> int:
+	"""One UPDATE for the rows linked to `names` holding stale copies. Cancelled rows keep their history."""
+	table = frappe.qb.DocType(doctype)
+	stale = [
+		table[field].isnotnull() if value is None else table[field].isnull() | (table[field] != value)
+		for field, value in values.items()
+	]
+	condition = table[link_field].isin(names) & (table.docstatus < 2) & Criterion.any(stale)
+
+	count = frappe.qb.from_(table).select(Count('*')).where(condition).run()[0][0]
+	if not count:
+		return 0
+
+	query = (
+		frappe.qb.update(table)
+		.set(table.modified, frappe.utils.now())
+		.set(table.modified_by, frappe.session.user)
+		.where(condition)
+	)
+	for field, value in values.items():
+		query = query.set(table[field], value)
+	query.run()
+
+	return count
@@ -0,0 +1,118 @@
+# Copyright (c) 2024, Weaver Marquez and contributors
+# For license information, please see license.txt
+
+"""Shared result cache for the app's script reports.
+
+A report's execute() is wrapped with `cached`, naming the doctypes its data
+comes from. Results are stored in redis under the report name, its filters,
+the user's roles and user permissions, and the current version of each source
+doctype. doc_events bump a doctype's version after any change to one of its
+documents commits, so a cached result is reused exactly until its data changes
+and stale entries are simply never read again.
+
+Memory stays bounded: every entry is also scored by last use in a sorted set,
+and past MAX_ENTRIES the least recently used entries are evicted. Hits and
+misses are counted per report; see `get_stats`.
+"""
+
+import functools
+import hashlib
+import time
+
+import frappe
+
+MAX_ENTRIES = 500
+DEFAULT_TTL = 24 * 60 * 60
+NAMESPACE = 'airplane_mode:report_cache'
+VERSIONS_KEY = f'{NAMESPACE}:versions'
+LRU_KEY = f'{NAMESPACE}:lru'
+STATS_KEY = f'{NAMESPACE}:stats'
+
+
+# ====================
+# CACHE
+# ====================
+
+def cached(report: str, sources: list[str], ttl: int = DEFAULT_TTL):
+	"""Decorator for a script report's execute(filters=None).
+
+	Args:
+		report: Report name, to key and count its entries
+		sources: Doctypes whose changes must invalidate the report
+		ttl: Seconds an unused entry may live at most
+	"""
+	def decorator(execute):
+		@functools.wraps(execute)
+		def wrapper(filters=None):
+			key = cache_key(report, sources, filters)
+			result = frappe.cache().get_value(key)
+			record_use(report, key, hit=result is not None)
+			if result is None:
+				result = execute(filters)
+				frappe.cache().set_value(key, result, expires_in_sec=ttl)
+				evict()
+			return result
+		return wrapper
+	return decorator
+
+def cache_key(report: str, sources: list[str], filters: dict | None) -> str:
+	filter_key = {key: value for key, value in (filters or {}).items() if value not in (None, '', [])}
+	permission_key = {
+		'roles': sorted(frappe.get_roles()),
+		'user_permissions': frappe.permissions.get_user_permissions(),
+	}
+	parts = frappe.as_json([filter_key, permission_key, get_versions(sources)], indent=None)
+	return f"{NAMESPACE}:{report}:{hashlib.sha1(parts.encode()).hexdigest()}"
+
+def record_use(report: str, key: str, *, hit: bool) -> None:
+	cache = frappe.cache()
+	cache.zadd(cache.make_key(LRU_KEY), {key: time.time()})
+	cache.hincrby(cache.make_key(STATS_KEY), f"{report}|{'hits' if hit else 'misses'}", 1)
+
+def evict() -> None:
+	"""Drop the least recently used entries beyond MAX_ENTRIES."""
+	cache = frappe.cache()
+	lru = cache.make_key(LRU_KEY)
+	excess = cache.zcard(lru) - MAX_ENTRIES
+	if excess > 0:
+		for key, _ in cache.zpopmin(lru, excess):
+			cache.delete_value(frappe.safe_decode(key))
+
+
+# ====================
+# VERSIONS
+# ====================
+
+def get_versions(doctypes: list[str]) -> list[int]:
+	cache = frappe.cache()
+	return [int(version or 0) for version in cache.hmget(cache.make_key(VERSIONS_KEY), doctypes)]
+
+def bump_version(doctype: str) -> None:
+	cache = frappe.cache()
+	cache.hincrby(cache.make_key(VERSIONS_KEY), doctype, 1)
+
+def invalidate(doc, method=None) -> None:
+	"""doc_events hook: retire every cached report that reads this doctype, once the change commits.
+	Bumping any earlier would let a concurrent request cache uncommitted data under the new version."""
+	frappe.db.after_commit.add(functools.partial(bump_version, doc.doctype))
+
+
+# ====================
+# METRICS
+# ====================
+
+@frappe.whitelist()
+def get_stats() -> dict:
+	"""Hits, misses and hit rate per report, and the number of cached entries."""
+	frappe.only_for('System Manager')
+	cache = frappe.cache()
+	stats = {}
+	for field, count in cache.hgetall(cache.make_key(STATS_KEY)).items():
+		report, _, kind = frappe.safe_decode(field).rpartition('|')
+		stats.setdefault(report, {'hits': 0, 'misses': 0})[kind] = int(count)
+
+	for counts in stats.values():
+		total = counts['hits'] + counts['misses']
+		counts['hit_rate'] = counts['hits'] / total if total else 0
+
+	return {'reports': stats, 'entries': cache.zcard(cache.make_key(LRU_KEY)), 'max_entries': MAX_ENTRIES}
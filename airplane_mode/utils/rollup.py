@@ -0,0 +1,54 @@
+# Copyright (c) 2024, Weaver Marquez and contributors
+# For license information, please see license.txt
+
+"""Counter tables that ticket events add to, instead of reports rescanning tickets.
+
+A counter row's name is a hash of its key fields, so the same key always lands
+on the same row and `upsert` can add deltas to it with INSERT ... ON DUPLICATE
+KEY UPDATE, without reading it first or racing another insert of the same key.
+"""
+
+import hashlib
+
+import frappe
+from frappe.utils import create_batch
+from pypika.terms import Values
+
+BATCH_SIZE = 1000
+
+
+def rollup_name(key_fields: list[str], row: dict) -> str:
+	key = '|'.join(str(row.get(field) or '') for field in key_fields)
+	return hashlib.sha1(key.encode()).hexdigest()[:20]
+
+
+def upsert(doctype: str, key_fields: list[str], value_fields: list[str], rows: list[dict], *, increment: bool = True) -> None:
+	"""Add each row's values to the counter row with the same key, creating it if missing.
+	One statement per batch of rows.
+
+	Args:
+		increment: Add to the stored values. If False, overwrite them, for snapshots.
+	"""
+	Table = frappe.qb.DocType(doctype)
+	now, user = frappe.utils.now(), frappe.session.user
+	fields = key_fields + value_fields
+
+	for batch in create_batch(rows, BATCH_SIZE):
+		query = (
+			frappe.qb.into(Table)
+			.columns('name', 'creation', 'modified', 'owner', 'modified_by', *fields)
+		)
+		for row in batch:
+			query = query.insert(rollup_name(key_fields, row), now, now, user, user,
+				*(row.get(field) for field in fields))
+		for field in value_fields:
+			value = Table[field] + Values(Table[field]) if increment else Values(Table[field])
+			query = query.on_duplicate_key_update(Table[field], value)
+		query = query.on_duplicate_key_update(Table.modified, Values(Table.modified))
+		query.run()
+
+
+def flight_airline(flight: str) -> str | None:
+	"""Airline flying an Airplane Flight, from the document cache."""
+	airplane = frappe.get_cached_value('Airplane Flight', flight, 'airplane')
+	return airplane and frappe.get_cached_value('Airplane', airplane, 'airline')
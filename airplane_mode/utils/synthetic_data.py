@@ -0,0 +1,453 @@
+# Copyright (c) 2024, Weaver Marquez and contributors
+# For license information, please see license.txt
+
+"""Deterministic synthetic datasets, to see how the app behaves at production scale.
+
+	bench --site bench.localhost generate-synthetic-data --scale 10 --seed 42
+
+The same seed, scale and years always produce the same documents, names and
+amounts; dates are laid out relative to the anchor date (today by default), so
+scheduler jobs find leases due on the day they run. Every generated name starts
+with PREFIX and a dash, and generating again first deletes the previous
+synthetic rows, matching that case-sensitively.
+
+Rows are bulk inserted as their submitted state instead of going through the
+controllers, which at this volume would take hours. Sales Invoices and Payment
+Entries only carry the fields this app reads: they have no items, GL entries or
+ledger postings, so run this on a throwaway site, never on one with real books.
+Counter tables and snapshots are rebuilt at the end.
+"""
+
+import random
+
+import frappe
+from frappe.utils import add_days, cint, getdate
+from frappe.website.utils import cleanup_page_name
+from airplane_mode.airplane_mode.doctype.airplane_flight.seat_map import SeatMap
+
+PREFIX = 'SYN'
+PASSENGER_MARKER = f'{PREFIX}-Passenger'
+BATCH_SIZE = 5000
+
+# Sizes at scale 1; scale multiplies the top-level counts.
+SIZES = {
+	'airlines': 5,
+	'airplanes_per_airline': 10,
+	'flights_per_airplane': 10,
+	'passengers': 5000,
+	'airports': 10,
+	'rooms_per_airport': 30,
+}
+SCALED = ('airlines', 'passengers', 'airports')
+ADD_ONS = {
+	'Extra Baggage': 50,
+	'Meal': 20,
+	'Priority Boarding': 30,
+	'Wi-Fi': 15,
+	'Lounge Access': 60,
+}
+LEASED_SHARE = 0.8
+MAINTENANCE_SHARE = 0.05
+UNPAID_SHARE = 0.03
+
+
+class SyntheticData:
+	"""One dataset: call `generate` once."""
+
+	def __init__(self, *, scale: float = 1, seed: int = 42, years: int = 3, anchor=None):
+		self.rng = random.Random(seed)
+		self.sizes = {key: max(1, round(size * scale)) if key in SCALED else size for key, size in SIZES.items()}
+		self.years = years
+		self.today = getdate(anchor or frappe.utils.today())
+		self.first_day = add_days(self.today, -365 * years)
+		self.counts = {}
+
+	def generate(self) -> dict:
+		"""Replace the previous synthetic data and rebuild the app's counter tables.
+		Returns the number of rows inserted per doctype."""
+		clear()
+		self.generate_airlines()
+		self.generate_leasing()
+		rebuild_derived(self.first_day, self.today)
+		return self.counts
+
+	# ====================
+	# AIRLINES
+	# ====================
+
+	def generate_airlines(self) -> None:
+		airports = self.generate_airports()
+		add_ons = [
+			{'name': f"{PREFIX}-{name}", 'weight': 'Informative', 'price': price}
+			for name, price in ADD_ONS.items()
+		]
+		self.insert('Airplane Ticket Add-on Type', [
+			{'name': add_on['name'], 'weight': add_on['weight'], 'docstatus': 0} for add_on in add_ons
+		])
+		passengers = self.generate_passengers()
+
+		for a in range(self.sizes['airlines']):
+			airline = f"{PREFIX}-Airline-{a + 1:03}"
+			self.insert('Airline', [{
+				'name': airline,
+				'founding_year': self.rng.randint(1920, 2015),
+				'customer_care_number': f"+1-555-{self.rng.randint(1000, 9999)}",
+				'headquarters': self.rng.choice(airports)['city'],
+				'docstatus': 0,
+			}])
+			for p in range(self.sizes['airplanes_per_airline']):
+				self.generate_airplane(f"{airline}-{p + 1:03}", airline, airports, add_ons, passengers)
+
+	def generate_airports(self) -> list[dict]:
+		airports = [
+			{
+				'name': f"{PREFIX}-Airport-{i + 1:03}",
+				# Rooms are named by airport code and number, so the code carries the dash too.
+				'code': f"{PREFIX}-{i + 1:03}",
+				'city': f"{PREFIX} City {i + 1}",
+				'country': f"{PREFIX} Country {i % 5 + 1}",
+				'docstatus': 0,
+			}
+			for i in range(self.sizes['airports'])
+		]
+		self.insert('Airport', airports)
+		return airports
+
+	def generate_passengers(self) -> list[int]:
+		"""Flight Passenger is named by autoincrement, so continue after the highest name."""
+		start = cint(frappe.db.sql("select max(name) from `tabFlight Passenger`")[0][0]) + 1
+		names = list(range(start, start + self.sizes['passengers']))
+		self.insert('Flight Passenger', [
+			{
+				'name': name,
+				'first_name': f"Passenger {name}",
+				'last_name': PASSENGER_MARKER,
+				'full_name': f"Passenger {name} {PASSENGER_MARKER}",
+				'date_of_birth': add_days(self.today, -self.rng.randint(18 * 365, 80 * 365)),
+				'docstatus': 0,
+			}
+			for name in names
+		])
+		return names
+
+	def generate_airplane(self, airplane: str, airline: str, airports: list[dict], add_ons: list[dict], passengers: list[int]) -> None:
+		capacity = self.rng.choice([120, 150, 180, 240, 300])
+		seats_per_row = 6
+		self.insert('Airplane', [{
+			'name': airplane,
+			'airline': airline,
+			'model': self.rng.choice(['A320', 'A321', 'B737', 'B787', 'A350']),
+			'capacity': capacity,
+			'seats_per_row': seats_per_row,
+			'initial_audit_completed': 1,
+			'docstatus': 0,
+		}])
+
+		flights, tickets, items = [], [], []
+		for f in range(self.sizes['flights_per_airplane']):
+			flight = f"{airplane}-{f + 1:05}"
+			source, destination = self.rng.sample(airports, 2)
+			departure = add_days(self.first_day, self.rng.randint(0, 365 * self.years + 90))
+			sold = int(capacity * self.rng.uniform(0.3, 0.95))
+			flights.append({
+				'name': flight,
+				'airplane': airplane,
+				'date_of_departure': departure,
+				'time_of_departure': f"{self.rng.randint(5, 22):02}:{self.rng.choice(['00', '15', '30', '45'])}:00",
+				'duration': self.rng.randint(3600, 12 * 3600),
+				'status': 'Completed' if departure < self.today else 'Scheduled',
+				'source_airport': source['name'],
+				'destination_airport': destination['name'],
+				'source_airport_code': source['code'],
+				'destination_airport_code': destination['code'],
+				'gate_number': f"G{self.rng.randint(1, 40)}",
+				'published': 1,
+				'route': f"flights/{cleanup_page_name(flight)}",
+				'capacity': capacity,
+				'tickets_sold': sold,
+				'tickets_held': 0,
+				'seats_available': capacity - sold,
+				'load_factor': 100 * sold / capacity,
+				'seat_map': SeatMap(capacity, seats_per_row, (1 << sold) - 1).encode(),
+				'docstatus': 1,
+			})
+
+			seats = SeatMap(capacity, seats_per_row)
+			for t in range(sold):
+				ticket = f"{flight}-{source['code']}-to-{destination['code']}-{t + 1:03}"
+				price = self.rng.randrange(100, 900, 5)
+				chosen = self.rng.sample(add_ons, self.rng.choice([0, 0, 1, 1, 2, 3]))
+				for idx, add_on in enumerate(chosen, start=1):
+					items.append({
+						'name': f"{ticket}-{idx}",
+						'parent': ticket,
+						'parenttype': 'Airplane Ticket',
+						'parentfield': 'add_ons',
+						'idx': idx,
+						'item': add_on['name'],
+						'amount': add_on['price'],
+						'docstatus': 1,
+					})
+				tickets.append({
+					'name': ticket,
+					'passenger': self.rng.choice(passengers),
+					'flight': flight,
+					'source_airport_code': source['code'],
+					'destination_airport_code': destination['code'],
+					'departure_date': departure,
+					'status': 'Booked',
+					'seat': seats.label(t),
+					'flight_price': price,
+					'total_amount': price + sum(add_on['price'] for add_on in chosen),
+					'docstatus': 1,
+				})
+
+		self.insert('Airplane Flight', flights)
+		self.insert('Airplane Ticket', tickets)
+		self.insert('Airplane Ticket Add-on Item', items)
+
+	# ====================
+	# LEASING
+	# ====================
+
+	def generate_leasing(self) -> None:
+		company = frappe.defaults.get_global_default('company') or frappe.db.get_value('Company', {}, 'name')
+		if not company:
+			frappe.throw("Create a Company before generating leases.")
+
+		customer_group = frappe.db.get_single_value('Selling Settings', 'customer_group') or 'All Customer Groups'
+		territory = frappe.db.get_single_value('Selling Settings', 'territory') or 'All Territories'
+		lease_number = 0
+
+		for airport in frappe.get_all('Airport', filters={'name': ['like', f'{PREFIX}-%']}, fields=['name', 'code'], order_by='name'):
+			rooms, items, customers, shops = [], [], [], []
+			leases, periods, payments, invoices, entries, references = [], [], [], [], [], []
+
+			for r in range(self.sizes['rooms_per_airport']):
+				room = f"{airport.code}{100 + r}"
+				rate = self.rng.randrange(200, 3000, 50)
+				draw = self.rng.random()
+				status = 'Maintenance' if draw < MAINTENANCE_SHARE else 'Occupied' if draw < MAINTENANCE_SHARE + LEASED_SHARE else 'Available'
+				rooms.append({
+					'name': room,
+					'airport': airport.name,
+					'room_number': 100 + r,
+					'area': self.rng.randint(20, 400),
+					'capacity': self.rng.randint(5, 120),
+					'rental_rate_override': rate,
+					'rental_rate': rate,
+					'maintenance': int(status == 'Maintenance'),
+					'status': status,
+					'docstatus': 1,
+				})
+				items.append({
+					'name': room,
+					'item_code': room,
+					'item_name': room,
+					'item_group': 'Real Estate Leasing',
+					'stock_uom': 'Week',
+					'sales_uom': 'Week',
+					'standard_rate': rate,
+					'is_stock_item': 0,
+					'is_purchase_item': 0,
+					'docstatus': 0,
+				})
+				if status != 'Occupied':
+					continue
+
+				lease_number += 1
+				lease = f"{PREFIX}-Lease-{lease_number:05}"
+				customer = f"{PREFIX}-Customer-{lease_number:05}"
+				shop = f"{PREFIX}-Shop-{lease_number:05}"
+				customers.append({
+					'name': customer,
+					'customer_name': customer,
+					'customer_type': 'Company',
+					'customer_group': customer_group,
+					'territory': territory,
+					'docstatus': 0,
+				})
+				shops.append({
+					'name': shop,
+					'shop_name': shop,
+					'shop_number': lease_number,
+					'owned_by': customer,
+					'shop_type': self.rng.choice(['Restaurant', 'Retail', 'Services']),
+					'docstatus': 0,
+				})
+
+				period_length = 'Monthly' if self.rng.random() < 0.8 else 'Quarterly'
+				weeks = 4 if period_length == 'Monthly' else 12
+				start_date = add_days(self.first_day, self.rng.randint(0, 90))
+				end_date = add_days(self.today, self.rng.randint(30, 720))
+
+				overdue = False
+				period_start = start_date
+				idx = paid_count = 0
+				while period_start <= self.today:
+					idx += 1
+					period_end = min(add_days(period_start, 7 * weeks), end_date)
+					invoice = f"{PREFIX}-SINV-{lease_number:05}-{idx:03}"
+					due_date = add_days(period_start, 14)
+					amount = rate * weeks
+					paid = period_end < add_days(self.today, -30) and self.rng.random() >= UNPAID_SHARE
+					status = 'Paid' if paid else 'Overdue' if due_date < self.today else 'Unpaid'
+					overdue = overdue or status == 'Overdue'
+
+					invoices.append({
+						'name': invoice,
+						'customer': customer,
+						'customer_name': customer,
+						'company': company,
+						'posting_date': period_start,
+						'due_date': due_date,
+						'grand_total': amount,
+						'base_grand_total': amount,
+						'rounded_total': amount,
+						'outstanding_amount': 0 if paid else amount,
+						'status': status,
+						'docstatus': 1,
+					})
+					periods.append({
+						'name': invoice,
+						'parent': lease,
+						'parenttype': 'Lease',
+						'parentfield': 'periods',
+						'idx': idx,
+						'start_date': period_start,
+						'end_date': period_end,
+						'invoice': invoice,
+						'docstatus': 1,
+					})
+					if paid:
+						entry = f"{PREFIX}-PE-{lease_number:05}-{idx:03}"
+						payment_date = add_days(due_date, -self.rng.randint(0, 14))
+						entries.append({
+							'name': entry,
+							'payment_type': 'Receive',
+							'party_type': 'Customer',
+							'party': customer,
+							'company': company,
+							'posting_date': payment_date,
+							'paid_amount': amount,
+							'received_amount': amount,
+							'reference_no': entry,
+							'reference_date': payment_date,
+							'docstatus': 1,
+						})
+						references.append({
+							'name': entry,
+							'parent': entry,
+							'parenttype': 'Payment Entry',
+							'parentfield': 'references',
+							'idx': 1,
+							'reference_doctype': 'Sales Invoice',
+							'reference_name': invoice,
+							'allocated_amount': amount,
+							'docstatus': 1,
+						})
+						paid_count += 1
+						payments.append({
+							'name': entry,
+							'parent': lease,
+							'parenttype': 'Lease',
+							'parentfield': 'payments',
+							'idx': paid_count,
+							'payment_date': payment_date,
+							'payment_entry': entry,
+							'paid_amount': amount,
+							'docstatus': 1,
+						})
+					last_end = period_end
+					period_start = add_days(period_end, 1)
+
+				renewal = add_days(last_end, -14)
+				leases.append({
+					'name': lease,
+					'leased_from': company,
+					'leased_to': shop,
+					'leasing_of': room,
+					'period_length': period_length,
+					'start_date': start_date,
+					'end_date': end_date,
+					'next_date': min(end_date, max(self.today, renewal)),
+					'status': 'Overdue' if overdue else 'Active',
+					'docstatus': 1,
+				})
+
+			self.insert('Room', rooms)
+			self.insert('Item', items)
+			self.insert('Customer', customers)
+			self.insert('Shop', shops)
+			self.insert('Sales Invoice', invoices)
+			self.insert('Payment Entry', entries)
+			self.insert('Payment Entry Reference', references)
+			self.insert('Lease', leases)
+			self.insert('Lease Period', periods)
+			self.insert('Lease Payment', payments)
+
+	# ====================
+	# HELPERS
+	# ====================
+
+	def insert(self, doctype: str, rows: list[dict]) -> None:
+		"""Bulk insert rows that all have the same keys."""
+		if not rows:
+			return
+
+		now, user = frappe.utils.now(), frappe.session.user
+		fields = ['creation', 'modified', 'owner', 'modified_by', *rows[0]]
+		frappe.db.bulk_insert(doctype, fields, [(now, now, user, user, *row.values()) for row in rows], chunk_size=BATCH_SIZE)
+		self.counts[doctype] = self.counts.get(doctype, 0) + len(rows)
+
+
+# Children before parents, so each delete can still find its rows by parent.
+CLEAR_ORDER = [
+	('Airplane Ticket Add-on Item', 'parent'),
+	('Airplane Ticket', 'name'),
+	('Airplane Flight', 'name'),
+	('Airplane', 'name'),
+	('Airline', 'name'),
+	('Airplane Ticket Add-on Type', 'name'),
+	('Lease Payment', 'parent'),
+	('Lease Period', 'parent'),
+	('Lease', 'name'),
+	('Payment Entry Reference', 'parent'),
+	('Payment Entry', 'name'),
+	('Sales Invoice', 'name'),
+	('Shop', 'name'),
+	('Customer', 'name'),
+	('Item', 'name'),
+	('Room', 'name'),
+	('Airport', 'name'),
+]
+
+def clear() -> None:
+	"""Delete every synthetic row: those named with PREFIX and a dash, compared case-sensitively,
+	since LIKE alone would also match real names such as "Synergy Ltd" or "sync-cable"."""
+	for doctype, field in CLEAR_ORDER:
+		frappe.db.sql(f"delete from `tab{doctype}` where `{field}` like binary %s", (f'{PREFIX}-%',))
+	frappe.db.delete('Flight Passenger', {'last_name': PASSENGER_MARKER})
+
+def rebuild_derived(first_day, today) -> None:
+	"""Rebuild the counter tables and snapshots the generated rows bypassed,
+	with a day of occupancy history for every day in range."""
+	from airplane_mode.airplane_mode.doctype.airline_revenue_rollup.airline_revenue_rollup import AirlineRevenueRollup
+	from airplane_mode.airplane_mode.doctype.airplane_ticket_add_on_sales.airplane_ticket_add_on_sales import AirplaneTicketAddonSales
+	from airplane_mode.airport_leasing.doctype.airport_occupancy.airport_occupancy import AirportOccupancy
+	from airplane_mode.airport_leasing.doctype.airport_occupancy_history.airport_occupancy_history import AirportOccupancyHistory
+	from airplane_mode.airport_leasing.doctype.lease.lease import Lease
+	from airplane_mode.airport_leasing.doctype.lease_ledger.lease_ledger import LeaseLedger
+	from airplane_mode.airport_leasing.doctype.room.room import Room
+
+	AirlineRevenueRollup.rebuild()
+	AirplaneTicketAddonSales.rebuild()
+	Room.rebuild_lease_counts()
+	AirportOccupancy.rebuild()
+	LeaseLedger.rebuild()
+	Lease.rebuild_balances()
+
+	date = getdate(first_day)
+	while date <= today:
+		AirportOccupancyHistory.record(date)
+		date = add_days(date, 1)
@@ -0,0 +1,88 @@
+# Copyright (c) 2024, Weaver Marquez and Contributors
+# See license.txt
+
+import csv
+import os
+from unittest.mock import MagicMock, patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from airplane_mode.utils import export
+
+
+class TestExport(FrappeTestCase):
+	"""export against real Airline rows, written with db_insert, streamed in chunks of 3."""
+
+	AIRLINES = [f"_Test Export Airline {i:02}" for i in range(1, 9)]
+	COLUMNS = [
+		{'label': 'Airline', 'fieldname': 'airline', 'fieldtype': 'Link', 'options': 'Airline'},
+		{'label': 'Founded', 'fieldname': 'founding_year', 'fieldtype': 'Int'},
+	]
+
+	def setUp(self):
+		for year, name in enumerate(self.AIRLINES, start=1990):
+			frappe.get_doc({'doctype': 'Airline', 'name': name, 'founding_year': year}).db_insert()
+
+		chunk_size = patch.object(export, 'CHUNK_SIZE', 3)
+		chunk_size.start()
+		self.addCleanup(chunk_size.stop)
+
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def query(self):
+		Airline = frappe.qb.DocType('Airline')
+		return (
+			frappe.qb.from_(Airline)
+			.select(Airline.founding_year, Airline.name.as_('airline'))
+			.where(Airline.name.like('_Test Export Airline%'))
+			.orderby(Airline.name)
+		)
+
+	def run_export(self, file_format):
+		module = MagicMock()
+		module.get_export.return_value = (self.COLUMNS, self.query())
+		with patch('frappe.get_module', return_value=module), \
+			patch('frappe.publish_realtime') as mock_publish, \
+			patch.object(frappe.db, 'commit'):
+			file_url = export.export_job('Revenue By Airline', {}, file_format)
+
+		path = frappe.get_site_path(file_url.lstrip('/'))
+		self.addCleanup(os.remove, path)
+		self.assertIn(f"({len(self.AIRLINES)} rows)", mock_publish.call_args.args[1])
+		self.assertEqual(frappe.db.get_value('File', {'file_url': file_url}, 'attached_to_name'), 'Revenue By Airline')
+		return path
+
+	def test_stream_rows_across_chunks(self):
+		"""Rows come back whole and in order, ordered like the fieldnames, past several chunks"""
+		rows = list(export.stream_rows(self.query(), ['airline', 'founding_year']))
+
+		self.assertEqual(rows, [[name, year] for year, name in enumerate(self.AIRLINES, start=1990)])
+
+	def test_export_csv(self):
+		path = self.run_export('CSV')
+
+		with open(path, newline='', encoding='utf-8') as f:
+			rows = list(csv.reader(f))
+		self.assertEqual(rows[0], ['Airline', 'Founded'])
+		self.assertEqual(len(rows) - 1, len(self.AIRLINES))
+		self.assertEqual(rows[-1], [self.AIRLINES[-1], '1997'])
+
+	def test_export_xlsx(self):
+		from openpyxl import load_workbook
+
+		path = self.run_export('Excel')
+
+		rows = list(load_workbook(path, read_only=True).active.values)
+		self.assertEqual(list(rows[0]), ['Airline', 'Founded'])
+		self.assertEqual(len(rows) - 1, len(self.AIRLINES))
+		self.assertEqual(list(rows[-1]), [self.AIRLINES[-1], 1997])
+
+	def test_export_report_rejects_unknown_report_and_format(self):
+		with patch('frappe.enqueue') as mock_enqueue:
+			with self.assertRaises(frappe.ValidationError):
+				export.export_report('_Test Unknown Report')
+			with self.assertRaises(frappe.ValidationError):
+				export.export_report('Revenue By Airline', file_format='PDF')
+
+		mock_enqueue.assert_not_called()
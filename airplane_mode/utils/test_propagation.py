@@ -0,0 +1,107 @@
+# Copyright (c) 2024, Weaver Marquez and Contributors
+# See license.txt
+
+from unittest.mock import MagicMock, patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from airplane_mode.utils import propagation
+
+
+class TestPropagation(FrappeTestCase):
+	"""propagation against real Airplane Flight and Airplane Ticket rows,
+	written with db_insert so no other controller logic runs."""
+
+	AIRPORT = '_Test Prop Airport'
+	MODIFIED = '2024-01-01 00:00:00'
+
+	def setUp(self):
+		flights = [
+			# name, docstatus
+			('_Test Prop Flight 1', 0),
+			('_Test Prop Flight 2', 1),
+			('_Test Prop Flight Cancelled', 2),
+		]
+		for name, docstatus in flights:
+			frappe.get_doc({
+				'doctype': 'Airplane Flight',
+				'name': name,
+				'docstatus': docstatus,
+				'source_airport': self.AIRPORT,
+				'source_airport_code': 'OLD',
+				'destination_airport': '_Test Prop Other Airport',
+				'destination_airport_code': 'DST',
+				'modified': self.MODIFIED,
+			}).db_insert()
+
+		tickets = [
+			# name, flight, source_airport_code
+			('_Test Prop Ticket 1', '_Test Prop Flight 1', 'OLD'),
+			('_Test Prop Ticket 2', '_Test Prop Flight 2', 'OLD'),
+			('_Test Prop Ticket Current', '_Test Prop Flight 2', 'NEW'),
+			('_Test Prop Ticket Cancelled Flight', '_Test Prop Flight Cancelled', 'OLD'),
+		]
+		for name, flight, code in tickets:
+			frappe.get_doc({
+				'doctype': 'Airplane Ticket',
+				'name': name,
+				'flight': flight,
+				'source_airport_code': code,
+				'destination_airport_code': 'DST',
+				'modified': self.MODIFIED,
+			}).db_insert()
+
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def test_build_dependency_graph(self):
+		"""Every fetch_from becomes an edge from its link's doctype, grouped by dependent and link field"""
+		graph = propagation.build_dependency_graph()
+
+		self.assertIn(
+			{'doctype': 'Airplane Flight', 'link_field': 'source_airport', 'fields': {'code': 'source_airport_code'}},
+			graph['Airport'],
+		)
+		self.assertIn(
+			{'doctype': 'Airplane Flight', 'link_field': 'airplane', 'fields': {'capacity': 'capacity'}},
+			graph['Airplane'],
+		)
+		(tickets,) = [dependent for dependent in graph['Airplane Flight'] if dependent['doctype'] == 'Airplane Ticket']
+		self.assertEqual(tickets['link_field'], 'flight')
+		self.assertEqual(tickets['fields']['source_airport_code'], 'source_airport_code')
+		self.assertEqual(tickets['fields']['time_of_departure'], 'departure_time')
+
+	def test_propagate_copies_hop_by_hop_to_stale_rows_only(self):
+		"""Airport code reaches flights, then their tickets; cancelled rows and current copies are left alone"""
+		changed = propagation.propagate('Airport', [self.AIRPORT], {'code': 'NEW'})
+
+		self.assertEqual(dict(changed), {'Airplane Flight': 2, 'Airplane Ticket': 2})
+
+		codes = dict(frappe.get_all('Airplane Ticket', filters={'name': ['like', '_Test Prop%']},
+			fields=['name', 'source_airport_code'], as_list=True))
+		self.assertEqual(codes, {
+			'_Test Prop Ticket 1': 'NEW',
+			'_Test Prop Ticket 2': 'NEW',
+			'_Test Prop Ticket Current': 'NEW',
+			'_Test Prop Ticket Cancelled Flight': 'OLD',
+		})
+		self.assertEqual(frappe.db.get_value('Airplane Flight', '_Test Prop Flight Cancelled', 'source_airport_code'), 'OLD')
+		self.assertEqual(frappe.db.get_value('Airplane Flight', '_Test Prop Flight 1', 'destination_airport_code'), 'DST')
+		self.assertEqual(str(frappe.db.get_value('Airplane Ticket', '_Test Prop Ticket Current', 'modified')), self.MODIFIED,
+			"A row already holding the new value is not rewritten")
+
+	def test_count_dependents_counts_every_hop(self):
+		"""Flights and their tickets both count towards the background threshold"""
+		self.assertEqual(propagation.count_dependents('Airport', [self.AIRPORT]), 5)
+		self.assertGreater(propagation.count_dependents('Airport', [self.AIRPORT], limit=1), 1)
+
+	def test_propagate_job_clears_flight_cache(self):
+		"""Flights written directly never run on_change, so the job clears their cached rows"""
+		doc = MagicMock()
+		doc.get.return_value = 'NEW'
+
+		with patch('airplane_mode.airplane_mode.doctype.airplane_flight.airplane_flight.clear_flight_cache') as mock_clear:
+			propagation.propagate_job('Airport', self.AIRPORT, ['code'], doc=doc)
+
+		mock_clear.assert_called_once()
+		doc.add_comment.assert_called_once_with('Info', "Copied code to 2 Airplane Flight, 2 Airplane Ticket.")
@@ -0,0 +1,90 @@
+# Copyright (c) 2024, Weaver Marquez and Contributors
+# See license.txt
+
+from unittest.mock import MagicMock, patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from airplane_mode.utils import report_cache
+
+
+class TestReportCache(FrappeTestCase):
+	"""report_cache against the site's redis, under keys of its own so the app's
+	cached reports, versions and stats are left alone."""
+
+	REPORT = '_Test Cached Report'
+	SOURCE = '_Test Cached Source'
+	NAMESPACE = 'airplane_mode:test_report_cache'
+
+	def setUp(self):
+		patches = [
+			patch.object(report_cache, 'NAMESPACE', self.NAMESPACE),
+			patch.object(report_cache, 'VERSIONS_KEY', f'{self.NAMESPACE}:versions'),
+			patch.object(report_cache, 'LRU_KEY', f'{self.NAMESPACE}:lru'),
+			patch.object(report_cache, 'STATS_KEY', f'{self.NAMESPACE}:stats'),
+		]
+		for p in patches:
+			p.start()
+			self.addCleanup(p.stop)
+		self.addCleanup(frappe.cache().delete_keys, self.NAMESPACE)
+
+		self.execute = MagicMock(side_effect=lambda filters: [filters])
+		self.report = report_cache.cached(self.REPORT, sources=[self.SOURCE])(self.execute)
+
+	def key(self, filters=None):
+		return report_cache.cache_key(self.REPORT, [self.SOURCE], filters)
+
+	def test_cache_key(self):
+		"""Filters without their empty values, roles, user permissions and source versions all count"""
+		key = self.key({'airline': 'A', 'airport': None, 'flights': []})
+		self.assertEqual(key, self.key({'airline': 'A'}))
+		self.assertNotEqual(key, self.key({'airline': 'B'}))
+
+		with patch('frappe.get_roles', return_value=['Guest']):
+			self.assertNotEqual(key, self.key({'airline': 'A'}))
+		with patch('frappe.permissions.get_user_permissions', return_value={'Airline': [{'doc': 'A'}]}):
+			self.assertNotEqual(key, self.key({'airline': 'A'}))
+
+		report_cache.bump_version(self.SOURCE)
+		self.assertNotEqual(key, self.key({'airline': 'A'}))
+
+	def test_hit_miss_and_stats(self):
+		self.assertEqual(self.report({'airline': 'A'}), [{'airline': 'A'}])
+		self.assertEqual(self.report({'airline': 'A'}), [{'airline': 'A'}])
+		self.report({'airline': 'B'})
+
+		self.assertEqual(self.execute.call_count, 2)
+		stats = report_cache.get_stats()
+		self.assertEqual(stats['reports'][self.REPORT], {'hits': 1, 'misses': 2, 'hit_rate': 1 / 3})
+		self.assertEqual(stats['entries'], 2)
+
+	def test_version_bump_retires_entries(self):
+		self.report({'airline': 'A'})
+		report_cache.bump_version(self.SOURCE)
+		self.report({'airline': 'A'})
+
+		self.assertEqual(self.execute.call_count, 2)
+
+	def test_invalidate_bumps_after_commit(self):
+		"""A document change only retires entries once it commits"""
+		before = report_cache.get_versions([self.SOURCE])
+
+		report_cache.invalidate(frappe._dict(doctype=self.SOURCE))
+		self.assertEqual(report_cache.get_versions([self.SOURCE]), before)
+
+		frappe.db.after_commit.run()
+		self.assertEqual(report_cache.get_versions([self.SOURCE]), [before[0] + 1])
+
+	def test_evicts_least_recently_used(self):
+		with patch.object(report_cache, 'MAX_ENTRIES', 2):
+			self.report({'airline': 'A'})
+			self.report({'airline': 'B'})
+			# A is used again, so B is now the least recently used.
+			self.report({'airline': 'A'})
+			self.report({'airline': 'C'})
+
+		cache = frappe.cache()
+		self.assertIsNone(cache.get_value(self.key({'airline': 'B'})))
+		self.assertIsNotNone(cache.get_value(self.key({'airline': 'A'})))
+		self.assertIsNotNone(cache.get_value(self.key({'airline': 'C'})))
+		self.assertEqual(cache.zcard(cache.make_key(report_cache.LRU_KEY)), 2)